@@ -58,3 +58,4 @@ from .dataobject import DataObject, Result
 from .datasource import DataSource
 from .diapason import Diapason
 from .project import Project
+from .journal import ComputationJournal
@@ -3,13 +3,13 @@
 from typing import Any, List
 
 from tuneinsight.api.sdk import models
-from tuneinsight.api.sdk.api.api_computations import get_computation
+from tuneinsight.api.sdk.api.api_computations import get_computation, stop_computation
 from tuneinsight.client.validation import validate_response
 from tuneinsight.utils import time_tools
 
 from tuneinsight import Diapason
 from tuneinsight.computations.base import Computation as BaseComputation
-from tuneinsight.computations.types import model_type_to_class
+from tuneinsight.computations.cancellation import CancellationToken
 
 
 class Computation:
@@ -86,18 +86,16 @@ class Computation:
 
     def _resolve_computation_class(self) -> BaseComputation:
         """
-        Resolves the computation class based on the computation type using model_type_to_class from types.py.
+        Resolves the computation class based on the computation type (see `Project.get_computation`).
 
         Returns:
             BaseComputation: The computation class.
         """
 
         try:
-            comp_class = model_type_to_class(self.model.definition.type)
-            return comp_class.from_model(
-                self.client.get_project(project_id=self.model.project_id),
-                self.model.definition,
-            )
+            # Project.get_computation loads the computation without patching the project.
+            project = self.client.get_project(project_id=self.model.project_id)
+            return project.get_computation(self.model.definition)
         except Exception as e:  # pylint: disable=broad-exception-caught
             raise ValueError(
                 f"Unsupported computation type: {self.model.definition.type}"
@@ -108,6 +106,7 @@ class Computation:
         interval: int = 100 * time_tools.MILLISECOND,
         max_sleep_time: int = 30 * time_tools.SECOND,
         verbose: bool = False,
+        cancellation: CancellationToken = None,
     ) -> Any:
         """
         Fetches results for this computation.
@@ -120,6 +119,8 @@ class Computation:
             interval (int, optional): time in nanoseconds to wait between polls.
             max_sleep_time (int, optional): maximum total time in nanoseconds to wait.
             verbose (bool, optional): whether to print progress.
+            cancellation (CancellationToken, optional): token used to stop the computation
+                (and stop waiting for it) before it completes.
         """
         # Delegate fetching results to the computation base class
         comp = self._resolve_computation_class()
@@ -129,8 +130,22 @@ class Computation:
             interval=interval,
             max_sleep_time=max_sleep_time,
             verbose=verbose,
+            cancellation=cancellation,
         )
 
+    def cancel(self):
+        """
+        Stops this computation on the instance.
+
+        The computation is stopped with status `cancelled`. This has no effect if the
+        computation has already completed.
+        """
+        response = stop_computation.sync_detailed(
+            computation_id=self.model.id, client=self.client.client
+        )
+        validate_response(response)
+        self._refresh()
+
     def get_status(self) -> models.ComputationStatus:
         """
         Fetches the latest status of this computation.
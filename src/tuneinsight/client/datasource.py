@@ -22,6 +22,10 @@ from tuneinsight.api.sdk.api.api_dataobject import post_data_object
 
 from tuneinsight.client.validation import validate_response
 from tuneinsight.client.dataobject import DataObject
+from tuneinsight.computations.dataset_schema import (
+    DatasetSchema,
+    SchemaValidationReport,
+)
 from tuneinsight.computations.policy import DataPolicy
 from tuneinsight.utils.tracking import ProgressTracker, new_task_id
 from tuneinsight.utils.io import generate_dataframe_chunks, generate_csv_records
@@ -293,10 +297,17 @@ class DataSource:
         verbose: bool = False,
         skip_invalid_rows: bool = False,
         delimiter: str = ",",
-    ):
+        schema: DatasetSchema | models.DatasetSchema = None,
+    ) -> SchemaValidationReport | None:
         """
         Uploads data to a data source. Data can be either appended or replaced.
 
+        If a schema is provided, the data is validated locally before it is uploaded (see
+        `DatasetSchema.validate`). Invalid rows are then dropped before the upload if
+        `skip_invalid_rows` is True (or if the schema drops invalid rows). Otherwise, all the
+        data is validated first, and an error is raised before anything is uploaded if any
+        row is invalid.
+
         Args:
             df (pd.DataFrame, optional): dataframe to upload. Defaults to None.
             csv_path (str, optional): Path to the csv file containing the data to upload. Defaults to None.
@@ -306,9 +317,16 @@ class DataSource:
             skip_invalid_rows (bool, optional): When set to true, then rows that are detected as invalid as they do not comply with the schema
                                                 will no be inserted into the data source. Default to False.
             delimiter (str, optional): delimiter to use when parsing the csv data. Defaults to ",".
+            schema (DatasetSchema | models.DatasetSchema, optional): a schema to validate the data against
+                before it is uploaded. Defaults to None (no local validation).
+
+        Returns:
+            SchemaValidationReport: if a schema is provided, the number of rows that violate each check
+                (the rows uploaded are the rows that are valid).
 
         Raises:
-            ValueError: If no data is provided or the table name is missing when required.
+            ValueError: If no data is provided, the table name is missing when required, or the
+                data does not match the schema.
         """
         if self.model.type not in [
             models.DataSourceType.DATABASE,
@@ -320,13 +338,35 @@ class DataSource:
         if self.model.type == models.DataSourceType.DATABASE and table_name == "":
             raise ValueError("table name must be provided")
 
-        if df is not None:
-            generator = generate_dataframe_chunks(df, self.upload_chunk_size)
-        elif csv_path is not None:
-            generator = generate_csv_records(csv_path, self.upload_chunk_size)
-        else:
+        def chunks():
+            if df is not None:
+                return generate_dataframe_chunks(df, self.upload_chunk_size)
+            if csv_path is not None:
+                return generate_csv_records(csv_path, self.upload_chunk_size)
             raise ValueError("missing a datasource: specify either df or csv_path")
 
+        generator = chunks()
+        reports = []
+        if schema is not None:
+            if not isinstance(schema, DatasetSchema):
+                schema = DatasetSchema(schema)
+            drop_invalid = skip_invalid_rows or value_if_unset(
+                schema.model.drop_invalid_rows, False
+            )
+            if drop_invalid:
+                generator = _drop_invalid_rows(
+                    schema.validate_chunks(generator), reports
+                )
+            else:
+                # Validate all the data before uploading any of it.
+                report = SchemaValidationReport.combine(
+                    (r for _, r in schema.validate_chunks(generator)),
+                    keep_violations=False,
+                )
+                _raise_if_invalid(report)
+                reports.append(report)
+                generator = chunks()
+
         first_chunk = True
         uploaded_records = 0
         for chunk_df in generator:
@@ -343,6 +383,9 @@ class DataSource:
             first_chunk = False
         if verbose:
             print()
+        if schema is None:
+            return None
+        return SchemaValidationReport.combine(reports, keep_violations=False)
 
     def _upload_data_file(
         self,
@@ -682,3 +725,22 @@ class RemoteDataSource:
         to match the type, and if possible the name of the auto-match criterion.
         """
         return models.DataSourceDefinition(name=self.model.name, type=self.model.type)
+
+
+def _raise_if_invalid(report: SchemaValidationReport):
+    if not report.ok:
+        raise ValueError(f"The data does not match the schema.\n{report.summary()}")
+
+
+def _drop_invalid_rows(validated_chunks, reports: list[SchemaValidationReport]):
+    """Drops the invalid rows of validated chunks, storing the report of each chunk in reports."""
+    for chunk, report in validated_chunks:
+        if report.missing_columns:
+            _raise_if_invalid(report)
+        if report.num_invalid_rows > 0:
+            chunk = chunk[~report.invalid_rows.to_numpy()]
+        # Only the counts are kept, so that memory does not grow with the data.
+        report.violations = None
+        reports.append(report)
+        if len(chunk) > 0:
+            yield chunk
@@ -1,7 +1,21 @@
-"""Utilities to interact with results under end-to-end encryption."""
+"""Utilities to interact with results under end-to-end encryption.
+
+By default, new keys are generated to decrypt each result. Generating keys can take
+longer than decrypting small results: when decrypting many results (e.g., with
+`Project.fetch_results`), keys can be reused for a bounded number of results and
+time with a `KeyCache`:
+
+```python
+e2ee.use_key_cache(e2ee.KeyCache(max_uses=50, max_age=10 * time_tools.MINUTE))
+```
+
+"""
 
 import base64
+import collections
+import hashlib
 import json
+import threading
 from typing import Callable
 from tuneinsight.client.dataobject import Result
 from tuneinsight.client.validation import validate_response
@@ -9,7 +23,7 @@ from tuneinsight.client.validation import validate_response
 from tuneinsight.cryptolib import (
     get_public_key_b64,
     new_hefloat_operator_from_b64_scheme_context,
-    decrypt_dataframe,
+    decrypt_matrix,
     decrypt_stats,
 )
 
@@ -19,19 +33,168 @@ from tuneinsight.api.sdk import models
 from tuneinsight.api.sdk import client as api_client
 from tuneinsight.api.sdk.types import Unset
 from tuneinsight.api.sdk.api.api_computations import release_result
+from tuneinsight.utils import time_tools
+
+
+class _CachedKeys:
+    """Key material of a cryptosystem stored in a KeyCache."""
+
+    def __init__(self, hefloat_operator_id: bytes, public_key: bytes):
+        self.hefloat_operator_id = hefloat_operator_id
+        self.public_key = public_key
+        self.created_at = time_tools.now()
+        self.uses = 0
+
+    def forget(self):
+        """
+        Drops the references to the operator held by this entry.
+
+        The operator id and public key are not secret. The secret key lives in the
+        cryptolib, which does not expose a way to release an operator: forgetting an
+        entry only ensures that the cache no longer hands out these keys.
+        """
+        self.hefloat_operator_id = None
+        self.public_key = None
+
+
+class KeyCache:
+    """
+    A bounded cache of cryptosystems (and their keys) used to decrypt results.
+
+    Cryptosystems are indexed by the scheme context (switching parameters) of the
+    results, and are reused for at most max_uses results and max_age nanoseconds. When
+    an entry is evicted (because it expired or the cache is full), the cache stops using
+    its keys. Eviction does not erase any secret: the cryptolib does not expose a way to
+    release an operator, so the secret key of an evicted operator remains in the native
+    library until the process exits (as is the case without a cache, where one operator
+    is created per result).
+
+    The cache can be shared between threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 8,
+        max_uses: int = 100,
+        max_age: int = 10 * time_tools.MINUTE,
+    ):
+        """
+        Creates an empty cache.
+
+        Args:
+            max_entries (int, optional): maximum number of cryptosystems in the cache.
+            max_uses (int, optional): maximum number of results decrypted with the same keys.
+            max_age (int, optional): maximum time in nanoseconds during which keys are reused.
+        """
+        self.max_entries = max_entries
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self._entries: collections.OrderedDict[str, _CachedKeys] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(switching_params: str) -> str:
+        return hashlib.sha256(switching_params.encode("utf-8")).hexdigest()
+
+    def _expired(self, entry: _CachedKeys) -> bool:
+        return (
+            entry.uses >= self.max_uses
+            or time_tools.since(entry.created_at) >= self.max_age
+        )
+
+    def _evict(self, key: str):
+        self._entries.pop(key).forget()
+
+    def get(self, switching_params: str) -> tuple[bytes, bytes]:
+        """
+        Returns a cryptosystem and its public key for some switching parameters.
+
+        A new cryptosystem is created if none is cached for these parameters, or if
+        the cached one has expired.
+
+        Args:
+            switching_params (str): the base64-encoded scheme context of the result.
+
+        Returns:
+            tuple[bytes, bytes]: the id of the cryptosystem and its base64-encoded public key.
+        """
+        key = self._key(switching_params)
+        with self._lock:
+            entry = self._take(key)
+            if entry is not None:
+                return entry.hefloat_operator_id, entry.public_key
+        # Keys are generated without holding the lock, so that threads decrypting
+        # results with other (cached) parameters are not blocked meanwhile.
+        hefloat_operator_id = new_hefloat_operator_from_b64_scheme_context(
+            switching_params
+        )
+        public_key = get_public_key_b64(hefloat_operator_id)
+        with self._lock:
+            # Another thread may have cached keys for these parameters in the meantime.
+            entry = self._take(key)
+            if entry is not None:
+                return entry.hefloat_operator_id, entry.public_key
+            entry = _CachedKeys(hefloat_operator_id, public_key)
+            entry.uses = 1
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+        return hefloat_operator_id, public_key
+
+    def _take(self, key: str) -> _CachedKeys:
+        """Returns (and uses) the entry for a key if it has not expired. Requires the lock."""
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            self._evict(key)
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            entry.uses += 1
+        return entry
+
+    def clear(self):
+        """Evicts all the entries in the cache."""
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
-def decrypt(client: api_client, result: Result) -> Result:
+# The key cache used by default by decrypt (None: new keys are generated for each result).
+_default_key_cache: KeyCache = None
+
+
+def use_key_cache(cache: KeyCache = None):
+    """
+    Sets the key cache used by default to decrypt results.
+
+    Args:
+        cache (KeyCache, optional): the cache to use. If None (default), caching is disabled
+            and new keys are generated for each result. The previous cache is cleared.
+    """
+    global _default_key_cache  # pylint: disable=global-statement
+    if _default_key_cache is not None and _default_key_cache is not cache:
+        _default_key_cache.clear()
+    _default_key_cache = cache
+
+
+def decrypt(client: api_client, result: Result, key_cache: KeyCache = None) -> Result:
     """
     Decrypts a result (DataObject) computed under end-to-end encryption.
 
     This generates public and private keys for the result, requests a key switch
-    for the result, retrieves the result and decrypts it. New keys are generated
-    each time, and keys are not stored.
+    for the result, retrieves the result and decrypts it. Unless a key cache is used,
+    new keys are generated each time, and keys are not stored.
 
     Args:
         client: the client to connect to the instance.
         result: the result to be decrypted.
+        key_cache: the cache from which to take keys. Defaults to the cache set with
+            use_key_cache (by default, no cache is used).
 
     Returns:
         result: the input result with its content decrypted in-place.
@@ -41,11 +204,18 @@ def decrypt(client: api_client, result: Result) -> Result:
     if isinstance(switching_params, Unset):
         return result
 
-    ## Create a cryptosystem. This will be used to generate a public and private key.
-    hefloat_operator_id = new_hefloat_operator_from_b64_scheme_context(switching_params)
+    if key_cache is None:
+        key_cache = _default_key_cache
+    if key_cache is not None:
+        hefloat_operator_id, public_key = key_cache.get(switching_params)
+    else:
+        ## Create a cryptosystem. This will be used to generate a public and private key.
+        hefloat_operator_id = new_hefloat_operator_from_b64_scheme_context(
+            switching_params
+        )
 
-    ## Generate a public key for this cryptosystem.
-    public_key = get_public_key_b64(hefloat_operator_id)
+        ## Generate a public key for this cryptosystem.
+        public_key = get_public_key_b64(hefloat_operator_id)
 
     ## Keyswitch the result for this public key.
     response = release_result.sync_detailed(
@@ -122,12 +292,11 @@ def _decrypt_dataframe(
 
     """
     ciphertext = base64.urlsafe_b64decode(encrypted_content.value.encode("utf-8"))
-    df = decrypt_dataframe(hefloat_operator_id, ciphertext)
+    values = decrypt_matrix(hefloat_operator_id, ciphertext)
     return models.FloatMatrix(
         type=models.ContentType.FLOATMATRIX,
         columns=encrypted_content.columns,
-        # Convert the data from DataFrame to list[list[float]]
-        data=list(list(row) for row in df.values),
+        data=values.tolist(),
     )
 
 
@@ -0,0 +1,227 @@
+"""Durable journal of computations launched on a Tune Insight instance.
+
+Long-running collective computations can outlive the Python process that launched
+them (e.g., when a notebook kernel is restarted). A `ComputationJournal` records
+each launched computation in an append-only file of JSON lines, so that pending
+computations can be re-attached and their results fetched after a restart:
+
+```python
+journal = ComputationJournal("computations.jsonl")
+computation = project.new_aggregation(...)
+computation.journal = journal
+computation.run_async()
+
+# ... after a restart:
+results = ComputationJournal("computations.jsonl").resume_pending(client)
+```
+
+Results computed under end-to-end encryption are key-switched to fresh keys when
+they are fetched (see `client.e2ee.decrypt`), so no key material is written to
+the journal: the switching parameters needed for decryption are stored with the
+results on the instance.
+
+"""
+
+import json
+import os
+import threading
+from typing import Any
+import warnings
+
+from tuneinsight.api.sdk import models
+from tuneinsight.api.sdk.types import value_if_unset
+from tuneinsight.computations.cancellation import (
+    CancellationToken,
+    ComputationCancelledError,
+)
+from tuneinsight.computations.errors import (
+    DisclosurePreventionError,
+    PreprocessingError,
+    QueryError,
+    InternalError,
+    ValidationError,
+)
+from tuneinsight.utils import time_tools
+
+
+LAUNCHED = "launched"
+COMPLETED = "completed"
+
+# Errors signalling that a computation terminated without results (it should not be resumed).
+COMPUTATION_ERRORS = (
+    DisclosurePreventionError,
+    PreprocessingError,
+    QueryError,
+    InternalError,
+    ValidationError,
+    ValueError,
+)
+
+
+class ComputationJournal:
+    """
+    An append-only, on-disk record of launched and completed computations.
+
+    Each line of the journal file is a JSON object describing one event: either the
+    launch of a computation (with its full API model and project identifier), or its
+    completion. A computation is pending if it was launched and not completed. Lines
+    are flushed and synced to disk when written, and a truncated last line (e.g., if
+    the process crashed while writing) is ignored when reading the journal.
+
+    The same journal can be shared by several computations, including from different
+    threads.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens (or creates) a journal at a given path.
+
+        Args:
+            path (str): path of the journal file. It is created on the first write.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _append(self, event: dict):
+        """Appends an event to the journal and syncs it to disk."""
+        line = json.dumps(event) + "\n"
+        with self._lock:
+            with open(self.path, "a+b") as f:
+                # Start on a new line if a previous write was interrupted.
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = "\n" + line
+                f.write(line.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _read(self) -> list[dict]:
+        """Reads all the (well-formed) events recorded in the journal."""
+        if not os.path.exists(self.path):
+            return []
+        events = []
+        with self._lock:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        return events
+
+    def record_launch(self, computation: models.Computation, project_id: str = None):
+        """
+        Records that a computation was launched.
+
+        Args:
+            computation (models.Computation): the computation returned by the instance at launch.
+            project_id (str, optional): the project in which the computation runs. Defaults
+                to the project identifier of the computation.
+        """
+        if project_id is None:
+            project_id = value_if_unset(computation.project_id, None)
+        self._append(
+            {
+                "event": LAUNCHED,
+                "id": computation.id,
+                "project_id": project_id,
+                "time": time_tools.now(),
+                "computation": computation.to_dict(),
+            }
+        )
+
+    def record_completion(self, computation_id: str, error: str = None):
+        """
+        Records that the results of a computation were retrieved (or that it failed).
+
+        Args:
+            computation_id (str): the unique identifier of the computation.
+            error (str, optional): the error that terminated the computation, if any.
+        """
+        event = {"event": COMPLETED, "id": computation_id, "time": time_tools.now()}
+        if error is not None:
+            event["error"] = error
+        self._append(event)
+
+    def pending(self) -> list[tuple[str, models.Computation]]:
+        """
+        Returns the computations that were launched but not completed, in launch order.
+
+        Returns:
+            list[tuple[str, models.Computation]]: pairs of project identifier and the
+                computation model recorded at launch.
+        """
+        launched: dict[str, dict] = {}
+        for event in self._read():
+            if event.get("event") == LAUNCHED:
+                launched[event["id"]] = event
+            elif event.get("event") == COMPLETED:
+                launched.pop(event["id"], None)
+        return [
+            (event["project_id"], models.Computation.from_dict(event["computation"]))
+            for event in launched.values()
+        ]
+
+    def resume_pending(
+        self,
+        client: "Diapason",  # type: ignore
+        interval: int = 100 * time_tools.MILLISECOND,
+        max_sleep_time: int = 30 * time_tools.SECOND,
+        cancellation: CancellationToken = None,
+    ) -> list[tuple[models.Computation, Any]]:
+        """
+        Waits for all pending computations in the journal and fetches their results.
+
+        Each pending computation is re-attached to its project, polled until it
+        completes, and its results are fetched (and decrypted, if needed). Computations
+        are marked as completed in the journal once their results are retrieved, or once
+        they fail, so that they are not resumed twice. Computations that cannot be
+        resumed by this client (e.g., because the project no longer exists) are skipped
+        with a warning and left pending.
+
+        Args:
+            client (Diapason): the client used to connect to the instance.
+            interval (int, optional): time in nanoseconds to wait between polls.
+            max_sleep_time (int, optional): maximum time in nanoseconds to wait between polls.
+            cancellation (CancellationToken, optional): token used to stop waiting for (and stop)
+                the pending computations.
+
+        Returns:
+            list[tuple[models.Computation, Any]]: the computations that completed
+                successfully, with their (post-processed) results.
+        """
+        output = []
+        for project_id, computation in self.pending():
+            try:
+                project = client.get_project(project_id=project_id)
+                comp = project.get_computation(computation.definition)
+            except (LookupError, ValueError) as err:
+                warnings.warn(f"Cannot resume computation {computation.id}: {err}")
+                continue
+            # The computation records its own completion when its results are fetched.
+            comp.journal = self
+            # Timeouts are propagated: the computation is still running and remains pending.
+            try:
+                results = comp.fetch_results(
+                    computation, interval, max_sleep_time, cancellation=cancellation
+                )
+            except ComputationCancelledError as err:
+                # Computations stopped by the token are recorded when they are stopped.
+                if cancellation is not None and cancellation.cancelled:
+                    raise
+                self.record_completion(computation.id, error=str(err))
+                warnings.warn(str(err))
+                continue
+            except COMPUTATION_ERRORS as err:
+                self.record_completion(computation.id, error=str(err))
+                warnings.warn(f"Computation {computation.id} failed: {err}")
+                continue
+            output.append((computation, results))
+        return output
+
+    def clear(self):
+        """Removes the journal file, forgetting all recorded computations."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
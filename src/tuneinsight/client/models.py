@@ -12,6 +12,9 @@ Classes to train and evaluate machine learning models in a Tune Insight instance
 
 from enum import Enum
 
+import numpy as np
+import pandas as pd
+
 from tuneinsight.api.sdk import Client
 from tuneinsight.api.sdk.models import Model as APIModel
 from tuneinsight.api.sdk.models import (
@@ -30,6 +33,8 @@ from tuneinsight.client.validation import validate_response
 from tuneinsight.cryptolib.cryptolib import (
     new_hefloat_operator_from_b64_scheme_context,
     get_relin_key_bytes,
+    encrypt_array,
+    decrypt_matrix,
 )
 from tuneinsight.computations.regression import _RegressionPredicting
 from tuneinsight.client.dataobject import DataObject
@@ -95,8 +100,35 @@ class Model:
         validate_response(resp)
         self.model = resp.parsed
 
+    def predict(self, project: "Project", data: np.ndarray | pd.DataFrame) -> np.ndarray:  # type: ignore
+        """
+        Evaluates the model on encrypted data.
+
+        The data is encrypted locally with fresh keys, evaluated by the agent under
+        encryption, and the predictions are decrypted locally.
+
+        Args:
+            project (Project): the project in which to run the prediction.
+            data (np.ndarray | pd.DataFrame): the numeric features to evaluate the model on,
+                with one row per record.
+
+        Returns:
+            np.ndarray: the predictions, with one row per record.
+        """
+        s_id = self._new_session()
+        cs_id = self._upload_eval_keys(s_id)
+        ct = self._encrypt_dataset(cs_id, data)
+        input_id = self._upload_dataset(s_id, ct)
+        encrypted_predictions = self._run_prediction(project, input_id)
+        return decrypt_matrix(cs_id, encrypted_predictions)
+
     # Helpers for the prediction
 
+    def _encrypt_dataset(self, cs_id: bytes, data: np.ndarray | pd.DataFrame) -> bytes:
+        if isinstance(data, pd.DataFrame):
+            data = data.to_numpy(dtype=np.float64)
+        return encrypt_array(cs_id, data)
+
     def _new_session(self) -> str:
         # Create a Session
         sess_def = SessionDefinition(params=self.model.model_params.cryptolib_params)
@@ -2,6 +2,7 @@
 
 import collections
 import json
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 from contextlib import contextmanager
 from typing import Any, Optional
@@ -32,6 +33,10 @@ from tuneinsight.api.sdk.types import (
 from tuneinsight.client.datasource import DataSource, RemoteDataSource
 from tuneinsight.client.validation import validate_response
 from tuneinsight.computations import Computation
+from tuneinsight.computations.cancellation import (
+    CancellationToken,
+    ComputationCancelledError,
+)
 from tuneinsight.computations.dataset_schema import DatasetSchema
 from tuneinsight.computations.local_data_selection import LocalDataSelection
 from tuneinsight.computations.policy import Policy
@@ -82,6 +87,9 @@ class Project:
     # to SDK objects without sending them to the instance. Do not set manually: use
     # .disable_patch() within a with statement.
     _disable_patch: bool = False
+    # Fingerprint of the computation definition last set in the project by a Computation
+    # (None if unknown). Used by computations to skip setting an unchanged definition.
+    _computation_fingerprint: str = None
 
     def __attrs_post_init__(self):
         """Create a datasource object if one is defined in the project model."""
@@ -115,8 +123,10 @@ class Project:
         """
         _disable_patch_prev = self._disable_patch
         self._disable_patch = True
-        yield self
-        self._disable_patch = _disable_patch_prev
+        try:
+            yield self
+        finally:
+            self._disable_patch = _disable_patch_prev
 
     # Internal methods.
 
@@ -138,21 +148,25 @@ class Project:
 
         Args:
             proj_def (models.ProjectDefinition): the definition to patch with.
+
+        Returns:
+            bool: whether the project was updated.
         """
         if self._disable_patch:
-            return
+            return False
         if not self.client_can(models.Capability.EDITPROJECTS):
             warnings.warn(
                 "You do not have the capabilities to edit this project "
                 "so changes made with this code will not be taken into account."
             )
-            return
+            return False
         resp: Response[models.Project] = patch_project.sync_detailed(
             client=self.client, project_id=self.get_id(), json_body=proj_def
         )
         validate_response(response=resp)
         self.model = resp.parsed
         self._display_error()
+        return True
 
     def _display_error(self, hard: bool = False):
         """Raises warnings containing errors recorded in the project.
@@ -330,7 +344,11 @@ class Project:
         lds = self.get_local_data_selection()
         lds.preprocessing.schema = schema
 
-    def set_computation(self, definition: Computation | models.ComputationDefinition):
+    def set_computation(
+        self,
+        definition: Computation | models.ComputationDefinition,
+        fingerprint: str = None,
+    ):
         """
         Sets the project's current computation.
 
@@ -340,12 +358,15 @@ class Project:
 
         Args:
             definition (models.ComputationDefinition or Computation): the definition to apply.
+            fingerprint (str, optional): a fingerprint of the definition, set by computations
+                to skip updates that would not change the definition. Intended for internal use.
         """
         if isinstance(definition, Computation):
             definition: models.ComputationDefinition = definition.get_full_model()
-        self._patch(
+        if self._patch(
             proj_def=models.ProjectDefinition(computation_definition=definition)
-        )
+        ):
+            self._computation_fingerprint = fingerprint
 
     def set_datasource(self, ds: DataSource | str | RemoteDataSource):
         """Sets the project's input datasource.
@@ -640,28 +661,70 @@ class Project:
             _class = model_type_to_class(computation_definition.type)
             return _class.from_model(self, computation_definition)
 
-    def get_computations(self, num_computations: int = 10) -> list[models.Computation]:
+    def get_computations(
+        self, num_computations: int = 10, per_page: int = 50
+    ) -> list[models.Computation]:
         """Returns the list of the latest computations that have been run on this project.
 
+        Computations are fetched from the instance page by page, from the most to the least
+        recently updated.
+
         Args:
             num_computations (int, optional): Number of computations to fetch. Defaults to 10.
-        """
-        resp = get_computation_list.sync_detailed(
-            client=self.client,
-            project_id=self.get_id(),
-            per_page=num_computations,
-            order=models.GetComputationListOrder.DESC,
-            sort_by=models.GetComputationListSortBy.UPDATEDAT,
-        )
-        validate_response(resp)
-        return resp.parsed.items
+                If None, all the computations run on this project are fetched.
+            per_page (int, optional): Maximum number of computations fetched per request. Defaults to 50.
+        """
+        page_size = per_page
+        if num_computations is not None:
+            page_size = max(min(per_page, num_computations), 1)
+        computations: list[models.Computation] = []
+        seen = set()
+        page = 1
+        while num_computations is None or len(computations) < num_computations:
+            resp = get_computation_list.sync_detailed(
+                client=self.client,
+                project_id=self.get_id(),
+                page=page,
+                per_page=page_size,
+                order=models.GetComputationListOrder.DESC,
+                sort_by=models.GetComputationListSortBy.UPDATEDAT,
+            )
+            validate_response(resp)
+            items: list[models.Computation] = value_if_unset(resp.parsed.items, [])
+            # Computations updated while paging can appear on two pages.
+            for item in items:
+                if item.id not in seen:
+                    seen.add(item.id)
+                    computations.append(item)
+            total = value_if_unset(resp.parsed.total, None)
+            if len(items) < page_size or (
+                total is not None and page * page_size >= total
+            ):
+                break
+            page += 1
+        if num_computations is not None:
+            computations = computations[:num_computations]
+        return computations
 
-    def fetch_results(self) -> list[tuple[Computation, Any]]:
+    def fetch_results(
+        self,
+        num_computations: int = None,
+        max_workers: int = 8,
+        cancellation: CancellationToken = None,
+    ) -> list[tuple[Computation, Any]]:
         """
         Fetches the results of all successful computations run on this project.
 
         Retrieves the list of all computations that have been run on this project,
-        then fetches and post-processes the results of all successful ones.
+        then fetches and post-processes the results of all successful ones. Computations
+        are loaded without modifying the project, and their results are fetched concurrently.
+
+        Args:
+            num_computations (int, optional): maximum number of (latest) computations to consider.
+                If None (default), all computations run on this project are considered.
+            max_workers (int, optional): maximum number of results fetched in parallel. Defaults to 8.
+            cancellation (CancellationToken, optional): if this token is cancelled, results that are
+                not yet being fetched are skipped and a ComputationCancelledError is raised.
 
         Returns:
             A list of pairs (`Computation`, result) consisting of the computation definition
@@ -669,23 +732,43 @@ class Project:
             specific computation being run). If a computation is not supported by the SDK,
             it is skipped and its result will not be included.
         """
-        output = []
-        for computation in self.get_computations():
-            if computation.status == models.ComputationStatus.SUCCESS and is_set(
-                computation.definition
-            ):
-                if (
-                    computation.definition.type
-                    == models.ComputationType.COLLECTIVEKEYSWITCH
-                ):
-                    continue
-                try:
-                    comp: Computation = self.get_computation(computation.definition)
-                except ValueError as err:
-                    warnings.warn(f"A computation could not be loaded: {err}")
-                    continue
-                result = comp.fetch_results(computation)
-                output.append((comp, result))
+        computations = [
+            computation
+            for computation in self.get_computations(num_computations)
+            if computation.status == models.ComputationStatus.SUCCESS
+            and is_set(computation.definition)
+            and computation.definition.type
+            != models.ComputationType.COLLECTIVEKEYSWITCH
+        ]
+
+        def fetch(computation: models.Computation) -> tuple[Computation, Any] | None:
+            if cancellation is not None:
+                cancellation.raise_if_cancelled()
+            try:
+                comp: Computation = self.get_computation(computation.definition)
+            except ValueError as err:
+                warnings.warn(f"A computation could not be loaded: {err}")
+                return None
+            return comp, comp.fetch_results(computation, cancellation=cancellation)
+
+        # Patches are disabled once for all workers, as the flag is shared by all threads.
+        results, error = [], None
+        with self.disable_patch():
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(fetch, c) for c in computations]
+                for future in futures:
+                    try:
+                        results.append(future.result())
+                    # pylint: disable=broad-exception-caught
+                    except Exception as err:
+                        # The first error is raised once all workers have stopped.
+                        error = error or err
+                        if isinstance(err, ComputationCancelledError):
+                            # Fetches that have not started yet are dropped.
+                            executor.shutdown(wait=False, cancel_futures=True)
+        if error is not None:
+            raise error
+        output = [r for r in results if r is not None]
         # Revert the order of entries (they are in reverse chronological order in the answer).
         return output[::-1]
 
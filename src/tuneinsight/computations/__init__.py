@@ -45,6 +45,7 @@ from tuneinsight.computations import Aggregation
 
 from .aggregation import Aggregation, Sum
 from .base import Computation, ComputationResult, KeySwitch, ModelBasedComputation
+from .cancellation import CancellationToken, ComputationCancelledError
 from .count import Count, DatasetLength
 from .distribution import Distribution, Histogram
 from .encrypted_mean import EncryptedMean
@@ -53,6 +54,7 @@ from .filtered_aggregation import FilteredAggregation
 from .heatmap import HeatMap
 from .hybrid_fl import HybridFL
 from .intersection import Matching
+from .pipeline import Pipeline
 from .regression import LinearRegression, LogisticRegression, PoissonRegression
 from .stats import Statistics
 from .survival import SurvivalAnalysis, SurvivalParameters
@@ -8,6 +8,7 @@ from tuneinsight.api.sdk import models
 from tuneinsight.api.sdk.types import UNSET, is_set, none_if_unset, false_if_unset
 from tuneinsight.client.dataobject import DataContent
 from tuneinsight.computations.base import ModelBasedComputation
+from tuneinsight.utils.binning import sketch_columns
 from tuneinsight.utils.plots import hist_grouped, hist
 
 
@@ -93,6 +94,7 @@ class Aggregation(ModelBasedComputation):
                     ('column',[bin_edge_1,...,bin_edge_k]): groups are determined using numerical bins with varying bin sizes determined
                         by the provided list of cuts. This results in intervals such as (,0), [0,40), [40,50), [50,).
                     list[`models.GroupingParameters`]: to directly specify the grouping parameters using the API models.
+                        Cuts estimated from local data can be obtained with `utils.binning.QuantileSketch.grouping_parameters`.
 
             include_count (bool, optional):
                 Controls whether the output will contain the total number of aggregated records.
@@ -246,7 +248,12 @@ class Aggregation(ModelBasedComputation):
                 ), "possible_values must be defined for categorical values when using differential privacy."
 
     def compute_approximate_quantiles(
-        self, column: str, min_v: float = 0, max_v: float = 200, local: bool = False
+        self,
+        column: str,
+        min_v: float = None,
+        max_v: float = None,
+        local: bool = False,
+        sample: pd.DataFrame | str = None,
     ) -> pd.DataFrame:
         """
         Computes the approximated averaged quantiles of a column of the collective dataset.
@@ -262,13 +269,23 @@ class Aggregation(ModelBasedComputation):
 
         Args:
             column (str): the column of the variable to compute the averaged quantiles from
-            min_v (float, optional): the minimum bound that the value can take. Defaults to 0.
-            max_v (float, optional): the maximum bound that the value can take. Defaults to 200.
+            min_v (float, optional): the minimum bound that the value can take. Defaults to the minimum
+                of the sample if provided, 0 otherwise.
+            max_v (float, optional): the maximum bound that the value can take. Defaults to the maximum
+                of the sample if provided, 200 otherwise.
             local (bool, optional): whether or not to compute the quantiles locally. Defaults to False.
+            sample (pd.DataFrame | str, optional): local data (a DataFrame or a CSV file) from which
+                to estimate the bounds of the column (see `utils.binning.sketch_columns`).
 
         Returns:
             pd.DataFrame: a dataframe with one row recording all quantiles and the total number of data points
         """
+        if sample is not None and (min_v is None or max_v is None):
+            sample_min, sample_max = sketch_columns(sample, [column])[column].bounds()
+            min_v = sample_min if min_v is None else min_v
+            max_v = sample_max if max_v is None else max_v
+        min_v = 0 if min_v is None else min_v
+        max_v = 200 if max_v is None else max_v
         # Run an Aggregation, where the input is preprocessed to be quantiles.
         self.preprocessing.quantiles(column, min_v, max_v)
         df = self.run(local=local)
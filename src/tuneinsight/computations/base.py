@@ -10,6 +10,7 @@ modules in tuneinsight.computations.*.
 """
 
 from abc import ABC, abstractmethod
+import hashlib
 import json
 from typing import Any
 import warnings
@@ -24,6 +25,7 @@ from tuneinsight.api.sdk.api.api_computations import (
     compute,
     get_computation,
     documentation,
+    stop_computation,
 )
 from tuneinsight.api.sdk.api.api_project import post_project_computation
 
@@ -33,6 +35,15 @@ from tuneinsight.client import e2ee
 from tuneinsight.client.validation import validate_response
 from tuneinsight.client.dataobject import DataObject, Result, DataContent
 from tuneinsight.computations.errors import raise_computation_error
+from tuneinsight.computations.cancellation import (
+    CancellationToken,
+    ComputationCancelledError,
+)
+from tuneinsight.computations.polling import (
+    PollingStrategy,
+    ExponentialPolling,
+    server_polling_hint,
+)
 from tuneinsight.utils import time_tools
 from tuneinsight.utils.display import Renderer
 
@@ -71,9 +82,13 @@ class Computation(ABC):
     local_input: models.LocalInput
     max_timeout: int
     polling_initial_interval: int
+    # Decides how long to wait between polls (defaults to ExponentialPolling if None).
+    polling_strategy: PollingStrategy
     precision: int
     ignore_boundary_checks: bool
     debug: bool
+    # Optional on-disk record of launched computations, to resume them after a restart.
+    journal: "ComputationJournal"  # type: ignore
     # If the computation times out, it is stored so that it can be resumed.
     _timedout_computation: models.Computation = None
     # Output: the result from computations run on the instance.
@@ -104,6 +119,9 @@ class Computation(ABC):
         self.local_input = None
         self.recorded_computations = []
         self.max_timeout = 600 * time_tools.SECOND
+        self.polling_strategy = None
+        self.journal = None
+        self._polling_hint = None
         self.precision = None
         self.ignore_boundary_checks = False
         self.debug = False
@@ -111,11 +129,36 @@ class Computation(ABC):
         self._last_raw_results = None
         # Once the parameters are set, set this as a computation in the project.
         # The project computation will be overwritten at each .run -- this is used for authorization purposes.
-        self.project.set_computation(self.get_full_model())
+        model = self.get_full_model()
+        self.project.set_computation(model, fingerprint=self._fingerprint(model))
+
+    def _fingerprint(self, model: models.ComputationDefinition) -> str:
+        """
+        Returns a hash of the full definition of this computation (from get_full_model).
+
+        The preprocessing parameters, which can be large, are not serialized: the structural
+        hashes maintained by the PreprocessingBuilder are used instead.
+        """
+        preprocessing = model.preprocessing_parameters
+        model.preprocessing_parameters = UNSET
+        hashes = [json.dumps(model.to_dict(), sort_keys=True, default=str)]
+        model.preprocessing_parameters = preprocessing
+        hashes.append(self.preprocessing.structural_hash())
+        lds = self.project.local_data_selection
+        if lds is not None and is_set(lds.preprocessing):
+            hashes.append(lds.preprocessing.structural_hash())
+        return hashlib.sha256("\n".join(hashes).encode("utf-8")).hexdigest()
 
     def _patch_project(self):
         """Called whenever the preprocessing or datasource is updated."""
-        self.project.set_computation(self)
+        model = self.get_full_model()
+        # Skip the update if the project already has this definition. The fingerprint
+        # is stored in the project, since other computations may have set theirs since.
+        fingerprint = self._fingerprint(model)
+        # pylint: disable=protected-access
+        if fingerprint == self.project._computation_fingerprint:
+            return
+        self.project.set_computation(model, fingerprint=fingerprint)
 
     # Methods to override.
 
@@ -157,6 +200,7 @@ class Computation(ABC):
         return comp.status in (
             models.ComputationStatus.ERROR,
             models.ComputationStatus.SUCCESS,
+            models.ComputationStatus.CANCELLED,
         )
 
     @staticmethod
@@ -280,6 +324,8 @@ class Computation(ABC):
             client=self.client, computation_id=comp.id
         )
         validate_response(response)
+        # The instance can request clients to slow down polling.
+        self._polling_hint = server_polling_hint(response.headers)
         return response.parsed
 
     def set_local_input(self, df: pd.DataFrame):
@@ -320,37 +366,45 @@ class Computation(ABC):
             end="",
         )
 
-    def _poll_computation(
+    def wait_for_completion(
         self,
         comp: models.Computation,
         interval: int = 100 * time_tools.MILLISECOND,
         max_sleep_time: int = 30 * time_tools.SECOND,
         verbose: bool = False,
-    ) -> list[Result] | list[DataObject]:
+        cancellation: CancellationToken = None,
+    ) -> models.Computation:
         """
-        Waits until a [models.]computation is finished and returns its result(s).
+        Waits until a [models.]computation is finished, without fetching its results.
 
-        This attempts to fetch the results of a computation until it succeeds,
-        or at least self.max_timeout seconds have passed.
-
-        This function is intended for internal use. In principle, the computation
-        doesn't need to be the output of the computation model in this object
-        (self.model), but that is not recommended.
+        This polls the computation until it completes, or at least self.max_timeout
+        seconds have passed. The time to wait between polls is decided by
+        self.polling_strategy (see `computations.polling`). Use this to wait for a
+        computation launched with run_async whose results stay on the instance (e.g.,
+        to use them as input of another computation).
 
         Args:
             comp (models.Computation): the computation to wait for.
             interval (int, optional): time in nanoseconds to wait between polls.
             max_sleep_time (int, optional): maximum total time in nanoseconds to wait between polls.
+            cancellation (CancellationToken, optional): if this token is cancelled while waiting,
+                the computation is stopped on the instance and a ComputationCancelledError is raised.
 
         Returns:
-            list[Result] or list[DataObject]: the result of the computation, parsed as a
-               Result object. If no result is provided (which can happen in some corner cases),
-               the list of dataobjects containing data results is returned instead.
+            models.Computation: the completed computation, which has at least one result.
+
+        Raises:
+            TimeoutError: if the computation takes longer than self.max_timeout.
+            ComputationCancelledError: if the computation was cancelled.
         """
         # Define initial sleeping time and start time.
         start_time = time_tools.now()
         sleep_time = interval
         current_comp = comp
+        strategy = self.polling_strategy
+        if strategy is None:
+            strategy = ExponentialPolling()
+        strategy.start(interval, max_sleep_time, now=start_time)
 
         # Poll the computation until done.
         while not self._is_done(current_comp):
@@ -361,18 +415,26 @@ class Computation(ABC):
                     + "While .run has timed out, the computation is still running in the backend. "
                     + "Use .run(resume_timedout=True) to poll the computation again and wait for results."
                 )
-            time_tools.sleep(sleep_time)
+            if cancellation is None:
+                time_tools.sleep(sleep_time)
+            elif cancellation.wait(sleep_time):
+                self._stop_computation(current_comp)
+                cancellation.raise_if_cancelled()
             current_comp = self._refresh(comp)
             if verbose:
                 self._display_poll_status(current_comp)
             if len(current_comp.warnings) > 0:
                 warnings.warn(current_comp.warnings[len(current_comp.warnings) - 1])
-            if sleep_time < max_sleep_time:
-                sleep_time = int(sleep_time * 1.05)
+            sleep_time = strategy.next_interval(
+                current_comp, time_tools.now(), hint=self._polling_hint
+            )
 
         # Reset the last timed out computation.
         self._timedout_computation = None
 
+        if current_comp.status == models.ComputationStatus.CANCELLED:
+            raise ComputationCancelledError("stopped on the instance")
+
         # Raise an exception if there is was an error during the computation.
         if (current_comp.status == models.ComputationStatus.ERROR) or (
             len(comp.errors) > 0
@@ -382,6 +444,42 @@ class Computation(ABC):
         if len(current_comp.results) < 1:
             raise ValueError("The computation has no results.")
 
+        return current_comp
+
+    def _poll_computation(
+        self,
+        comp: models.Computation,
+        interval: int = 100 * time_tools.MILLISECOND,
+        max_sleep_time: int = 30 * time_tools.SECOND,
+        verbose: bool = False,
+        cancellation: CancellationToken = None,
+    ) -> list[Result] | list[DataObject]:
+        """
+        Waits until a [models.]computation is finished and returns its result(s).
+
+        This waits for the computation to complete (see `wait_for_completion`),
+        then fetches its results.
+
+        This function is intended for internal use. In principle, the computation
+        doesn't need to be the output of the computation model in this object
+        (self.model), but that is not recommended.
+
+        Args:
+            comp (models.Computation): the computation to wait for.
+            interval (int, optional): time in nanoseconds to wait between polls.
+            max_sleep_time (int, optional): maximum total time in nanoseconds to wait between polls.
+            cancellation (CancellationToken, optional): if this token is cancelled while waiting,
+                the computation is stopped on the instance and a ComputationCancelledError is raised.
+
+        Returns:
+            list[Result] or list[DataObject]: the result of the computation, parsed as a
+               Result object. If no result is provided (which can happen in some corner cases),
+               the list of dataobjects containing data results is returned instead.
+        """
+        current_comp = self.wait_for_completion(
+            comp, interval, max_sleep_time, verbose, cancellation
+        )
+
         # Update recorded computation.
         self.recorded_computations.append(current_comp)
 
@@ -409,6 +507,32 @@ class Computation(ABC):
 
         return [Result.fetch_from_id(r_id, self.client) for r_id in result_ids]
 
+    def _stop_computation(self, comp: models.Computation):
+        """
+        Stops a running computation on the instance and deletes its intermediate data objects.
+
+        Errors are reported as warnings, as this is used to clean up after a cancellation.
+
+        Args:
+            comp (models.Computation): the computation to stop.
+        """
+        try:
+            response = stop_computation.sync_detailed(
+                computation_id=comp.id, client=self.client
+            )
+            validate_response(response)
+            comp = self._refresh(comp)
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            warnings.warn(f"Failed to stop computation {comp.id}: {err}")
+            return
+        for dataobject_id in value_if_unset(comp.results, []):
+            try:
+                DataObject.fetch_from_id(dataobject_id, self.client).delete()
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                warnings.warn(f"Failed to delete data object {dataobject_id}: {err}")
+        if self.journal is not None:
+            self.journal.record_completion(comp.id, error="cancelled")
+
     def _launch(self, model: models.ComputationDefinition) -> models.Computation:
         """
         Launches this computation, given its current API model.
@@ -427,8 +551,12 @@ class Computation(ABC):
         # which does not require a project to be specified, or using the project API.
         project_id = self.project.get_id()
         if project_id is None or project_id == "":
-            return self._launch_with_compute(model)
-        return self._launch_with_project(model)
+            computation = self._launch_with_compute(model)
+        else:
+            computation = self._launch_with_project(model)
+        if self.journal is not None:
+            self.journal.record_launch(computation, project_id=project_id)
+        return computation
 
     def _launch_with_compute(self, comp):
         """
@@ -473,6 +601,7 @@ class Computation(ABC):
         self,
         local: bool = False,
         on_previous_result: models.DataObject = None,
+        cancellation: CancellationToken = None,
     ) -> models.Computation:
         """
         Launches this computation asynchronously.
@@ -486,6 +615,9 @@ class Computation(ABC):
             local (bool, optional): Whether to run the computation locally or remotely. Defaults to False.
             on_previous_result (models.DataObject,optional): remote object (usually output from another computation) to
                 use as an input. This overrides the datasource of the project.
+            cancellation (CancellationToken, optional): if this token is already cancelled, the
+                computation is not launched. Pass the same token to fetch_results to stop the
+                computation when the token is cancelled.
         """
         # Perform optional checks to have user-friendly messages in case something is missing.
         self._pre_run_check()
@@ -496,6 +628,8 @@ class Computation(ABC):
         )
 
         # Start the computation and wait until it finishes.
+        if cancellation is not None:
+            cancellation.raise_if_cancelled()
         computation = self._launch(model)
         return computation
 
@@ -507,6 +641,7 @@ class Computation(ABC):
         on_previous_result: models.DataObject = None,
         resume_timedout: bool = False,
         verbose: bool = False,
+        cancellation: CancellationToken = None,
     ) -> Any:
         """
         Runs this computation.
@@ -523,6 +658,10 @@ class Computation(ABC):
             resume_timedout (bool, False by default): whether to resume a computation that previously timed
                 out. This will raise an error if the last computation did not time out. When resuming a
                 timed out computation, all current changes to this computation are ignored, but not overwritten.
+            verbose (bool, optional): whether to display the progress of the computation.
+            cancellation (CancellationToken, optional): token used to cancel the computation. When it
+                is cancelled (or its deadline passes), the computation is stopped on the instance and a
+                ComputationCancelledError is raised.
 
         """
         # Perform optional checks to have user-friendly messages in case something is missing.
@@ -537,13 +676,19 @@ class Computation(ABC):
         )
 
         # Start the computation and wait until it finishes.
+        if cancellation is not None:
+            cancellation.raise_if_cancelled()
         if resume_timedout:
             computation = self._timedout_computation
         else:
             computation = self._launch(model)
 
         results = self.fetch_results(
-            computation, interval, max_sleep_time, verbose=verbose
+            computation,
+            interval,
+            max_sleep_time,
+            verbose=verbose,
+            cancellation=cancellation,
         )
 
         return results
@@ -554,6 +699,7 @@ class Computation(ABC):
         interval: int = 100 * time_tools.MILLISECOND,
         max_sleep_time: int = 30 * time_tools.SECOND,
         verbose: bool = False,
+        cancellation: CancellationToken = None,
     ):
         """
         Fetches results for a `models.Computation` that has been started on the backend.
@@ -568,18 +714,26 @@ class Computation(ABC):
                 a computation definition. You can retrieve this from the project definition.
             interval (int, optional): time in nanoseconds to wait between polls.
             max_sleep_time (int, optional): maximum total time in nanoseconds to wait.
+            verbose (bool, optional): whether to display the progress of the computation.
+            cancellation (CancellationToken, optional): token used to cancel the computation. When it
+                is cancelled (or its deadline passes), the computation is stopped on the instance and a
+                ComputationCancelledError is raised.
         """
         # Handle the edge case where the types of the computation that was run and this computation
         # mismatch (e.g. if a user without the proper permissions tries to edit the project).
         if computation.definition.type != self._get_model().type:
             comp = self.project.get_computation(computation.definition)
-            return comp.fetch_results(computation, interval, max_sleep_time)
+            comp.journal = self.journal
+            return comp.fetch_results(
+                computation, interval, max_sleep_time, verbose, cancellation
+            )
 
         results: list[Result] | list[DataObject] = self._poll_computation(
             comp=computation,
             interval=interval,
             max_sleep_time=max_sleep_time,
             verbose=verbose,
+            cancellation=cancellation,
         )
 
         # If using end-to-end encryption, decrypt each encrypted result.
@@ -595,6 +749,10 @@ class Computation(ABC):
         # The last unprocessed results are stored for debug purposes.
         self._last_raw_results = results
 
+        # Once the results are retrieved, the computation no longer needs to be resumed.
+        if self.journal is not None:
+            self.journal.record_completion(computation.id)
+
         # Perform (optional) post-processing of the results if in plaintext.
         if results[0].is_encrypted():
             return self._process_encrypted_results(results)
@@ -0,0 +1,125 @@
+"""Cooperative cancellation and deadlines for computations.
+
+A `CancellationToken` can be passed to `Computation.run`, `Computation.run_async`,
+`Computation.fetch_results` and `Project.fetch_results`. When the token is cancelled
+(by calling `.cancel()`, possibly from another thread) or when its deadline expires,
+the computations waiting on it are stopped on the instance, and a
+`ComputationCancelledError` is raised in the waiting thread.
+
+```python
+token = CancellationToken(timeout=5 * time_tools.MINUTE)
+aggregation.run(cancellation=token)
+```
+
+Contrary to `Computation.max_timeout`, which only stops waiting for the computation
+on the client side, cancelling a token also stops the computation on the instance.
+
+"""
+
+import threading
+
+from tuneinsight.utils import time_tools
+
+
+class ComputationCancelledError(Exception):
+    """Raised when waiting for a computation is interrupted by a cancellation token."""
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(f"The computation was cancelled: {reason}.")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    A token signalling that computations should be cancelled.
+
+    A token is cancelled either manually, with `.cancel()`, or when its deadline has
+    passed. Tokens can be shared between threads: cancelling a token interrupts all
+    threads currently waiting on it. Child tokens (see `.child()`) are cancelled when
+    their parent is, and can have a shorter deadline.
+    """
+
+    def __init__(self, timeout: int = None, deadline: int = None, parent=None):
+        """
+        Creates a new token.
+
+        Args:
+            timeout (int, optional): time in nanoseconds after which the token expires.
+            deadline (int, optional): absolute time (in nanoseconds since the epoch, see
+                `time_tools.now`) at which the token expires. If both timeout and deadline
+                are set, the earliest is used.
+            parent (CancellationToken, optional): a token whose cancellation cancels this token.
+        """
+        if timeout is not None:
+            expiry = time_tools.now() + timeout
+            deadline = expiry if deadline is None else min(deadline, expiry)
+        if parent is not None and parent.deadline is not None:
+            deadline = (
+                parent.deadline if deadline is None else min(deadline, parent.deadline)
+            )
+        self.deadline = deadline
+        self.parent = parent
+        self._event = threading.Event()
+        self._reason = None
+
+    def cancel(self, reason: str = "cancelled by the user"):
+        """Cancels this token, interrupting all threads waiting on it."""
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    def child(self, timeout: int = None) -> "CancellationToken":
+        """Returns a token that is cancelled when this one is, with an optional shorter timeout."""
+        return CancellationToken(timeout=timeout, parent=self)
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether this token has been cancelled or has expired."""
+        return self.reason is not None
+
+    @property
+    def reason(self) -> str | None:
+        """The reason why this token was cancelled, or None if it is still active."""
+        if self._event.is_set():
+            return self._reason
+        if self.parent is not None and self.parent.cancelled:
+            return self.parent.reason
+        if self.deadline is not None and time_tools.now() >= self.deadline:
+            return "deadline exceeded"
+        return None
+
+    def remaining(self) -> int | None:
+        """Returns the time in nanoseconds before the deadline, or None if there is no deadline."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time_tools.now(), 0)
+
+    def raise_if_cancelled(self):
+        """Raises a ComputationCancelledError if this token is cancelled."""
+        reason = self.reason
+        if reason is not None:
+            raise ComputationCancelledError(reason)
+
+    def wait(self, duration: int) -> bool:
+        """
+        Waits for some time, returning early if the token is cancelled.
+
+        Args:
+            duration (int): maximum time in nanoseconds to wait.
+
+        Returns:
+            bool: whether the token is cancelled.
+        """
+        end = time_tools.now() + duration
+        # Parents are not waited on directly: they are checked at least every 100 milliseconds.
+        step = None if self.parent is None else 100 * time_tools.MILLISECOND
+        while not self.cancelled:
+            remaining = end - time_tools.now()
+            if self.deadline is not None:
+                remaining = min(remaining, self.deadline - time_tools.now())
+            if remaining <= 0:
+                break
+            if step is not None:
+                remaining = min(remaining, step)
+            self._event.wait(remaining / time_tools.SECOND)
+        return self.cancelled
@@ -1,6 +1,9 @@
 """Classes defining dataset schemas to constrain acceptable data formats."""
 
-from typing import Any
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
 
 # from tuneinsight.client import DataSource
 from tuneinsight.client.validation import validate_response
@@ -267,7 +270,7 @@ class DatasetSchema:
             self (DatasetSchema): the updated schema
         """
         col = self.get_column(name)
-        col.checks.isin = vals
+        col.checks.notin = vals
         return self
 
     def required(self, name: str, required: bool):
@@ -300,7 +303,7 @@ class DatasetSchema:
 
     def nullable(self, name: str, nullable: bool):
         """
-        Sets whether a column is nullable (True by default).
+        Sets whether a column is nullable (False by default).
 
         Args:
             name (str): the name of the column
@@ -326,6 +329,53 @@ class DatasetSchema:
         col.coerce = coerce
         return self
 
+    def validate(self, df: pd.DataFrame) -> "SchemaValidationReport":
+        """
+        Validates data locally against this schema.
+
+        All the checks of each column are evaluated on the whole column at once. As for the
+        validation in the instance, checks other than nullable are not applied to missing values,
+        and columns that are not in the schema are ignored. Values are checked against the dtype
+        of their column by converting them to this type (since data is uploaded as text, `coerce`
+        does not change the result): values that cannot be converted are violations.
+
+        Args:
+            df (pd.DataFrame): the data to validate.
+
+        Returns:
+            SchemaValidationReport: the rows that violate each check, and the missing columns.
+        """
+        violations = {}
+        missing_columns = []
+        for name, column in self.cols.items():
+            if name not in df.columns:
+                if value_if_unset(column.required, True) is not False:
+                    missing_columns.append(name)
+                continue
+            for check, mask in _column_violations(df[name], column):
+                violations[(name, check)] = mask
+        violations = pd.DataFrame(violations, index=df.index, dtype=bool)
+        violations.columns = pd.MultiIndex.from_tuples(
+            violations.columns, names=["column", "check"]
+        )
+        return SchemaValidationReport(violations, missing_columns, len(df))
+
+    def validate_chunks(
+        self, chunks: Iterable[pd.DataFrame]
+    ) -> Iterator[tuple[pd.DataFrame, "SchemaValidationReport"]]:
+        """
+        Validates data given in chunks (e.g., read from a large CSV file) against this schema.
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): the chunks of data, e.g. `pd.read_csv(path, chunksize=n)`.
+
+        Yields:
+            tuple[pd.DataFrame, SchemaValidationReport]: each chunk and its validation report.
+                Reports can be aggregated with `SchemaValidationReport.combine`.
+        """
+        for chunk in chunks:
+            yield chunk, self.validate(chunk)
+
     def display(self):
         """Renders this dataset schema in a human-readable format."""
         display_dataset_schema(self)
@@ -336,6 +386,204 @@ class DatasetSchema:
         return self.model.name
 
 
+class SchemaValidationReport:
+    """
+    The result of the local validation of data against a dataset schema.
+
+    Attributes:
+        violations (pd.DataFrame): boolean masks of the rows that violate each check, with
+            the same index as the data and one (column, check) pair per column. This is None
+            for reports aggregated without masks.
+        counts (pd.Series): the number of rows that violate each check, by (column, check).
+        missing_columns (list[str]): the required columns that are missing from the data.
+        num_rows (int): the number of rows of the data.
+        num_invalid_rows (int): the number of rows that violate at least one check.
+    """
+
+    def __init__(
+        self,
+        violations: pd.DataFrame,
+        missing_columns: list[str],
+        num_rows: int,
+        counts: pd.Series = None,
+        num_invalid_rows: int = None,
+    ):
+        self.violations = violations
+        self.missing_columns = missing_columns
+        self.num_rows = num_rows
+        self.counts = violations.sum().astype(int) if counts is None else counts
+        if num_invalid_rows is None:
+            num_invalid_rows = int(self.invalid_rows.sum())
+        self.num_invalid_rows = num_invalid_rows
+
+    @property
+    def invalid_rows(self) -> pd.Series:
+        """A boolean mask of the rows that violate at least one check."""
+        return self.violations.any(axis=1)
+
+    @property
+    def ok(self) -> bool:
+        """Whether the data matches the schema."""
+        return not self.missing_columns and self.num_invalid_rows == 0
+
+    @classmethod
+    def combine(
+        cls, reports: Iterable["SchemaValidationReport"], keep_violations: bool = True
+    ) -> "SchemaValidationReport":
+        """
+        Aggregates the reports of several chunks of the same data.
+
+        Args:
+            reports (Iterable[SchemaValidationReport]): the reports of each chunk.
+            keep_violations (bool, optional): whether to concatenate the violation masks of the
+                chunks. If False, only the counts are kept, which uses constant memory.
+        """
+        masks, missing, counts = [], [], None
+        num_rows = num_invalid_rows = 0
+        for report in reports:
+            if keep_violations:
+                masks.append(report.violations)
+            missing.extend(c for c in report.missing_columns if c not in missing)
+            counts = report.counts if counts is None else counts.add(report.counts)
+            num_rows += report.num_rows
+            num_invalid_rows += report.num_invalid_rows
+        if counts is None:
+            counts = pd.Series(dtype=int)
+        violations = pd.concat(masks) if masks else None
+        return cls(violations, missing, num_rows, counts, num_invalid_rows)
+
+    def summary(self) -> str:
+        """Returns a human-readable summary of the violations."""
+        lines = [f"{self.num_invalid_rows} invalid rows out of {self.num_rows}."]
+        if self.missing_columns:
+            lines.append(f"Missing columns: {', '.join(self.missing_columns)}.")
+        for (column, check), count in self.counts.items():
+            if count > 0:
+                lines.append(f"  {column}: {count} values violate {check}.")
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return self.summary()
+
+
+def _dtype_kind(dtype: str) -> str:
+    """Returns the kind of values (int, float, bool, datetime or None for any) of a dtype."""
+    if not isinstance(dtype, str):
+        return None
+    dtype = dtype.lower()
+    for prefix, kind in [
+        ("int", "int"),
+        ("uint", "int"),
+        ("float", "float"),
+        ("bool", "bool"),
+        ("datetime", "datetime"),
+        ("date", "datetime"),
+        ("timestamp", "datetime"),
+    ]:
+        if dtype.startswith(prefix):
+            return kind
+    return None
+
+
+_BOOLEAN_STRINGS = {"true": True, "false": False, "1": True, "0": False}
+
+
+def _convert(values: pd.Series, kind: str) -> tuple[pd.Series, pd.Series]:
+    """Converts values to a kind of dtype, returning the converted values and a mask of failures."""
+    if kind in ("int", "float"):
+        converted = pd.to_numeric(values, errors="coerce")
+        failed = converted.isna()
+        if kind == "int":
+            failed |= (converted % 1).fillna(0) != 0
+    elif kind == "bool":
+        if pd.api.types.is_bool_dtype(values):
+            converted = values
+        else:
+            converted = values.astype(str).str.strip().str.lower().map(_BOOLEAN_STRINGS)
+        failed = converted.isna()
+    elif kind == "datetime":
+        converted = pd.to_datetime(values, errors="coerce", format="mixed")
+        failed = converted.isna()
+    else:
+        return values, pd.Series(False, index=values.index)
+    return converted, failed
+
+
+def _compare(values: pd.Series, bound: Any, compare) -> pd.Series:
+    """Returns a mask of the values that satisfy a comparison with a bound."""
+    if isinstance(bound, (int, float)) and not pd.api.types.is_numeric_dtype(values):
+        # Values that are not numbers do not satisfy numerical comparisons.
+        values = pd.to_numeric(values, errors="coerce")
+    try:
+        return pd.Series(compare(values, bound), index=values.index).fillna(False)
+    except TypeError:
+        return pd.Series(False, index=values.index)
+
+
+def _isin(values: pd.Series, candidates: list) -> pd.Series:
+    """Returns a mask of values in a list, comparing values as text if their types differ."""
+    return values.isin(candidates) | values.astype(str).isin(
+        [str(c) for c in candidates]
+    )
+
+
+# pylint: disable=too-many-branches
+def _column_violations(
+    values: pd.Series, column: models.ColumnSchema
+) -> list[tuple[str, pd.Series]]:
+    """Evaluates the checks of a column, returning the mask of violations of each check."""
+    null = values.isna()
+    if not pd.api.types.is_numeric_dtype(values):
+        # Empty strings are missing values once the data is uploaded.
+        null |= values.eq("")
+    violations = []
+    if not value_if_unset(column.nullable, False):
+        violations.append(("nullable", null))
+    kind = _dtype_kind(value_if_unset(column.dtype, None))
+    values, failed = _convert(values, kind)
+    if kind is not None:
+        violations.append(("dtype", failed & ~null))
+    checks = column.checks
+    if not is_set(checks) or checks is None:
+        return violations
+    # Checks apply to the non-missing values that have the right type.
+    valid = ~null & ~failed
+    comparisons = [
+        ("eq", checks.eq, np.equal),
+        ("ge", checks.ge, np.greater_equal),
+        ("gt", checks.gt, np.greater),
+        ("le", checks.le, np.less_equal),
+        ("lt", checks.lt, np.less),
+    ]
+    for name, bound, compare in comparisons:
+        if is_set(bound) and bound is not None:
+            violations.append((name, valid & ~_compare(values, bound, compare)))
+    if is_set(checks.in_range) and checks.in_range is not None:
+        in_range = checks.in_range
+        satisfied = pd.Series(True, index=values.index)
+        if is_set(in_range.min_value) and in_range.min_value is not None:
+            lower = np.greater_equal
+            if value_if_unset(in_range.include_min, True) is False:
+                lower = np.greater
+            satisfied &= _compare(values, in_range.min_value, lower)
+        if is_set(in_range.max_value) and in_range.max_value is not None:
+            upper = np.less_equal
+            if value_if_unset(in_range.include_max, True) is False:
+                upper = np.less
+            satisfied &= _compare(values, in_range.max_value, upper)
+        violations.append(("in_range", valid & ~satisfied))
+    if is_set(checks.isin) and checks.isin is not None:
+        violations.append(("isin", valid & ~_isin(values, checks.isin)))
+    if is_set(checks.notin) and checks.notin is not None:
+        violations.append(("notin", valid & _isin(values, checks.notin)))
+    if is_set(checks.str_startswith) and checks.str_startswith is not None:
+        prefix = checks.str_startswith
+        violations.append(
+            ("str_startswith", valid & ~values.astype(str).str.startswith(prefix))
+        )
+    return violations
+
+
 _dtype_names = {
     "str": "Categorical or freeform data (including identifiers)",
     "int": "Integer-valued data",
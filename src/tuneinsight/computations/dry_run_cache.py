@@ -0,0 +1,161 @@
+"""
+Incremental cache for preprocessing dry runs.
+
+A dry run (see `PreprocessingBuilder.dry_run`) infers the columns available after each
+operation of a preprocessing chain. Interactive tools typically dry-run growing or
+edited versions of the same chain: the output of the first operations is the same
+for all these chains. The `DryRunCache` stores the output of dry runs indexed by a hash
+of (chain prefix, input columns), and only sends to the instance the operations that
+follow the longest cached prefix, with the output columns of that prefix as input.
+
+By default, a cache of limited size is used by all dry runs. It can be replaced or
+disabled with `use_dry_run_cache`.
+
+"""
+
+import collections
+import hashlib
+import json
+import threading
+from typing import Callable
+
+from tuneinsight.api.sdk import models
+
+
+def _hash(previous: str, value) -> str:
+    """Combines a hash with the (sorted) JSON representation of a value."""
+    content = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256((previous + content).encode("utf-8")).hexdigest()
+
+
+def _as_column(variable: models.DataSourceVariable) -> models.DataSourceColumn:
+    """Converts an output variable of a dry run to an input column of another dry run."""
+    return models.DataSourceColumn(
+        name=variable.name, type=variable.type, type_group=variable.type_group
+    )
+
+
+class DryRunCache:
+    """
+    A bounded cache of the outputs of dry runs, indexed by chain prefix and input columns.
+
+    Entries are evicted in least-recently-used order. The cache can be shared between threads.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Creates an empty cache.
+
+        Args:
+            max_entries (int, optional): maximum number of chain prefixes in the cache.
+        """
+        self.max_entries = max_entries
+        # Each entry holds the output of the input step (if returned by the instance) and
+        # the output of each operation of the prefix.
+        self._entries: collections.OrderedDict[str, tuple[list, list]] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # Number of operations sent to / reused from the cache, for monitoring purposes.
+        self.sent_operations = 0
+        self.reused_operations = 0
+
+    @staticmethod
+    def _prefix_keys(
+        scope: str,
+        chain: list[models.PreprocessingOperation],
+        columns: list[models.DataSourceColumn],
+    ) -> list[str]:
+        """Returns the keys of all prefixes of the chain (from the empty prefix to the chain)."""
+        keys = [_hash(scope, [c.to_dict() for c in columns])]
+        for operation in chain:
+            keys.append(_hash(keys[-1], operation.to_dict()))
+        return keys
+
+    def _put(self, key: str, head: list, steps: list):
+        self._entries[key] = (head, steps)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def dry_run(
+        self,
+        chain: list[models.PreprocessingOperation],
+        columns: list[models.DataSourceColumn],
+        run: Callable[
+            [list[models.PreprocessingOperation], list[models.DataSourceColumn]],
+            list[list[models.DataSourceVariable]],
+        ],
+        scope: str = "",
+    ) -> list[list[models.DataSourceVariable]]:
+        """
+        Dry-runs a chain, reusing the cached output of its longest cached prefix.
+
+        Args:
+            chain (list[models.PreprocessingOperation]): the preprocessing operations.
+            columns (list[models.DataSourceColumn]): the input columns.
+            run: the function that dry-runs a chain on the instance, for the operations
+                that are not cached.
+            scope (str, optional): an identifier of the instance, so that outputs from
+                different instances are not mixed.
+
+        Returns:
+            list[list[models.DataSourceVariable]]: the output variables at each step.
+        """
+        if not chain:
+            return run(chain, columns)
+        keys = self._prefix_keys(scope, chain, columns)
+        depth, head, steps = 0, None, []
+        with self._lock:
+            for length in range(len(chain), 0, -1):
+                if keys[length] in self._entries:
+                    self._entries.move_to_end(keys[length])
+                    depth = length
+                    head, steps = self._entries[keys[length]]
+                    break
+            self.reused_operations += depth
+            self.sent_operations += len(chain) - depth
+        if depth < len(chain):
+            suffix = chain[depth:]
+            suffix_columns = columns
+            if depth > 0:
+                suffix_columns = [_as_column(v) for v in steps[-1]]
+            output = run(suffix, suffix_columns)
+            # The instance may also return the input columns before the output of each step:
+            # these are only kept for the original input columns.
+            offset = len(output) - len(suffix)
+            if head is None:
+                head = output[:offset]
+            steps = steps + output[offset:]
+            with self._lock:
+                for length in range(depth + 1, len(chain) + 1):
+                    self._put(keys[length], head, steps[:length])
+        return list(head or []) + list(steps)
+
+    def clear(self):
+        """Removes all the entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# The cache used by default by PreprocessingBuilder.dry_run (None: no caching).
+_default_dry_run_cache: DryRunCache = DryRunCache()
+
+
+def use_dry_run_cache(cache: DryRunCache = None):
+    """
+    Sets the cache used by default for dry runs.
+
+    Args:
+        cache (DryRunCache, optional): the cache to use. If None, dry runs are not cached.
+    """
+    global _default_dry_run_cache  # pylint: disable=global-statement
+    _default_dry_run_cache = cache
+
+
+def get_dry_run_cache() -> DryRunCache:
+    """Returns the cache used by default for dry runs (or None if caching is disabled)."""
+    return _default_dry_run_cache
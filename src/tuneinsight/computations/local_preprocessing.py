@@ -0,0 +1,464 @@
+"""Local execution of preprocessing chains on pandas DataFrames.
+
+Preprocessing chains are normally executed by the Tune Insight instance on the data of
+each node. This module interprets a chain on a local `pandas.DataFrame` instead, which
+can be used to test and profile a chain on sample data before running a collective
+computation:
+
+```python
+df = run_chain(computation.preprocessing.chain, sample_data)
+df, profile = profile_chain(computation.preprocessing.chain, sample_data)
+```
+
+Operations are implemented with vectorised pandas operations, and aim to reproduce the
+behavior of the instance. Some operations (e.g., survival or phonetic encoding) are only
+available on the instance, and raise a `ValueError` when executed locally.
+
+"""
+
+import ast
+import json
+import re
+import time
+from datetime import datetime
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from tuneinsight.api.sdk import models
+from tuneinsight.api.sdk.types import is_set, value_if_unset
+
+Type = models.PreprocessingOperationType
+
+# The API model of each type of operation.
+_OPERATION_MODELS = {
+    Type.ONEHOTENCODING: models.OneHotEncoding,
+    Type.SELECT: models.Select,
+    Type.DROP: models.Drop,
+    Type.FILTER: models.Filter,
+    Type.TRANSPOSE: models.Transpose,
+    Type.SETINDEX: models.SetIndex,
+    Type.ASTYPE: models.AsType,
+    Type.RESETINDEX: models.ResetIndex,
+    Type.RENAME: models.Rename,
+    Type.EXTRACTDICTFIELD: models.ExtractDictField,
+    Type.APPLYREGEX: models.ApplyRegEx,
+    Type.QUANTILES: models.Quantiles,
+    Type.TIMEDIFF: models.TimeDiff,
+    Type.DROPNA: models.Dropna,
+    Type.APPLYMAPPING: models.ApplyMapping,
+    Type.CUT: models.Cut,
+    Type.DEVIATIONSQUARES: models.DeviationSquares,
+    Type.ADDCOLUMNS: models.AddColumns,
+    Type.SCALE: models.Scale,
+    Type.MULTIPLYCOLUMNS: models.MultiplyColumns,
+    Type.NEWCOLUMN: models.NewColumn,
+    Type.COMPUTETIMESINCE: models.ComputeTimeSince,
+    Type.DROPDUPLICATES: models.DropDuplicates,
+    Type.FILLNA: models.FillNA,
+    Type.CUSTOM: models.Custom,
+}
+
+# Duration of each time unit, in seconds (months and years are average durations).
+_UNIT_SECONDS = {
+    models.TimeUnit.SECONDS: 1,
+    models.TimeUnit.MINUTES: 60,
+    models.TimeUnit.HOURS: 3600,
+    models.TimeUnit.DAYS: 86400,
+    models.TimeUnit.WEEKS: 7 * 86400,
+    models.TimeUnit.MONTHS: 365.25 / 12 * 86400,
+    models.TimeUnit.YEARS: 365.25 * 86400,
+}
+
+# Strings treated as missing values.
+_MISSING_VALUES = ["", "NaN", "nan"]
+
+
+def as_operation_model(op: models.PreprocessingOperation):
+    """
+    Converts a preprocessing operation to the API model of its type (e.g., models.Filter).
+
+    Chains fetched from the API contain generic `models.PreprocessingOperation` objects,
+    with the parameters of the operation stored as additional properties.
+    """
+    model = _OPERATION_MODELS.get(models.PreprocessingOperationType(op.type))
+    if model is None or isinstance(op, model):
+        return op
+    return model.from_dict(op.to_dict())
+
+
+def _as_list(chain) -> list:
+    if isinstance(chain, models.PreprocessingChain):
+        return value_if_unset(chain.chain, [])
+    return list(chain)
+
+
+def run_chain(
+    chain: models.PreprocessingChain | list[models.PreprocessingOperation],
+    df: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Runs a preprocessing chain on a local DataFrame.
+
+    ⚠️ Custom operations in the chain are executed as Python code on this machine: only
+    run chains whose custom operations you have reviewed.
+
+    Args:
+        chain (models.PreprocessingChain | list[models.PreprocessingOperation]): the chain to run.
+        df (pd.DataFrame): the input data (which is not modified).
+
+    Returns:
+        pd.DataFrame: the preprocessed data.
+    """
+    for op in _as_list(chain):
+        df = run_operation(op, df)
+    return df
+
+
+def profile_chain(
+    chain: models.PreprocessingChain | list[models.PreprocessingOperation],
+    df: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Runs a preprocessing chain on a local DataFrame, measuring the time taken by each operation.
+
+    Args:
+        chain (models.PreprocessingChain | list[models.PreprocessingOperation]): the chain to run.
+        df (pd.DataFrame): the input data (which is not modified).
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: the preprocessed data, and a profile with one row per
+            operation giving its type, duration (in seconds), and the shape of its output.
+    """
+    rows = []
+    for op in _as_list(chain):
+        start = time.perf_counter()
+        df = run_operation(op, df)
+        duration = time.perf_counter() - start
+        rows.append((str(op.type), duration, len(df), len(df.columns)))
+    profile = pd.DataFrame(rows, columns=["operation", "duration", "rows", "columns"])
+    return df, profile
+
+
+def run_operation(op: models.PreprocessingOperation, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Runs a single preprocessing operation on a local DataFrame.
+
+    Args:
+        op (models.PreprocessingOperation): the operation to run.
+        df (pd.DataFrame): the input data (which is not modified).
+
+    Returns:
+        pd.DataFrame: the output of the operation.
+    """
+    op = as_operation_model(op)
+    runner = _RUNNERS.get(models.PreprocessingOperationType(op.type))
+    if runner is None:
+        raise ValueError(f"Operation of type {op.type} cannot be run locally.")
+    return runner(op, df.copy())
+
+
+def _one_hot_encoding(op: models.OneHotEncoding, df: pd.DataFrame) -> pd.DataFrame:
+    column = df[op.input_column].astype(str)
+    values = list(value_if_unset(op.specified_types, []) or [])
+    if not value_if_unset(op.strict, False):
+        values += [v for v in column.unique() if v not in values]
+    prefix = value_if_unset(op.prefix, "") or ""
+    separator = "_" if prefix != "" else ""
+    encoded = {
+        f"{prefix}{separator}{value}": (column == str(value)).astype(int)
+        for value in values
+    }
+    return df.assign(**encoded)
+
+
+def _select(op: models.Select, df: pd.DataFrame) -> pd.DataFrame:
+    if value_if_unset(op.create_if_missing, False):
+        missing = {c: value_if_unset(op.dummy_value, "") for c in op.columns}
+        df = df.assign(**{c: v for c, v in missing.items() if c not in df.columns})
+    return df[op.columns]
+
+
+def _drop(op: models.Drop, df: pd.DataFrame) -> pd.DataFrame:
+    return df.drop(columns=op.columns)
+
+
+def _filter_mask(op: models.Filter, df: pd.DataFrame) -> pd.Series:
+    comparator = getattr(op.comparator, "value", op.comparator)
+    column = df[op.column]
+    if comparator == models.ComparisonType.ISIN:
+        return column.astype(str).isin([str(v) for v in op.values])
+    if value_if_unset(op.numerical, False):
+        column = pd.to_numeric(column, errors="coerce")
+        value = float(op.value)
+    else:
+        column = column.astype(str)
+        value = str(op.value)
+    comparisons: dict[models.ComparisonType, Callable] = {
+        models.ComparisonType.EQUAL: column.eq,
+        models.ComparisonType.NEQUAL: column.ne,
+        models.ComparisonType.GREATER: column.gt,
+        models.ComparisonType.GREATEREQ: column.ge,
+        models.ComparisonType.LESS: column.lt,
+        models.ComparisonType.LESSEQ: column.le,
+    }
+    if comparator not in comparisons:
+        raise ValueError(f"Comparator {comparator} cannot be run locally.")
+    return comparisons[comparator](value)
+
+
+def _filter(op: models.Filter, df: pd.DataFrame) -> pd.DataFrame:
+    mask = _filter_mask(op, df)
+    if is_set(op.output_column) and op.output_column:
+        df[op.output_column] = mask.astype(int)
+        return df
+    return df[mask]
+
+
+def _transpose(_, df: pd.DataFrame) -> pd.DataFrame:
+    return df.transpose()
+
+
+def _set_index(op: models.SetIndex, df: pd.DataFrame) -> pd.DataFrame:
+    return df.set_index(
+        op.columns,
+        drop=value_if_unset(op.drop, True),
+        append=value_if_unset(op.append, False),
+    )
+
+
+def _as_type(op: models.AsType, df: pd.DataFrame) -> pd.DataFrame:
+    errors = "raise" if value_if_unset(op.errors, True) else "ignore"
+    type_map = op.type_map.to_dict()
+    if errors == "ignore":
+        type_map = {c: t for c, t in type_map.items() if c in df.columns}
+    return df.astype(type_map, errors=errors)
+
+
+def _reset_index(op: models.ResetIndex, df: pd.DataFrame) -> pd.DataFrame:
+    level = value_if_unset(op.level, None) or None
+    return df.reset_index(level=level, drop=value_if_unset(op.drop, False))
+
+
+def _rename(op: models.Rename, df: pd.DataFrame) -> pd.DataFrame:
+    axis = getattr(op.axis, "value", value_if_unset(op.axis, "columns"))
+    errors = "raise" if value_if_unset(op.errors, True) else "ignore"
+    return df.rename(mapper=op.mapper.to_dict(), axis=axis, errors=errors)
+
+
+def _parse_dict(value) -> dict:
+    if isinstance(value, dict):
+        return value
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return ast.literal_eval(value)
+    except (SyntaxError, ValueError):
+        return {}
+
+
+def _extract_dict_field(op: models.ExtractDictField, df: pd.DataFrame) -> pd.DataFrame:
+    outputs = value_if_unset(op.output_columns, None) or op.input_columns
+    default = value_if_unset(op.default, np.nan)
+    for input_column, output_column in zip(op.input_columns, outputs):
+        df[output_column] = df[input_column].map(
+            lambda v: _parse_dict(v).get(op.field, default)
+        )
+    return df
+
+
+def _apply_regex(op: models.ApplyRegEx, df: pd.DataFrame) -> pd.DataFrame:
+    outputs = value_if_unset(op.output_columns, None) or op.input_columns
+    regex_type = getattr(op.regex_type, "value", op.regex_type)
+    pattern = re.compile(op.regex)
+    for input_column, output_column in zip(op.input_columns, outputs):
+        column = df[input_column].astype(str)
+        if regex_type == models.ApplyRegExRegexType.POSITION:
+            df[output_column] = column.map(
+                lambda v: (m.start() if (m := pattern.search(v)) else -1)
+            )
+        elif regex_type == models.ApplyRegExRegexType.FINDALL:
+            df[output_column] = column.map(pattern.findall)
+        else:
+            df[output_column] = column.map(
+                lambda v: (m.group(0) if (m := pattern.search(v)) else np.nan)
+            )
+    return df
+
+
+def _quantiles(op: models.Quantiles, df: pd.DataFrame) -> pd.DataFrame:
+    values = pd.to_numeric(df[op.input_column], errors="coerce").dropna()
+    quantiles = np.quantile(values, [0, 0.25, 0.5, 0.75, 1]) if len(values) else []
+    normalized = (np.asarray(quantiles) - op.min_) / (op.max_ - op.min_)
+    row = list(normalized * len(values)) + [len(values)]
+    return pd.DataFrame([row])
+
+
+def _time_diff(op: models.TimeDiff, df: pd.DataFrame) -> pd.DataFrame:
+    if value_if_unset(op.filter_na, True):
+        df = df.dropna(subset=[op.start_column, op.end_column])
+    start = pd.to_datetime(df[op.start_column], errors="coerce")
+    end = pd.to_datetime(df[op.end_column], errors="coerce")
+    interval = value_if_unset(op.interval, models.Duration(unit=models.TimeUnit.DAYS))
+    unit = models.TimeUnit(value_if_unset(interval.unit, models.TimeUnit.DAYS))
+    seconds = _UNIT_SECONDS[unit] * value_if_unset(interval.value, 1)
+    df[value_if_unset(op.output_column, "duration")] = (
+        (end - start).dt.total_seconds() // seconds
+    ).astype("Int64")
+    return df
+
+
+def _dropna(op: models.Dropna, df: pd.DataFrame) -> pd.DataFrame:
+    subset = value_if_unset(op.subset, None) or list(df.columns)
+    missing = df[subset].replace(_MISSING_VALUES, np.nan)
+    return df[missing.notna().all(axis=1)]
+
+
+def _apply_mapping(op: models.ApplyMapping, df: pd.DataFrame) -> pd.DataFrame:
+    mapping = op.mapping.to_dict()
+    default = value_if_unset(op.default, "")
+    df[op.output_column] = (
+        df[op.input_column].astype(str).map(mapping).fillna(default).astype(str)
+    )
+    return df
+
+
+def _cut(op: models.Cut, df: pd.DataFrame) -> pd.DataFrame:
+    labels = value_if_unset(op.labels, None) or None
+    values = pd.to_numeric(df[op.input_column], errors="coerce")
+    # Bins are closed on the left, as on the instances.
+    df[op.output_column] = pd.cut(values, op.cuts, labels=labels, right=False)
+    return df
+
+
+def _deviation_squares(op: models.DeviationSquares, df: pd.DataFrame) -> pd.DataFrame:
+    count = value_if_unset(op.count, 0)
+    denominator = count - 1 if count > 1 else 1
+    values = pd.to_numeric(df[op.input_column], errors="coerce")
+    df[op.output_column] = (values - op.mean) ** 2 / denominator
+    return df
+
+
+def _add_columns(op: models.AddColumns, df: pd.DataFrame) -> pd.DataFrame:
+    if value_if_unset(op.numerical, False):
+        columns = df[op.input_columns].apply(pd.to_numeric, errors="coerce")
+        df[op.output_column] = columns.sum(axis=1, min_count=1)
+    else:
+        separator = value_if_unset(op.sep, "")
+        columns = [df[c].astype(str) for c in op.input_columns]
+        df[op.output_column] = columns[0].str.cat(columns[1:], sep=separator)
+    return df
+
+
+def _scale(op: models.Scale, df: pd.DataFrame) -> pd.DataFrame:
+    outputs = value_if_unset(op.output_columns, None) or op.input_columns
+    scaled = df[op.input_columns].apply(pd.to_numeric, errors="coerce") * op.scale
+    df[outputs] = scaled.to_numpy()
+    return df
+
+
+def _multiply_columns(op: models.MultiplyColumns, df: pd.DataFrame) -> pd.DataFrame:
+    columns = df[op.input_columns].apply(pd.to_numeric, errors="coerce")
+    df[op.output_column] = columns.prod(axis=1, min_count=1)
+    return df
+
+
+def _new_column(op: models.NewColumn, df: pd.DataFrame) -> pd.DataFrame:
+    if is_set(op.random):
+        loc = value_if_unset(op.random.loc, 0) or 0
+        scale = value_if_unset(op.random.scale, 1)
+        scale = 1 if scale is None else scale
+        df[op.name] = np.random.default_rng().normal(loc, scale, size=len(df))
+    else:
+        value = value_if_unset(op.value, "1")
+        df[op.name] = "1" if value in (None, "None") else value
+    return df
+
+
+def _compute_time_since(op: models.ComputeTimeSince, df: pd.DataFrame) -> pd.DataFrame:
+    dates = pd.to_datetime(df[op.date_column], errors="coerce")
+    elapsed = (pd.Timestamp(datetime.now()) - dates).dt.total_seconds()
+    df[op.output_column] = (elapsed // _UNIT_SECONDS[models.TimeUnit.YEARS]).astype(
+        "Int64"
+    )
+    return df
+
+
+def _drop_duplicates(op: models.DropDuplicates, df: pd.DataFrame) -> pd.DataFrame:
+    keep = getattr(op.keep, "value", value_if_unset(op.keep, "first"))
+    keep = False if keep == models.DropDuplicatesKeep.NONE else keep
+    subset = value_if_unset(op.columns, None) or None
+    return df.drop_duplicates(subset=subset, keep=keep)
+
+
+def _fillna(op: models.FillNA, df: pd.DataFrame) -> pd.DataFrame:
+    columns = value_if_unset(op.columns, None) or list(df.columns)
+    method = models.FillNAMethod(value_if_unset(op.method, None) or "value")
+    data = df[columns].replace(_MISSING_VALUES, np.nan)
+    match method:
+        case models.FillNAMethod.VALUE:
+            data = data.fillna(op.value)
+        case models.FillNAMethod.LOCAL_MEAN:
+            data = data.apply(pd.to_numeric, errors="coerce")
+            data = data.fillna(data.mean())
+        case models.FillNAMethod.LOCAL_MEDIAN:
+            data = data.apply(pd.to_numeric, errors="coerce")
+            data = data.fillna(data.median())
+        case models.FillNAMethod.LOCAL_MODE:
+            data = data.fillna(data.mode().iloc[0])
+        case models.FillNAMethod.FFILL:
+            data = data.ffill()
+        case models.FillNAMethod.BFILL:
+            data = data.bfill()
+        case models.FillNAMethod.INTERPOLATE:
+            data = data.apply(pd.to_numeric, errors="coerce").interpolate()
+    df[columns] = data
+    return df
+
+
+def _custom(op: models.Custom, df: pd.DataFrame) -> pd.DataFrame:
+    function_name = re.findall(r"def ([\w]+)\(", op.function)[0]
+    namespace = {"np": np, "pd": pd}
+    exec(op.function, namespace)  # pylint: disable=exec-used
+    kwargs = {}
+    if is_set(op.additional_inputs) and op.additional_inputs is not None:
+        kwargs = op.additional_inputs.to_dict()
+    df = namespace[function_name](df, **kwargs)
+    output_columns = value_if_unset(op.output_columns, None)
+    if output_columns and list(df.columns) != list(output_columns):
+        raise ValueError(
+            f"Custom operation {op.name} returned columns {list(df.columns)}, expected {output_columns}."
+        )
+    return df
+
+
+_RUNNERS: dict[models.PreprocessingOperationType, Callable] = {
+    Type.ONEHOTENCODING: _one_hot_encoding,
+    Type.SELECT: _select,
+    Type.DROP: _drop,
+    Type.FILTER: _filter,
+    Type.TRANSPOSE: _transpose,
+    Type.SETINDEX: _set_index,
+    Type.ASTYPE: _as_type,
+    Type.RESETINDEX: _reset_index,
+    Type.RENAME: _rename,
+    Type.EXTRACTDICTFIELD: _extract_dict_field,
+    Type.APPLYREGEX: _apply_regex,
+    Type.QUANTILES: _quantiles,
+    Type.TIMEDIFF: _time_diff,
+    Type.DROPNA: _dropna,
+    Type.APPLYMAPPING: _apply_mapping,
+    Type.CUT: _cut,
+    Type.DEVIATIONSQUARES: _deviation_squares,
+    Type.ADDCOLUMNS: _add_columns,
+    Type.SCALE: _scale,
+    Type.MULTIPLYCOLUMNS: _multiply_columns,
+    Type.NEWCOLUMN: _new_column,
+    Type.COMPUTETIMESINCE: _compute_time_since,
+    Type.DROPDUPLICATES: _drop_duplicates,
+    Type.FILLNA: _fillna,
+    Type.CUSTOM: _custom,
+}
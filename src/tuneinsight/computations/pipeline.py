@@ -0,0 +1,193 @@
+"""Pipelines of computations that hand off results on the instance.
+
+Some computations can use the result of a previous computation as input (e.g., an
+`Aggregation` on the output of a `Matching`). Running these one after the other with
+`on_previous_result` requires fetching each intermediate result to the client. A
+`Pipeline` instead declares the dependencies between computations, launches each
+computation as soon as its input is available, and only references intermediate
+results by their data object on the instance:
+
+```python
+pipeline = Pipeline()
+pipeline.add("matching", project.new_matching(...))
+pipeline.add("sum", project.new_aggregation(...), after="matching")
+pipeline.add("count", project.new_count(...), after="matching")
+results = pipeline.run()
+results["sum"]  # The "sum" and "count" computations run concurrently.
+```
+
+Each computation takes at most one input, so pipelines are trees (one computation can
+feed several others). Computations are launched with their own definition, which
+requires the permission to edit the computation definition of the project.
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any
+
+from tuneinsight.api.sdk import models
+from tuneinsight.api.sdk.types import value_if_unset
+from tuneinsight.client.dataobject import DataObject
+from tuneinsight.computations.base import Computation
+from tuneinsight.computations.cancellation import CancellationToken
+from tuneinsight.utils import time_tools
+
+
+class PipelineStage:
+    """A computation in a pipeline, with the stage whose result it uses as input."""
+
+    def __init__(
+        self,
+        name: str,
+        computation: Computation,
+        after: str = None,
+        local: bool = False,
+        fetch: bool = None,
+    ):
+        self.name = name
+        self.computation = computation
+        self.after = after
+        self.local = local
+        self.fetch = fetch
+        # Set when the stage is run.
+        self.launched: models.Computation = None
+        self.completed: models.Computation = None
+        self.output: models.DataObject = None
+
+
+class Pipeline:
+    """
+    A tree of computations, where computations use the results of others as input.
+
+    Stages are added with `.add`, and the pipeline is run with `.run`. By default, only
+    the results of the final stages (those that are not used as input by another stage)
+    are fetched to the client. Results of other stages stay on the instance.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        """
+        Creates an empty pipeline.
+
+        Args:
+            max_workers (int, optional): maximum number of computations awaited concurrently.
+        """
+        self.max_workers = max_workers
+        self.stages: dict[str, PipelineStage] = {}
+
+    def add(
+        self,
+        name: str,
+        computation: Computation,
+        after: str = None,
+        local: bool = False,
+        fetch: bool = None,
+    ) -> "Pipeline":
+        """
+        Adds a computation to the pipeline.
+
+        Args:
+            name (str): unique name of this stage, used to reference it in other stages and the results.
+            computation (Computation): the computation to run.
+            after (str, optional): name of the stage whose result is used as input for this computation.
+                The stage must have been added before. If None, the computation runs on its datasource.
+            local (bool, optional): whether to run the computation locally. Defaults to False.
+            fetch (bool, optional): whether to fetch the results of this stage to the client. Defaults
+                to fetching the results only if no other stage uses them as input.
+
+        Returns:
+            Pipeline: this pipeline, so that calls can be chained.
+        """
+        if name in self.stages:
+            raise ValueError(f"A stage named {name} already exists in this pipeline.")
+        if after is not None and after not in self.stages:
+            raise ValueError(f"Unknown input stage {after} for stage {name}.")
+        self.stages[name] = PipelineStage(name, computation, after, local, fetch)
+        return self
+
+    def _should_fetch(self, stage: PipelineStage) -> bool:
+        if stage.fetch is not None:
+            return stage.fetch
+        return all(other.after != stage.name for other in self.stages.values())
+
+    def _output_dataobject(self, stage: PipelineStage) -> models.DataObject:
+        """Returns the model of the data object produced by a stage, preferring shared objects."""
+        client = stage.computation.client
+        objects = [
+            DataObject.fetch_from_id(dataobject_id, client).model
+            for dataobject_id in stage.completed.results
+        ]
+        shared = [o for o in objects if value_if_unset(o.shared, False)]
+        return (shared or objects)[0]
+
+    def _run_stage(
+        self,
+        stage: PipelineStage,
+        interval: int,
+        max_sleep_time: int,
+        cancellation: CancellationToken,
+    ) -> Any:
+        """Launches a stage, waits for it to complete, and (optionally) fetches its results."""
+        previous = None
+        if stage.after is not None:
+            previous = self.stages[stage.after].output
+        comp = stage.computation
+        stage.launched = comp.run_async(
+            local=stage.local, on_previous_result=previous, cancellation=cancellation
+        )
+        stage.completed = comp.wait_for_completion(
+            stage.launched, interval, max_sleep_time, cancellation=cancellation
+        )
+        stage.output = self._output_dataobject(stage)
+        if self._should_fetch(stage):
+            return comp.fetch_results(stage.completed, cancellation=cancellation)
+        if comp.journal is not None:
+            comp.journal.record_completion(stage.completed.id)
+        return stage.output
+
+    def run(
+        self,
+        interval: int = 100 * time_tools.MILLISECOND,
+        max_sleep_time: int = 30 * time_tools.SECOND,
+        cancellation: CancellationToken = None,
+    ) -> dict[str, Any]:
+        """
+        Runs all the stages of the pipeline.
+
+        Each stage is launched as soon as its input stage completes, and independent
+        stages run concurrently. If a stage fails, all running stages are cancelled
+        (and stopped on the instance), and the error is raised.
+
+        Args:
+            interval (int, optional): time in nanoseconds to wait between polls.
+            max_sleep_time (int, optional): maximum time in nanoseconds to wait between polls.
+            cancellation (CancellationToken, optional): token used to cancel the whole pipeline.
+
+        Returns:
+            dict[str, Any]: for each stage, its post-processed results if they are fetched,
+                or the `models.DataObject` holding its results on the instance otherwise.
+        """
+        # Stages are cancelled with this token if another stage fails.
+        token = CancellationToken() if cancellation is None else cancellation.child()
+        results: dict[str, Any] = {}
+        waiting = list(self.stages.values())
+        running: dict[Future, PipelineStage] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while waiting or running:
+                for stage in [
+                    s for s in waiting if s.after is None or s.after in results
+                ]:
+                    waiting.remove(stage)
+                    future = executor.submit(
+                        self._run_stage, stage, interval, max_sleep_time, token
+                    )
+                    running[future] = stage
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        token.cancel(f"stage {stage.name} failed")
+                        wait(running)
+                        raise error
+                    results[stage.name] = future.result()
+        return results
@@ -0,0 +1,437 @@
+"""Strategies deciding how often to poll a computation running on a Tune Insight instance.
+
+When a computation is run, the SDK regularly fetches its state from the instance until it
+completes (see `Computation._poll_computation`). The time to wait between two polls is decided
+by a `PollingStrategy`:
+
+ - `ExponentialPolling` (default) increases the interval by a constant factor after each poll.
+ - `ProgressAwarePolling` estimates the remaining time of the computation from the progress
+    reported by the instance (stages and steps), and polls more often near the predicted
+    completion while backing off during long stages.
+
+Strategies can be set on a computation with `computation.polling_strategy = ...`.
+
+This module also provides utilities to compare strategies offline on simulated computation
+timelines, in terms of the latency overshoot (time between the end of the computation and the
+client noticing it) and the number of requests sent to the instance.
+
+"""
+
+from abc import ABC, abstractmethod
+from typing import Mapping
+import random
+
+import pandas as pd
+
+from tuneinsight.api.sdk import models
+from tuneinsight.api.sdk.types import is_unset, value_if_unset
+from tuneinsight.utils import time_tools
+
+
+class PollingStrategy(ABC):
+    """
+    Decides how long to wait between two consecutive polls of a computation.
+
+    A strategy is (re)initialized with `start` every time a computation starts being polled,
+    and is then queried with `next_interval` after each poll.
+    """
+
+    interval: int
+    max_sleep_time: int
+    started_at: int
+    """Time (in nanoseconds) at which the strategy was last started, or None."""
+
+    def __init__(self):
+        self.interval = 100 * time_tools.MILLISECOND
+        self.max_sleep_time = 30 * time_tools.SECOND
+        self.started_at = None
+
+    def start(self, interval: int, max_sleep_time: int, now: int = None):
+        """
+        Resets the strategy before polling a new computation.
+
+        Args:
+            interval (int): initial time in nanoseconds to wait between polls.
+            max_sleep_time (int): maximum time in nanoseconds to wait between polls.
+            now (int, optional): the current time in nanoseconds (defaults to `time_tools.now()`).
+        """
+        self.interval = interval
+        self.max_sleep_time = max_sleep_time
+        self.started_at = time_tools.now() if now is None else now
+
+    @abstractmethod
+    def next_interval(
+        self, comp: models.Computation, now: int, hint: int = None
+    ) -> int:
+        """
+        Returns the time in nanoseconds to wait before the next poll.
+
+        Args:
+            comp (models.Computation): the latest state of the computation.
+            now (int): the time (in nanoseconds) at which this state was observed.
+            hint (int, optional): the minimum time to wait before the next poll, as
+                requested by the instance (e.g., through a Retry-After header).
+        """
+
+    def _clamp(self, sleep_time: float, hint: int = None) -> int:
+        """Restricts a sleep time to the configured bounds, honouring server hints."""
+        sleep_time = min(max(sleep_time, self.interval), self.max_sleep_time)
+        if hint is not None:
+            sleep_time = max(sleep_time, hint)
+        return int(sleep_time)
+
+
+class ExponentialPolling(PollingStrategy):
+    """
+    Polls with an interval that grows exponentially, independently of the computation progress.
+
+    This is the default strategy: the interval starts at `interval` and grows by `growth` after
+    each poll, until it reaches `max_sleep_time`.
+    """
+
+    def __init__(self, growth: float = 1.05):
+        super().__init__()
+        self.growth = growth
+        self._sleep_time = self.interval
+
+    def start(self, interval: int, max_sleep_time: int, now: int = None):
+        super().start(interval, max_sleep_time, now)
+        self._sleep_time = interval
+
+    def next_interval(
+        self, comp: models.Computation, now: int, hint: int = None
+    ) -> int:
+        if self._sleep_time < self.max_sleep_time:
+            self._sleep_time = int(self._sleep_time * self.growth)
+        if hint is not None:
+            return max(self._sleep_time, hint)
+        return self._sleep_time
+
+
+def progress_fraction(comp: models.Computation) -> float | None:
+    """
+    Estimates the fraction of a computation that has completed from its reported progress.
+
+    Each stage is assumed to take the same share of the computation, and steps within the
+    current stage to be equally long.
+
+    Args:
+        comp (models.Computation): the computation to inspect.
+
+    Returns:
+        float: the completed fraction (in [0, 1]), or None if no progress is reported.
+    """
+    progress = comp.progress
+    if is_unset(progress) or progress is None:
+        return None
+    num_stages = value_if_unset(progress.num_stages, 0)
+    if not num_stages:
+        return None
+    stage_number = value_if_unset(progress.stage_number, 0)
+    num_steps = value_if_unset(progress.num_steps, 0)
+    step_number = value_if_unset(progress.step_number, 0)
+    within_stage = min(step_number / num_steps, 1) if num_steps else 0
+    fraction = (max(stage_number - 1, 0) + within_stage) / num_stages
+    return min(max(fraction, 0), 1)
+
+
+class ProgressAwarePolling(PollingStrategy):
+    """
+    Polls a computation according to the remaining time estimated from its progress.
+
+    The progress reported by the instance (stages and steps) is tracked across polls. The
+    remaining time of the current stage is estimated from the rate at which its steps complete,
+    and the remaining stages are assumed to take as long as the average stage so far. The next
+    poll is scheduled after a fraction (`eagerness`) of the estimated remaining time, so that
+    polls become more frequent as the predicted completion approaches.
+
+    When no progress is observed between two polls (e.g., during a long stage, or when the
+    computation takes longer than predicted), the interval backs off by a factor `backoff`. A
+    change in the number of synced participants counts as progress. Server hints are honoured.
+    """
+
+    def __init__(self, eagerness: float = 0.25, backoff: float = 1.5):
+        """
+        Args:
+            eagerness (float, optional): the fraction of the estimated remaining time to wait
+                before the next poll. Smaller values reduce the latency overshoot at the cost of
+                more requests. Defaults to 0.25.
+            backoff (float, optional): the factor by which the interval grows when no progress
+                is observed between two polls. Defaults to 1.5.
+        """
+        super().__init__()
+        if not 0 < eagerness <= 1:
+            raise ValueError("eagerness must be in (0, 1].")
+        if backoff < 1:
+            raise ValueError("backoff must be at least 1.")
+        self.eagerness = eagerness
+        self.backoff = backoff
+        # State of the polled computation, set by _reset when polling starts.
+        self._start_time: int = None
+        self._last_seen: int = None
+        self._stage: int = None
+        self._stage_start: int = None
+        self._last_progress: tuple = None
+        self._last_sleep: int = None
+
+    def _reset(self, now: int | None):
+        self._start_time = now
+        self._last_seen = now
+        self._stage = None
+        self._stage_start = now
+        self._last_progress = None
+        self._last_sleep = None
+
+    def start(self, interval: int, max_sleep_time: int, now: int = None):
+        super().start(interval, max_sleep_time, now)
+        self._reset(self.started_at)
+
+    def estimate_remaining_time(self, comp: models.Computation, now: int) -> int | None:
+        """
+        Estimates the remaining time of a computation from the progress observed so far.
+
+        Args:
+            comp (models.Computation): the latest state of the computation.
+            now (int): the time (in nanoseconds) at which this state was observed.
+
+        Returns:
+            int: the estimated remaining time in nanoseconds, or None if it cannot be estimated.
+        """
+        progress = comp.progress
+        if is_unset(progress) or progress is None:
+            return None
+        num_stages = value_if_unset(progress.num_stages, 0)
+        stage = value_if_unset(progress.stage_number, 0)
+        num_steps = value_if_unset(progress.num_steps, 0)
+        step = value_if_unset(progress.step_number, 0)
+        if not num_stages or not stage:
+            return None
+        stage_time = now - self._stage_start
+        average_stage = None
+        if stage > 1:
+            average_stage = (self._stage_start - self._start_time) / (stage - 1)
+        # Remaining time in the current stage, from the rate of completed steps (if any).
+        if step > 0 and num_steps > 0:
+            remaining_stage = stage_time * max(num_steps - step, 0) / step
+        elif average_stage is not None:
+            remaining_stage = max(average_stage - stage_time, 0)
+        else:
+            return None
+        if average_stage is None:
+            average_stage = stage_time + remaining_stage
+        return int(remaining_stage + max(num_stages - stage, 0) * average_stage)
+
+    def next_interval(
+        self, comp: models.Computation, now: int, hint: int = None
+    ) -> int:
+        if self._start_time is None:
+            self._reset(now)
+        if self._last_sleep is None:
+            self._last_sleep = self.interval
+        # Record when the computation entered its current stage (between the last two polls).
+        stage = None
+        if not is_unset(comp.progress) and comp.progress is not None:
+            stage = value_if_unset(comp.progress.stage_number, None)
+        if stage != self._stage:
+            self._stage = stage
+            self._stage_start = (self._last_seen + now) // 2
+        self._last_seen = now
+        current_progress = (
+            progress_fraction(comp),
+            value_if_unset(comp.num_synced_participants, None),
+        )
+        progressed = current_progress != self._last_progress
+        self._last_progress = current_progress
+        remaining = self.estimate_remaining_time(comp, now)
+        if remaining is None:
+            sleep_time = (
+                self._last_sleep if progressed else self._last_sleep * self.backoff
+            )
+        else:
+            sleep_time = self.eagerness * remaining
+            if not progressed:
+                # The computation is slower than predicted: do not poll faster than before.
+                sleep_time = max(sleep_time, self._last_sleep * self.backoff)
+        self._last_sleep = self._clamp(sleep_time)
+        return self._clamp(self._last_sleep, hint)
+
+
+def server_polling_hint(headers: Mapping[str, str]) -> int | None:
+    """
+    Extracts the time the server requests clients to wait before polling again.
+
+    Args:
+        headers (Mapping[str, str]): the headers of the response of the instance.
+
+    Returns:
+        int: the time to wait in nanoseconds, or None if the server gave no (valid) hint.
+    """
+    if headers is None:
+        return None
+    value = headers.get("Retry-After", headers.get("retry-after"))
+    if value is None:
+        return None
+    try:
+        return int(float(value) * time_tools.SECOND)
+    except ValueError:
+        return None
+
+
+# Offline simulation of polling strategies.
+
+
+class SimulatedComputation:
+    """
+    A simulated computation timeline, used to evaluate polling strategies offline.
+
+    The computation goes through a sequence of stages, each with a duration and a number of
+    (equally long) steps. The state of the computation at any time is returned as an API model,
+    as the instance would report it.
+    """
+
+    def __init__(self, stages: list[tuple[int, int]], num_participants: int = 0):
+        """
+        Args:
+            stages (list[tuple[int, int]]): the (duration in nanoseconds, number of steps) of each stage.
+            num_participants (int, optional): the number of participants loading data during the
+                second stage (as reported by `num_synced_participants`). Defaults to 0.
+        """
+        self.stages = stages
+        self.num_participants = num_participants
+        self.duration = sum(d for d, _ in stages)
+
+    def state(self, elapsed: int) -> models.Computation:
+        """Returns the state of the computation `elapsed` nanoseconds after it started."""
+        status = models.ComputationStatus.RUNNING
+        if elapsed >= self.duration:
+            status = models.ComputationStatus.SUCCESS
+        start = 0
+        stage_number, num_steps, step_number = len(self.stages), 1, 1
+        synced = self.num_participants
+        for i, (duration, steps) in enumerate(self.stages):
+            if elapsed < start + duration:
+                stage_number, num_steps = i + 1, steps
+                step_number = int((elapsed - start) / duration * steps)
+                if stage_number == 2 and self.num_participants:
+                    synced = int((elapsed - start) / duration * self.num_participants)
+                break
+            start += duration
+        return models.Computation(
+            definition=models.ComputationDefinition(
+                type=models.ComputationType.ENCRYPTEDAGGREGATION
+            ),
+            id="simulated",
+            status=status,
+            num_synced_participants=synced if stage_number >= 2 else 0,
+            progress=models.ComputationProgress(
+                running=status == models.ComputationStatus.RUNNING,
+                num_stages=len(self.stages),
+                stage_number=stage_number,
+                num_steps=num_steps,
+                step_number=step_number,
+            ),
+        )
+
+    @classmethod
+    def random(
+        cls,
+        rng: random.Random,
+        num_stages: int = 5,
+        mean_duration: int = time_tools.MINUTE,
+    ) -> "SimulatedComputation":
+        """
+        Draws a random computation timeline with heterogeneous stage durations.
+
+        Args:
+            rng (random.Random): the source of randomness.
+            num_stages (int, optional): the number of stages. Defaults to 5.
+            mean_duration (int, optional): the mean total duration in nanoseconds. Defaults to one minute.
+        """
+        weights = [rng.expovariate(1) for _ in range(num_stages)]
+        total = rng.expovariate(1 / mean_duration)
+        stages = [
+            (
+                max(int(total * w / sum(weights)), time_tools.MILLISECOND),
+                rng.randint(1, 20),
+            )
+            for w in weights
+        ]
+        return cls(stages, num_participants=rng.randint(2, 10))
+
+
+def simulate_polling(
+    strategy: PollingStrategy,
+    computation: SimulatedComputation,
+    interval: int = 100 * time_tools.MILLISECOND,
+    max_sleep_time: int = 30 * time_tools.SECOND,
+) -> tuple[int, int]:
+    """
+    Simulates polling a computation with a given strategy, without any network request.
+
+    This follows the same loop as `Computation._poll_computation`.
+
+    Args:
+        strategy (PollingStrategy): the polling strategy to evaluate.
+        computation (SimulatedComputation): the simulated computation timeline.
+        interval (int, optional): the initial polling interval in nanoseconds.
+        max_sleep_time (int, optional): the maximum polling interval in nanoseconds.
+
+    Returns:
+        tuple[int, int]: the latency overshoot (in nanoseconds) and the number of requests.
+    """
+    strategy.start(interval, max_sleep_time, now=0)
+    now, sleep_time, num_requests = 0, interval, 0
+    while True:
+        now += sleep_time
+        num_requests += 1
+        state = computation.state(now)
+        if state.status == models.ComputationStatus.SUCCESS:
+            return now - computation.duration, num_requests
+        sleep_time = strategy.next_interval(state, now)
+
+
+def compare_polling_strategies(
+    strategies: dict[str, PollingStrategy],
+    num_computations: int = 1000,
+    mean_duration: int = time_tools.MINUTE,
+    seed: int = 0,
+    interval: int = 100 * time_tools.MILLISECOND,
+    max_sleep_time: int = 30 * time_tools.SECOND,
+) -> pd.DataFrame:
+    """
+    Compares polling strategies on random simulated computation timelines.
+
+    Args:
+        strategies (dict[str, PollingStrategy]): the strategies to compare, by name.
+        num_computations (int, optional): the number of simulated computations. Defaults to 1000.
+        mean_duration (int, optional): the mean duration of computations in nanoseconds.
+        seed (int, optional): the seed used to generate the timelines. Defaults to 0.
+        interval (int, optional): the initial polling interval in nanoseconds.
+        max_sleep_time (int, optional): the maximum polling interval in nanoseconds.
+
+    Returns:
+        pd.DataFrame: for each strategy, the mean and 95th percentile of the latency overshoot
+            (in seconds), and the mean number of requests per computation.
+    """
+    rng = random.Random(seed)
+    timelines = [
+        SimulatedComputation.random(rng, mean_duration=mean_duration)
+        for _ in range(num_computations)
+    ]
+    rows = []
+    for name, strategy in strategies.items():
+        runs = [
+            simulate_polling(strategy, timeline, interval, max_sleep_time)
+            for timeline in timelines
+        ]
+        overshoots = pd.Series([o / time_tools.SECOND for o, _ in runs])
+        requests = pd.Series([r for _, r in runs])
+        rows.append(
+            {
+                "strategy": name,
+                "mean overshoot (s)": overshoots.mean(),
+                "p95 overshoot (s)": overshoots.quantile(0.95),
+                "mean requests": requests.mean(),
+            }
+        )
+    return pd.DataFrame(rows).set_index("strategy")
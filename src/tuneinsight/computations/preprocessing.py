@@ -1,22 +1,47 @@
 from enum import Enum
 from typing import Any, Callable
 from warnings import warn
+import hashlib
+import json
 import pandas as pd
 
 from tuneinsight.api.sdk import Client, models
 from tuneinsight.api.sdk.types import UNSET
-from tuneinsight.api.sdk.types import is_set, is_unset
+from tuneinsight.api.sdk.types import is_set, is_unset, value_if_unset
 from tuneinsight.api.sdk.models import ComparisonType as ct
 from tuneinsight.api.sdk.api.api_computations import get_preprocessing_dry_run
 
 from tuneinsight.client.validation import validate_response
 from tuneinsight.computations.dataset_schema import DatasetSchema
-from tuneinsight.utils.code import get_code
+from tuneinsight.computations.dry_run_cache import DryRunCache, get_dry_run_cache
+from tuneinsight.computations.local_preprocessing import run_chain, profile_chain
+from tuneinsight.computations.preprocessing_optimizer import (
+    optimize_chain,
+    OptimizationReport,
+)
+from tuneinsight.utils.binning import bin_labels
+from tuneinsight.utils.code import analyze_code, get_code
 
 
 # pylint: disable=too-many-lines
 
 
+def _hash_model(model) -> str:
+    """Returns a hash of the (sorted) JSON representation of an API model."""
+    content = json.dumps(model.to_dict(), sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class _ChainSegment:
+    """A sequence of operations of the compound chains, shared by a set of nodes."""
+
+    def __init__(
+        self, nodes: frozenset[str], operations: list[models.PreprocessingOperation]
+    ):
+        self.nodes = nodes
+        self.operations = operations
+
+
 class Comparator(Enum):
     EQUAL = ct.EQUAL
     GREATER = ct.GREATER
@@ -57,13 +82,25 @@ class PreprocessingBuilder:
     directly (through the `.preprocessing` attribute of `Computation` objects), or in the project's
     local data selection. Use these instead.
 
+    Changes made with the methods of this object are tracked with a version counter, and each
+    section of the preprocessing (global chain, chain of each node, output selection, schema)
+    has a structural hash (see `section_hashes`), which is used to skip updates of the project
+    when the preprocessing has not changed. If operations of the chains are modified in place,
+    call `mark_changed` to record the change.
+
+    The compound chains are stored as segments of operations shared by several nodes: an
+    operation added for a list of nodes is stored once, and the chain of each node is only
+    expanded (and cached) when `compound_chain` is accessed, e.g. by `get_model`. The
+    `compound_chain` dictionary should therefore not be modified in place: use the methods
+    of this object, or assign a new dictionary to `compound_chain`.
+
     """
 
     chain: list[models.PreprocessingOperation]
-    compound_chain: dict[str, models.PreprocessingChain]
     output_selection: models.Select
     output_selection_set: bool
     schema: DatasetSchema
+    version: int
 
     def __init__(self, update_function: Callable = None):
         """
@@ -80,11 +117,85 @@ class PreprocessingBuilder:
                 "Initialized PreprocessingBuilder without an update function: "
                 "changes you make on this object may not appear in the project."
             )
+        self.version = 0
+        # Hashes of the operations (indexed by id, with a reference to the operation) and
+        # of the sections of the preprocessing, computed at a given version.
+        self._operation_hashes: dict[int, tuple[models.PreprocessingOperation, str]] = (
+            {}
+        )
+        self._section_hashes: tuple[tuple, dict[str, str]] = None
+        # Segments of the compound chains, the indices of the segments of each node, and
+        # the compound chains expanded at a given version.
+        self._segments: list[_ChainSegment] = []
+        self._node_segments: dict[str, list[int]] = {}
+        self._compound_view: tuple[int, dict[str, models.PreprocessingChain]] = None
         self.reset(patch=False)
 
+    @property
+    def compound_chain(self) -> dict[str, models.PreprocessingChain]:
+        """The chain of operations applied to each node (after the global chain)."""
+        if self._compound_view is None or self._compound_view[0] != self.version:
+            view = {
+                node: models.PreprocessingChain(
+                    [op for index in indices for op in self._segments[index].operations]
+                )
+                for node, indices in self._node_segments.items()
+            }
+            self._compound_view = (self.version, view)
+        return self._compound_view[1]
+
+    @compound_chain.setter
+    def compound_chain(self, chains: dict[str, models.PreprocessingChain]):
+        operations = {
+            node: list(value_if_unset(node_chain.chain, []))
+            for node, node_chain in chains.items()
+        }
+        hashes = {
+            node: [self._operation_hash(op) for op in ops]
+            for node, ops in operations.items()
+        }
+        # Operations at the start and at the end of all the chains are shared by all nodes.
+        prefix = suffix = 0
+        if len(operations) > 1:
+            shortest = min(len(h) for h in hashes.values())
+            while prefix < shortest and len({h[prefix] for h in hashes.values()}) == 1:
+                prefix += 1
+            while (
+                suffix < shortest - prefix
+                and len({h[-1 - suffix] for h in hashes.values()}) == 1
+            ):
+                suffix += 1
+        # Nodes with the same operations in between share a segment.
+        groups: dict[tuple[str, ...], list[str]] = {}
+        for node, node_hashes in hashes.items():
+            middle = tuple(node_hashes[prefix : len(node_hashes) - suffix])
+            groups.setdefault(middle, []).append(node)
+        self._segments, self._node_segments = [], {node: [] for node in operations}
+        first = operations[next(iter(operations))] if operations else []
+        parts = [(list(operations), first[:prefix])]
+        for nodes in groups.values():
+            node_operations = operations[nodes[0]]
+            parts.append(
+                (nodes, node_operations[prefix : len(node_operations) - suffix])
+            )
+        parts.append((list(operations), first[len(first) - suffix :]))
+        for nodes, segment_operations in parts:
+            if segment_operations:
+                self._add_segment(nodes, segment_operations)
+        self._changed()
+
+    def _add_segment(
+        self, nodes: list[str], operations: list[models.PreprocessingOperation]
+    ):
+        """Adds a segment of operations at the end of the chains of some nodes."""
+        self._segments.append(_ChainSegment(frozenset(nodes), operations))
+        for node in nodes:
+            self._node_segments.setdefault(node, []).append(len(self._segments) - 1)
+
     def new_schema(self) -> DatasetSchema:
         """Creates and attaches a new dataset schema imposing constraints on data structure."""
         self.schema = DatasetSchema()
+        self._changed()
         return self.schema
 
     def new_chain(self, chain: list[models.PreprocessingOperation]):
@@ -98,6 +209,7 @@ class PreprocessingBuilder:
             self (PreprocessingBuilder): the updated PreprocessingBuilder
         """
         self.chain = chain
+        self._changed()
         return self
 
     def new_compound_chain(self, chain: dict[str, models.PreprocessingChain]):
@@ -221,6 +333,7 @@ class PreprocessingBuilder:
         self.output_selection.create_if_missing = create_if_missing
         self.output_selection.dummy_value = dummy_value
         self.output_selection_set = True
+        self._changed()
 
     def filter(
         self,
@@ -548,7 +661,8 @@ class PreprocessingBuilder:
 
         Args:
             input_column (str): the column from which to compute the quantiles
-            min_v (float): the minimum expected value a sample can take
+            min_v (float): the minimum expected value a sample can take (this can be estimated
+                from local data, see `utils.binning.QuantileSketch.bounds`).
             max_v (float): the maximum expected value a sample can take
             nodes (list[str], optional): the nodes to apply this operation to. Defaults to None.
 
@@ -682,17 +796,21 @@ class PreprocessingBuilder:
         according to a list of cuts and labels defined by the user. For instance, the cuts [a, b]
         would create three categories: (, a), [a, b), [b, ).
 
+        Cuts can be estimated from a local sample of the data with `utils.binning.sketch_columns`.
+
         Args:
             input_column (str): name of the input column
             output (str): name of the output column
             cuts (list[float]): the list of cuts (must be numerical)
-            labels (list[str], optional): list of associated labels/categories must be equal to `len(cuts) - 1`
+            labels (list[str], optional): list of associated labels/categories must be equal to `len(cuts) - 1`.
+                Defaults to labels describing the bins, e.g. "[a, b)".
             nodes (list[str], optional): If specified, applies the preprocessing operation only for the given nodes. Defaults to None.
 
         Returns:
             self (PreprocessingBuilder): the updated PreprocessingBuilder
         """
-
+        if labels is None:
+            labels = bin_labels(cuts)
         if len(labels) != len(cuts) - 1:
             raise ValueError(
                 f"Number of labels ({len(labels)}) does not match number of cuts + 1 ({len(cuts) - 1} + 1)."
@@ -969,6 +1087,9 @@ class PreprocessingBuilder:
         data controllers from each participating organization before approving the project. This operation can be
         disabled at the instance level, and may not be available in your project.
 
+        The code of the function is analysed statically, and a warning is raised if it cannot run remotely.
+        Use `utils.code.validate_custom_function` to test the function on sample data before running it.
+
         Args:
             function (Callable[[pd.DataFrame], pd.DataFrame]): the preprocessing operation, must be a python function
                 which takes as input a dataframe and returns a new dataframe.
@@ -988,6 +1109,10 @@ class PreprocessingBuilder:
         Returns:
             self (PreprocessingBuilder): the updated PreprocessingBuilder
         """
+        code = get_code(function)
+        for issue in analyze_code(code):
+            if issue.level == "error":
+                warn(f"Custom function {function.__name__}, {issue}")
         if is_set(additional_inputs):
             tmp = models.CustomAdditionalInputs()
             tmp.additional_properties = additional_inputs
@@ -998,7 +1123,7 @@ class PreprocessingBuilder:
                 name=name,
                 description=description,
                 additional_inputs=additional_inputs,
-                function=get_code(function),
+                function=code,
                 output_columns=output_columns,
                 compatible_with_differential_privacy=compatible_with_dp,
             ),
@@ -1026,16 +1151,21 @@ class PreprocessingBuilder:
         self,
         client: Client,
         starting_columns: list[models.DataSourceColumn | str],
+        cache: DryRunCache = None,
     ) -> list[list[models.DataSourceVariable]]:
         """Dry-runs the preprocessing operations on a set of starting columns.
 
         This infers the columns available at the end of each preprocessing operation, as well
-        as the type of these columns.
+        as the type of these columns. The outputs of dry runs are cached: when the beginning
+        of the chain was already dry-run on the same columns, only the remaining operations
+        are sent to the instance (see `computations.dry_run_cache`).
 
         Args:
             client (Client): client to connect to.
             starting_columns (list[models.DataSourceVariable | str]): the input columns of
                 the dry run (either column names, or variables with types).
+            cache (DryRunCache, optional): the cache to use. Defaults to the cache set with
+                `dry_run_cache.use_dry_run_cache` (by default, a cache shared by all builders).
 
         Returns:
             list[list[models.DataSourceVariable]]: the output variables at each step.
@@ -1054,15 +1184,111 @@ class PreprocessingBuilder:
                 )
             else:
                 raise TypeError(f"Unknown data column type: {type(col)}")
-        resp = get_preprocessing_dry_run.sync_detailed(
-            client=client,
-            json_body=get_preprocessing_dry_run.GetPreprocessingDryRunJsonBody(
-                chain=models.PreprocessingChain(chain=self.chain),
-                columns=wrapped_columns,
-            ),
+
+        def run(chain, columns):
+            resp = get_preprocessing_dry_run.sync_detailed(
+                client=client,
+                json_body=get_preprocessing_dry_run.GetPreprocessingDryRunJsonBody(
+                    chain=models.PreprocessingChain(chain=chain),
+                    columns=columns,
+                ),
+            )
+            validate_response(resp)
+            return resp.parsed
+
+        if cache is None:
+            cache = get_dry_run_cache()
+        if cache is None:
+            return run(self.chain, wrapped_columns)
+        return cache.dry_run(self.chain, wrapped_columns, run, scope=client.base_url)
+
+    def run_locally(
+        self, df: pd.DataFrame, node: str = None, profile: bool = False
+    ) -> pd.DataFrame | tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Runs the preprocessing operations on a local DataFrame.
+
+        This runs the global chain, then the chain of the given node (if any), and finally the
+        output selection. This can be used to test the preprocessing on sample data before
+        running a collective computation (see `computations.local_preprocessing`).
+
+        Args:
+            df (pd.DataFrame): the input data (which is not modified).
+            node (str, optional): the node whose compound chain is run after the global chain.
+            profile (bool, optional): whether to also return the duration of each operation.
+
+        Returns:
+            pd.DataFrame: the preprocessed data. If profile is True, a profile of the execution
+                is also returned (see `local_preprocessing.profile_chain`).
+        """
+        chain = list(self.chain)
+        if node is not None and node in self.compound_chain:
+            chain += value_if_unset(self.compound_chain[node].chain, [])
+        if self.output_selection_set:
+            chain.append(self.output_selection)
+        if profile:
+            return profile_chain(chain, df)
+        return run_chain(chain, df)
+
+    def optimize(
+        self, sample: pd.DataFrame = None, patch: bool = True
+    ) -> OptimizationReport:
+        """
+        Rewrites the preprocessing chains into equivalent chains that do less work.
+
+        Redundant operations are merged or removed, filters are moved earlier, and unused
+        columns are dropped early (see `computations.preprocessing_optimizer`).
+
+        Args:
+            sample (pd.DataFrame, optional): sample input data. If provided, the original and
+                optimized chains are run locally on this data, and the optimization is only
+                applied if their outputs are equal. The global chain is checked first (if it
+                fails, nothing is applied), then the chain of each node is checked (after the
+                global chain) and only applied if its outputs are equal.
+            patch (bool, optional): whether to update the project after the optimization.
+
+        Returns:
+            OptimizationReport: the changes made to the global chain (and compound chains),
+                with the work saved on the sample data if provided.
+        """
+        selection = [self.output_selection] if self.output_selection_set else []
+        output_columns = self.output_selection.columns if selection else None
+        # Compound chains run after the global chain: all its outputs might be used.
+        chain, changes = optimize_chain(
+            self.chain, None if self.compound_chain else output_columns
         )
-        validate_response(resp)
-        return resp.parsed
+        report = OptimizationReport(self.chain + selection, chain + selection, changes)
+        if sample is not None and not report.compare(sample):
+            warn(
+                "The optimized chain does not give the same output: it was not applied."
+            )
+            return report
+        self.chain = chain
+        compound_chain, optimized_chains = {}, {}
+        for node, node_chain in self.compound_chain.items():
+            operations = value_if_unset(node_chain.chain, [])
+            # Nodes with the same operations are optimized (and checked) once.
+            key = tuple(map(id, operations))
+            if key not in optimized_chains:
+                optimized, node_changes = optimize_chain(operations, output_columns)
+                node_report = OptimizationReport(
+                    chain + operations + selection,
+                    chain + optimized + selection,
+                    node_changes,
+                )
+                if sample is not None and not node_report.compare(sample):
+                    optimized = operations
+                    node_changes = [
+                        "the optimized chain does not give the same output: it was not applied"
+                    ]
+                optimized_chains[key] = optimized, node_changes
+            optimized, node_changes = optimized_chains[key]
+            compound_chain[node] = models.PreprocessingChain(list(optimized))
+            report.changes += [f"{node}: {change}" for change in node_changes]
+        self.compound_chain = compound_chain
+        if patch and self.update_function is not None:
+            self.update_function()
+        return report
 
     def _append_to_chain(
         self, op: models.PreprocessingOperation, nodes: list[str] = None
@@ -1078,16 +1304,106 @@ class PreprocessingBuilder:
             self.chain.append(op)
         else:
             assert isinstance(nodes, list)
-            for node in nodes:
-                if node not in self.compound_chain.keys():
-                    self.compound_chain.update({node: models.PreprocessingChain([op])})
-                else:
-                    node_chain = self.compound_chain.get(node)
-                    node_chain.chain.append(op)
-                    self.compound_chain[node] = node_chain
+            # The operation is stored once, in a segment shared by all these nodes.
+            last = self._segments[-1] if self._segments else None
+            if last is not None and last.nodes == frozenset(nodes):
+                last.operations.append(op)
+            else:
+                self._add_segment(nodes, [op])
+        self._changed()
         if self.update_function is not None:
             self.update_function()
 
+    def _changed(self):
+        """Records that the preprocessing was changed."""
+        self.version += 1
+
+    def mark_changed(self, patch: bool = True):
+        """
+        Records changes made directly to the operations of the chains (e.g., `builder.chain[0].value = 1`).
+
+        Args:
+            patch (bool, optional): whether to update the project.
+        """
+        self._changed()
+        self._operation_hashes = {}
+        if patch and self.update_function is not None:
+            self.update_function()
+
+    def _operation_hash(
+        self, op: models.PreprocessingOperation, hashes: dict = None
+    ) -> str:
+        """Hashes an operation, reusing its hash if it was already hashed."""
+        cached = self._operation_hashes.get(id(op))
+        if cached is None or cached[0] is not op:
+            cached = (op, _hash_model(op))
+            self._operation_hashes[id(op)] = cached
+        if hashes is not None:
+            hashes[id(op)] = cached
+        return cached[1]
+
+    def _chain_hash(
+        self,
+        chain: list[models.PreprocessingOperation],
+        hashes: dict[int, tuple[models.PreprocessingOperation, str]],
+    ) -> str:
+        """Hashes a chain, recording the hashes of its operations in hashes."""
+        digest = hashlib.sha256()
+        for op in chain:
+            digest.update(self._operation_hash(op, hashes).encode("utf-8"))
+        return digest.hexdigest()
+
+    def section_hashes(self) -> dict[str, str]:
+        """
+        Returns structural hashes of the sections of the preprocessing.
+
+        The sections are the global chain ("global"), the chain of each node ("compound:<node>"),
+        the output selection ("select") and the dataset schema ("schema"). Hashes are only
+        recomputed for the operations that were added or replaced since the last call. The
+        hash of the chain of a node is computed from the hashes of its segments, so equal
+        chains stored as different segments can have different hashes.
+
+        Returns:
+            dict[str, str]: the hash of each section.
+        """
+        # The global chain can also be modified directly: the key includes its operations.
+        key = (
+            self.version,
+            tuple(map(id, self.chain)),
+            id(self.output_selection),
+            self.output_selection_set,
+        )
+        if self._section_hashes is None or self._section_hashes[0] != key:
+            hashes = {}
+            sections = {"global": self._chain_hash(self.chain, hashes)}
+            segment_hashes = [
+                self._chain_hash(segment.operations, hashes)
+                for segment in self._segments
+            ]
+            for node in sorted(self._node_segments):
+                sections[f"compound:{node}"] = hashlib.sha256(
+                    "".join(
+                        segment_hashes[index] for index in self._node_segments[node]
+                    ).encode("utf-8")
+                ).hexdigest()
+            sections["select"] = (
+                _hash_model(self.output_selection) if self.output_selection_set else ""
+            )
+            self._operation_hashes = hashes
+            self._section_hashes = (key, sections)
+        sections = dict(self._section_hashes[1])
+        # Schemas are edited through their own methods, and are always hashed.
+        sections["schema"] = (
+            "" if self.schema is None else _hash_model(self.schema.model)
+        )
+        return sections
+
+    def structural_hash(self) -> str:
+        """Returns a hash of the whole preprocessing (see `section_hashes`)."""
+        return hashlib.sha256(
+            json.dumps(self.section_hashes(), sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
     def check_validity(self):
         """Checks that the preprocessing chains are valid."""
         if self._check_chain(self.chain) is True:
@@ -1097,16 +1413,39 @@ class PreprocessingBuilder:
                 stacklevel=2,
             )
 
-        for node, node_chain in self.compound_chain.items():
-            if self._check_chain(node_chain.chain) is True:
+        # The check is done on each segment: its result for a node is given by the last
+        # segment of the node that contains a one hot encoding or a select.
+        segment_checks = [
+            self._check_segment(segment.operations) for segment in self._segments
+        ]
+        for node, indices in self._node_segments.items():
+            results = [
+                segment_checks[i] for i in indices if segment_checks[i] is not None
+            ]
+            if results and results[-1] is True:
                 warn(
                     "Preprocessing chain for node "
                     + node
                     + " contains one hot encoding without a subsequent select. This could lead to an error if nodes have different categorical values. \n Chain: "
-                    + str(node_chain),
+                    + str(self.compound_chain[node]),
                     stacklevel=2,
                 )
 
+    @staticmethod
+    def _check_segment(chain: list[models.PreprocessingOperation]) -> bool:
+        """
+        Checks a segment of a chain as `_check_chain`, returning None if the segment contains
+        neither a one hot encoding without specified types nor a select.
+        """
+        result = None
+        for ppo in chain:
+            if ppo.type == models.PreprocessingOperationType.ONEHOTENCODING:
+                if is_unset(ppo.specified_types):
+                    result = True
+            if ppo.type == models.PreprocessingOperationType.SELECT:
+                result = False
+        return result
+
     @staticmethod
     def _check_chain(chain: models.PreprocessingChain) -> bool:
         """
@@ -1155,6 +1494,7 @@ class PreprocessingBuilder:
         )
         self.output_selection_set = False
         self.schema = None
+        self._changed()
         if patch and self.update_function is not None:
             self.update_function()
 
@@ -1181,5 +1521,5 @@ class PreprocessingBuilder:
             p.output_selection = model.select
             p.output_selection_set = True
         if is_set(model.dataset_schema):
-            p.schema = model.dataset_schema
+            p.schema = DatasetSchema(model.dataset_schema)
         return p
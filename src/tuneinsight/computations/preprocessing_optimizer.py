@@ -0,0 +1,484 @@
+"""Optimization of preprocessing chains.
+
+Chains built with a `PreprocessingBuilder` or a `RemoteDataFrame` often contain redundant
+operations (e.g., consecutive selections, or columns that are created and never used),
+and filter records late. `optimize_chain` rewrites a chain into an equivalent chain that
+does less work, by applying the following rules until no rule applies:
+
+- operations without effect are removed (e.g., scaling by 1, renaming nothing);
+- adjacent operations are merged (selections, drops, scalings, renamings, and filters
+  on the same column);
+- operations creating columns that are never used are removed, when the chain (or the
+  computation) ends with a selection of columns;
+- filters are moved before the row-wise operations that precede them, as long as these
+  operations do not modify the filtered column;
+- input columns that are never used are dropped at the start of the chain.
+
+Rules only apply to operations whose inputs and outputs are known statically. Operations
+such as renames, custom operations, or transpositions are never moved across, so that
+the output of the chain (columns and values) is preserved.
+
+"""
+
+from typing import Optional
+
+import pandas as pd
+
+from tuneinsight.api.sdk import models
+from tuneinsight.api.sdk.types import is_set, value_if_unset
+from tuneinsight.computations.local_preprocessing import (
+    as_operation_model,
+    profile_chain,
+)
+
+Type = models.PreprocessingOperationType
+
+_ORDER_FILTERS = {
+    models.ComparisonType.GREATER: max,
+    models.ComparisonType.GREATEREQ: max,
+    models.ComparisonType.LESS: min,
+    models.ComparisonType.LESSEQ: min,
+}
+
+
+class _Effects:
+    """The columns read and written by an operation, and how it affects records."""
+
+    def __init__(
+        self,
+        reads: Optional[set] = None,
+        writes: set = None,
+        exact_writes: bool = True,
+        row_wise: bool = False,
+        removable: bool = False,
+    ):
+        # Columns read by the operation (None if the operation depends on all columns).
+        self.reads = reads
+        # Columns created or modified by the operation.
+        self.writes = writes or set()
+        # Whether writes are known exactly (otherwise, they are a subset of the columns written).
+        self.exact_writes = exact_writes
+        # Whether each output record only depends on the same input record, and records are
+        # neither added nor reordered (so that the operation commutes with filters).
+        self.row_wise = row_wise
+        # Whether the operation can be removed if none of the columns it writes are used.
+        self.removable = removable
+
+
+def _outputs(op, inputs: list[str]) -> list[str]:
+    return value_if_unset(op.output_columns, None) or inputs
+
+
+def _effects(op) -> _Effects:
+    """Returns the effects of an operation on the columns of the data."""
+    t = models.PreprocessingOperationType(op.type)
+    if t == Type.FILTER:
+        output = value_if_unset(op.output_column, None)
+        return _Effects(
+            {op.column},
+            {output} if output else set(),
+            row_wise=True,
+            removable=bool(output),
+        )
+    if t == Type.ONEHOTENCODING:
+        types = value_if_unset(op.specified_types, None) or []
+        prefix = value_if_unset(op.prefix, "") or ""
+        separator = "_" if prefix else ""
+        writes = {f"{prefix}{separator}{v}" for v in types}
+        strict = bool(value_if_unset(op.strict, False))
+        return _Effects(
+            {op.input_column}, writes, strict, row_wise=strict, removable=strict
+        )
+    if t in (Type.APPLYMAPPING, Type.CUT, Type.DEVIATIONSQUARES):
+        return _Effects(
+            {op.input_column}, {op.output_column}, row_wise=True, removable=True
+        )
+    if t in (Type.ADDCOLUMNS, Type.MULTIPLYCOLUMNS):
+        return _Effects(
+            set(op.input_columns), {op.output_column}, row_wise=True, removable=True
+        )
+    if t in (Type.SCALE, Type.EXTRACTDICTFIELD, Type.APPLYREGEX):
+        return _Effects(
+            set(op.input_columns),
+            set(_outputs(op, op.input_columns)),
+            row_wise=True,
+            removable=True,
+        )
+    if t == Type.NEWCOLUMN:
+        random = is_set(op.random) and op.random is not None
+        return _Effects(set(), {op.name}, row_wise=not random, removable=True)
+    if t == Type.COMPUTETIMESINCE:
+        return _Effects(
+            {op.date_column}, {op.output_column}, row_wise=True, removable=True
+        )
+    if t == Type.TIMEDIFF:
+        return _Effects(
+            {op.start_column, op.end_column},
+            {value_if_unset(op.output_column, "duration")},
+            row_wise=True,
+            removable=not value_if_unset(op.filter_na, True),
+        )
+    if t == Type.ASTYPE:
+        columns = set(op.type_map.to_dict())
+        return _Effects(columns, columns, row_wise=True, removable=True)
+    if t == Type.FILLNA:
+        columns = value_if_unset(op.columns, None)
+        if not columns:
+            return _Effects(None, set(), exact_writes=False)
+        method = value_if_unset(op.method, None) or models.FillNAMethod.VALUE
+        row_wise = models.FillNAMethod(method) == models.FillNAMethod.VALUE
+        return _Effects(set(columns), set(columns), row_wise=row_wise, removable=True)
+    if t == Type.DROPNA:
+        subset = value_if_unset(op.subset, None)
+        return _Effects(set(subset) if subset else None, row_wise=True)
+    if t == Type.DROPDUPLICATES:
+        columns = value_if_unset(op.columns, None)
+        return _Effects(set(columns) if columns else None)
+    # Other operations can read and write any column.
+    return _Effects(None, set(), exact_writes=False)
+
+
+def _is_filter(op) -> bool:
+    return models.PreprocessingOperationType(
+        op.type
+    ) == Type.FILTER and not value_if_unset(op.output_column, None)
+
+
+def _is_select(op, allow_create: bool = False) -> bool:
+    if models.PreprocessingOperationType(op.type) != Type.SELECT:
+        return False
+    return allow_create or not value_if_unset(op.create_if_missing, False)
+
+
+def _comparator(op) -> models.ComparisonType:
+    return models.ComparisonType(getattr(op.comparator, "value", op.comparator))
+
+
+def _in_place(op) -> bool:
+    return _outputs(op, op.input_columns) == op.input_columns
+
+
+def _merge(first, second) -> Optional[list]:
+    """Returns the operations equivalent to two adjacent operations, or None if they cannot be merged."""
+    t1 = models.PreprocessingOperationType(first.type)
+    t2 = models.PreprocessingOperationType(second.type)
+    if _is_select(first) and _is_select(second):
+        if set(second.columns) <= set(first.columns):
+            return [second]
+    if t1 == Type.DROP and _is_select(second):
+        if not set(first.columns) & set(second.columns):
+            return [second]
+    if t1 == Type.DROP and t2 == Type.DROP:
+        columns = list(first.columns) + [
+            c for c in second.columns if c not in first.columns
+        ]
+        return [models.Drop(type=Type.DROP, columns=columns)]
+    if _is_filter(first) and _is_filter(second) and first.column == second.column:
+        return _merge_filters(first, second)
+    if t1 == Type.SCALE and t2 == Type.SCALE and _in_place(second):
+        if second.input_columns == _outputs(first, first.input_columns):
+            return [
+                models.Scale(
+                    type=Type.SCALE,
+                    input_columns=first.input_columns,
+                    output_columns=first.output_columns,
+                    scale=first.scale * second.scale,
+                )
+            ]
+    if t1 == Type.RENAME and t2 == Type.RENAME:
+        return _merge_renames(first, second)
+    return None
+
+
+def _merge_filters(first, second) -> Optional[list]:
+    if first.to_dict() == second.to_dict():
+        return [first]
+    comparator = _comparator(first)
+    if comparator != _comparator(second):
+        return None
+    if comparator == models.ComparisonType.ISIN:
+        values = [v for v in first.values if v in set(second.values)]
+        return [models.Filter.from_dict({**first.to_dict(), "values": values})]
+    numerical = value_if_unset(first.numerical, False)
+    if (
+        comparator in _ORDER_FILTERS
+        and numerical
+        and value_if_unset(second.numerical, False)
+    ):
+        value = _ORDER_FILTERS[comparator](float(first.value), float(second.value))
+        return [models.Filter.from_dict({**first.to_dict(), "value": str(value)})]
+    return None
+
+
+def _renames_columns(op) -> bool:
+    """Whether a rename operation renames columns (and ignores missing columns)."""
+    axis = getattr(op.axis, "value", value_if_unset(op.axis, "columns"))
+    return axis == models.RenameAxis.COLUMNS and not value_if_unset(op.errors, True)
+
+
+def _merge_renames(first, second) -> Optional[list]:
+    if not (_renames_columns(first) and _renames_columns(second)):
+        return None
+    m1, m2 = first.mapper.to_dict(), second.mapper.to_dict()
+    mapper = {k: m2.get(v, v) for k, v in m1.items()}
+    mapper.update({k: v for k, v in m2.items() if k not in m1})
+    merged = models.Rename.from_dict(first.to_dict())
+    merged.mapper = models.RenameMapper.from_dict(mapper)
+    return [merged]
+
+
+def _is_noop(op) -> bool:
+    t = models.PreprocessingOperationType(op.type)
+    if t == Type.SCALE:
+        return op.scale == 1 and _in_place(op)
+    if t == Type.DROP:
+        return not op.columns
+    if t == Type.RENAME:
+        return not op.mapper.to_dict()
+    return False
+
+
+def _describe(op) -> str:
+    return str(op.type)
+
+
+def _merge_pass(chain: list, changes: list[str]) -> list:
+    result = []
+    for op in chain:
+        if _is_noop(op):
+            changes.append(f"removed {_describe(op)} without effect")
+            continue
+        merged = _merge(result[-1], op) if result else None
+        if merged is not None:
+            changes.append(f"merged {_describe(result[-1])} and {_describe(op)}")
+            result[-1:] = merged
+        else:
+            result.append(op)
+    return result
+
+
+def _can_move_filter_before(op, column: str) -> bool:
+    """Whether a filter on a column can be moved before an operation."""
+    t = models.PreprocessingOperationType(op.type)
+    if _is_filter(op):
+        return False  # Filters keep their relative order.
+    if _is_select(op):
+        return column in op.columns
+    if t == Type.DROP:
+        return column not in op.columns
+    if t == Type.RENAME and _renames_columns(op):
+        mapper = op.mapper.to_dict()
+        return column not in mapper and column not in mapper.values()
+    effects = _effects(op)
+    return effects.row_wise and effects.exact_writes and column not in effects.writes
+
+
+def _filter_pass(chain: list, changes: list[str]) -> list:
+    result = []
+    for op in chain:
+        position = len(result)
+        if _is_filter(op):
+            while position > 0 and _can_move_filter_before(
+                result[position - 1], op.column
+            ):
+                position -= 1
+        if position < len(result):
+            changes.append(
+                f"moved filter on {op.column} before {_describe(result[position])}"
+            )
+        result.insert(position, op)
+    return result
+
+
+def _mention(op, mentioned: Optional[set]) -> Optional[set]:
+    """Adds the columns used in any way by an operation to a set (None if it may use any column)."""
+    if mentioned is None:
+        return None
+    t = models.PreprocessingOperationType(op.type)
+    if _is_select(op, allow_create=True) or t == Type.DROP:
+        return mentioned | set(op.columns)
+    if t == Type.RENAME and _renames_columns(op):
+        mapper = op.mapper.to_dict()
+        return mentioned | set(mapper) | set(mapper.values())
+    effects = _effects(op)
+    if effects.reads is None or not effects.exact_writes:
+        return None
+    return mentioned | effects.reads | effects.writes
+
+
+def _dead_column_pass(
+    chain: list, output_columns: Optional[list[str]], changes: list[str]
+) -> tuple[list, Optional[set]]:
+    """
+    Removes operations whose outputs are not used, and returns the input columns used.
+
+    The input columns are None if they cannot be determined, e.g. when the chain contains
+    an operation that reads all columns, or that may create columns that are not known
+    statically (such as a non-strict one-hot encoding).
+    """
+    needed = None if output_columns is None else set(output_columns)
+    # Whether the columns in needed must all exist in the input data.
+    exact = True
+    # The columns used in any way by the operations kept after the current one (None if
+    # these operations may use any column).
+    mentioned = set()
+    result = []
+    for op in reversed(chain):
+        t = models.PreprocessingOperationType(op.type)
+        if _is_select(op, allow_create=True):
+            needed = set(op.columns)
+            exact = True
+        elif t == Type.RENAME and _renames_columns(op):
+            mapper = op.mapper.to_dict()
+            if needed is not None:
+                needed = {k for k, v in mapper.items() if v in needed} | {
+                    c for c in needed if c not in mapper
+                }
+        elif t == Type.DROP:
+            # The columns would be removed later anyway, unless a later operation reads,
+            # creates or renames them (e.g., a selection creating missing columns).
+            if (
+                needed is not None
+                and mentioned is not None
+                and not set(op.columns) & mentioned
+            ):
+                changes.append(f"removed {_describe(op)} of unused columns")
+                continue
+        else:
+            effects = _effects(op)
+            if (
+                needed is not None
+                and effects.removable
+                and effects.writes
+                and not effects.writes & needed
+            ):
+                changes.append(f"removed {_describe(op)} creating unused columns")
+                continue
+            if effects.reads is None:
+                needed = None
+            elif needed is not None:
+                if effects.exact_writes:
+                    needed -= effects.writes
+                else:
+                    # Some needed columns may be created by the operation.
+                    exact = False
+                needed |= effects.reads
+        mentioned = _mention(op, mentioned)
+        result.append(op)
+    result.reverse()
+    return result, needed if exact else None
+
+
+def optimize_chain(
+    chain: list[models.PreprocessingOperation],
+    output_columns: list[str] = None,
+    prune_inputs: bool = True,
+) -> tuple[list[models.PreprocessingOperation], list[str]]:
+    """
+    Rewrites a preprocessing chain into an equivalent chain that does less work.
+
+    Args:
+        chain (list[models.PreprocessingOperation]): the operations of the chain.
+        output_columns (list[str], optional): the columns used after the chain (e.g., when the
+            chain is followed by a selection). If None, all output columns are assumed to be used.
+        prune_inputs (bool, optional): whether to select the input columns used by the chain
+            at its start. This requires that all these columns exist in the input data.
+
+    Returns:
+        tuple[list[models.PreprocessingOperation], list[str]]: the optimized chain, and a
+            description of the changes made.
+    """
+    changes = []
+    chain = [as_operation_model(op) for op in chain]
+    previous = None
+    needed = None
+    while previous != [op.to_dict() for op in chain]:
+        previous = [op.to_dict() for op in chain]
+        chain = _merge_pass(chain, changes)
+        chain, needed = _dead_column_pass(chain, output_columns, changes)
+        chain = _filter_pass(chain, changes)
+    starts_with_select = chain and _is_select(chain[0], allow_create=True)
+    creates_columns = any(_is_select(op, True) and not _is_select(op) for op in chain)
+    if prune_inputs and needed is not None and not starts_with_select:
+        if not creates_columns and output_columns is not None:
+            chain.insert(0, models.Select(type=Type.SELECT, columns=sorted(needed)))
+            changes.append(f"selected the {len(needed)} input columns used")
+    return chain, changes
+
+
+class OptimizationReport:
+    """The result of the optimization of a preprocessing chain."""
+
+    def __init__(
+        self,
+        original: list[models.PreprocessingOperation],
+        optimized: list[models.PreprocessingOperation],
+        changes: list[str],
+    ):
+        self.original = original
+        self.optimized = optimized
+        self.changes = changes
+        # Set by `compare` when run on sample data.
+        self.equivalent: bool = None
+        self.profile_before: pd.DataFrame = None
+        self.profile_after: pd.DataFrame = None
+        # The error raised when running either chain on the sample, if any.
+        self.error: Exception = None
+
+    def compare(self, sample: pd.DataFrame) -> bool:
+        """
+        Runs both chains on sample data, checking that their outputs are equal.
+
+        This also estimates the work saved by the optimization (see `.summary`).
+
+        Args:
+            sample (pd.DataFrame): the sample data.
+
+        Returns:
+            bool: whether the two chains return the same data on the sample (False if
+                either chain fails on the sample).
+        """
+        self.error, self.profile_before, self.profile_after = None, None, None
+        try:
+            before, self.profile_before = profile_chain(self.original, sample)
+            after, self.profile_after = profile_chain(self.optimized, sample)
+        # Either chain failing on the sample (e.g., a missing column) is a difference.
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            self.equivalent = False
+            self.error = err
+            return self.equivalent
+        try:
+            pd.testing.assert_frame_equal(before, after, check_dtype=False)
+            self.equivalent = True
+        except AssertionError:
+            self.equivalent = False
+        return self.equivalent
+
+    def summary(self) -> str:
+        """Returns a human-readable summary of the optimization."""
+        lines = [
+            f"{len(self.original)} operations -> {len(self.optimized)} operations.",
+            *[f" - {change}" for change in self.changes],
+        ]
+        if self.error is not None:
+            lines.append(
+                f"The chains could not be compared on the sample data: {self.error!r}."
+            )
+        elif self.profile_after is not None:
+            cells_before = (
+                self.profile_before["rows"] * self.profile_before["columns"]
+            ).sum()
+            cells_after = (
+                self.profile_after["rows"] * self.profile_after["columns"]
+            ).sum()
+            lines.append(
+                f"On the sample data, operations output {cells_before} values in total "
+                f"before optimization and {cells_after} after "
+                f"({self.profile_before['duration'].sum():.4f}s -> "
+                f"{self.profile_after['duration'].sum():.4f}s). "
+                f"Outputs are {'equal' if self.equivalent else 'DIFFERENT'}."
+            )
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.summary()
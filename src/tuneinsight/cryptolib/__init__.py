@@ -42,3 +42,5 @@ This depends on the error `err`. Contact the Tune Insight team for help.
 
 # Expose the cryptolib one level up (`from tuneinsight import cryptolib` should work)
 from .cryptolib import *
+from .ciphertext import Ciphertext
+from .parallel import decrypt_many, encrypt_many
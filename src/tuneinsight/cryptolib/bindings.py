@@ -0,0 +1,422 @@
+"""
+Low-level ctypes bindings to the compiled Go cryptolib.
+
+This module loads the shared library, declares the prototype (argument and return
+types) of each exported function once, and manages the buffers returned by the
+library. It is intended for internal use: use the functions in `cryptolib.cryptolib`
+instead.
+
+Results are wrapped in `GoBuffer` objects. cgo does not allow returning Go memory to C,
+so strings and byte arrays returned by the library are allocated on the C heap (with
+`C.CString` and `C.CBytes`, i.e. `malloc`). The headers do not document which results
+are handed over to the caller, so buffers are only released for the functions listed in
+`OWNED_RESULTS`, which return a new result at each call (encryption, decryption, and
+post-processing); results of other functions (e.g., the last error, keys and operator
+ids, which the library may keep) are never released. Owned buffers are released when
+closed (or, as a fallback, when garbage collected), with the `free` of the C runtime.
+On Windows, the C runtime used by the library cannot be determined, so buffers are not
+released. The number of owned buffers allocated and released is tracked and can be
+inspected with `allocation_stats()`.
+
+## Concurrency
+
+The library is loaded with `ctypes.cdll`, which releases the GIL during calls, so
+that calls from different threads run in parallel. Functions that create or modify
+cryptosystems (see `EXCLUSIVE_FUNCTIONS`) run alone, while other functions (e.g.,
+encryption and decryption) can run concurrently with each other, as long as they use
+different cryptosystems: calls on the same cryptosystem (see `OPERATOR_FUNCTIONS`) are
+serialized, since the library does not document that its operators are thread-safe.
+
+Errors are stored by the library in a single global variable: when a call fails, the
+error is read immediately, before the locks held for the call are released. Calls are
+never repeated (they may have side effects). The error of a failed call is therefore
+exact, unless a call on another cryptosystem fails at the same time, in which case the
+two errors may be swapped. When running batches of calls on several cryptosystems, only
+the failure itself (e.g., the first error raised for the batch) is reliable.
+
+"""
+
+from contextlib import contextmanager, nullcontext
+import ctypes
+from os.path import exists
+from pathlib import Path
+import platform
+import sys
+import threading
+import warnings
+import weakref
+
+
+class _ErrorObject:
+    """
+    An empty object that raises error whenever one of its attributes is accessed.
+
+    This is used as the "shared library object" when the cryptolib is not found,
+    so that users get friendlier error messages when trying to use it (in case
+    they missed the initial warning).
+
+    """
+
+    def __getattr__(self, _):
+        raise ImportError("Could not load the cryptolib: contact your administrator.")
+
+
+# Find the shared library for the compiled Go Cryptolib.
+cwd = Path(__file__).absolute().parent
+arch = platform.machine()
+if arch == "aarch64":
+    arch = "arm64"  # Handle special case for Linux in docker.
+os = platform.system().lower()
+ext = "dll" if os == "windows" else "so"
+cryptolib_path = cwd / "build" / f"cryptolib-{os}_{arch}.{ext}"
+
+# If not found, the shared library will be an object that raises errors whenever it is used.
+so = _ErrorObject()
+LOADED = False
+
+if not exists(cryptolib_path):
+    warnings.warn(
+        "Could not find the cryptolib library. Your platform might not be supported."
+    )
+else:
+    try:
+        so = ctypes.cdll.LoadLibrary(str(cryptolib_path))
+        LOADED = True
+    except OSError as err:
+        warnings.warn(
+            f"Failed to load cryptolib ({err}). Some functionality might be affected."
+        )
+
+
+# Prototypes of the functions exported by the cryptolib (see build/cryptolib-*.h).
+# Pointers returned by the library are declared as c_void_p so that they can be released.
+# Binary inputs (void*) are passed as c_char_p, which accepts bytes without copying.
+_str = ctypes.c_char_p
+_ptr = ctypes.c_void_p
+_size = ctypes.c_size_t
+
+PROTOTYPES: dict[str, tuple[list, type]] = {
+    "GetLastGoError": ([], _ptr),
+    "NewPolynomialCkksParams": ([], _ptr),
+    "NewCkksOperatorFromB64Parameters": ([_str], _ptr),
+    "NewCkksOperatorFromB64SchemeContext": ([_str], _ptr),
+    "GenKeyPair": ([_str], _ptr),
+    "GetSecretKeyB64": ([_str], _ptr),
+    "GetPublicKeyB64": ([_str], _ptr),
+    "GetRelinearizationKeyBytes": ([_str], _ptr),
+    "EncryptFloatMatrix": ([_str, _str], _ptr),
+    "DecryptCipherTable": ([_str, _str, _size], _ptr),
+    "DecryptStatistics": ([_str, _str, _size], _ptr),
+    "GenRelinearizationKey": ([_str], _ptr),
+    "EncodeBase64Url": ([_str, _size], _ptr),
+    "DecodeBase64Url": ([_str], _ptr),
+    "DecodeBase64UrlSize": ([_str], _size),
+    "GenerateEvaluator": ([_str], _ptr),
+    "GenerateEncryptor": ([_str], _ptr),
+    "GenerateDecryptor": ([_str], _ptr),
+    "InstantiateScheme": ([_str], _ptr),
+    "EncryptNumber": ([_str, _str], _ptr),
+    "DecryptNumber": ([_str, _str, _size], _ptr),
+    "Add": ([_str, _str, _str, _size, _size], _ptr),
+    "Multiply": ([_str, _str, _str, _size, _size], _ptr),
+    "PolynomialEvaluation": ([_str, _str, _size, _str, _size], _ptr),
+    "PostProcessSurvivalDP": ([_str], _ptr),
+    "KaplanMeierConfidenceInterval": ([_str, _str], _ptr),
+    "PostProcessStatistics": ([_str], _ptr),
+    "StatisticsConfidenceInterval": ([_str, _str], _ptr),
+}
+
+
+# Functions whose results are new buffers handed over to the caller, which releases them.
+OWNED_RESULTS = {
+    "EncryptFloatMatrix",
+    "DecryptCipherTable",
+    "DecryptStatistics",
+    "EncryptNumber",
+    "DecryptNumber",
+    "Add",
+    "Multiply",
+    "PolynomialEvaluation",
+    "EncodeBase64Url",
+    "DecodeBase64Url",
+    "PostProcessSurvivalDP",
+    "KaplanMeierConfidenceInterval",
+    "PostProcessStatistics",
+    "StatisticsConfidenceInterval",
+}
+
+# Functions that create or modify cryptosystems, which never run concurrently with other calls.
+EXCLUSIVE_FUNCTIONS = {
+    "NewPolynomialCkksParams",
+    "NewCkksOperatorFromB64Parameters",
+    "NewCkksOperatorFromB64SchemeContext",
+    "GenKeyPair",
+    "GenRelinearizationKey",
+    "GenerateEvaluator",
+    "GenerateEncryptor",
+    "GenerateDecryptor",
+    "InstantiateScheme",
+}
+
+
+# Functions whose first argument is the id of a cryptosystem (operator). Calls on the same
+# operator are never run concurrently.
+OPERATOR_FUNCTIONS = {
+    name
+    for name in PROTOTYPES
+    if name
+    not in {
+        "GetLastGoError",
+        "NewPolynomialCkksParams",
+        "NewCkksOperatorFromB64Parameters",
+        "NewCkksOperatorFromB64SchemeContext",
+        "EncodeBase64Url",
+        "DecodeBase64Url",
+        "DecodeBase64UrlSize",
+        "PostProcessSurvivalDP",
+        "KaplanMeierConfidenceInterval",
+        "PostProcessStatistics",
+        "StatisticsConfidenceInterval",
+    }
+}
+
+
+def _declare_prototypes(library) -> dict[str, ctypes._CFuncPtr]:
+    """Sets the prototypes of all exported functions, returning the functions found."""
+    functions = {}
+    for name, (argtypes, restype) in PROTOTYPES.items():
+        try:
+            func = getattr(library, name)
+        except AttributeError:
+            # Older versions of the library might not export all functions.
+            continue
+        func.argtypes = argtypes
+        func.restype = restype
+        functions[name] = func
+    return functions
+
+
+_functions = _declare_prototypes(so) if LOADED else {}
+
+
+def _load_free():
+    """Returns the C free function used to release buffers allocated by the library."""
+    if sys.platform == "win32":
+        # The library may not use the same C runtime (and heap) as msvcrt.
+        return None
+    try:
+        free = ctypes.CDLL(None).free
+    except (OSError, AttributeError):
+        warnings.warn("Could not find free: cryptolib buffers will not be released.")
+        return None
+    free.argtypes = [ctypes.c_void_p]
+    free.restype = None
+    return free
+
+
+_free = _load_free() if LOADED else None
+
+# Whether buffers returned by the library are released (disable to debug memory issues).
+FREE_BUFFERS = True
+
+
+class _AllocationStats:
+    """Thread-safe counters of the buffers allocated by the library and released."""
+
+    def __init__(self):
+        self.allocated = 0
+        self.released = 0
+        self._lock = threading.Lock()
+
+    def record(self, allocated: int = 0, released: int = 0):
+        with self._lock:
+            self.allocated += allocated
+            self.released += released
+
+
+_stats = _AllocationStats()
+
+
+class _SharedLock:
+    """A readers-writer lock: shared holders run concurrently, exclusive holders run alone."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        # Waiting writers block new readers, so that writers are not starved.
+        self._waiting_writers = 0
+
+    @contextmanager
+    def shared(self):
+        """Holds the lock in shared mode."""
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        """Holds the lock in exclusive mode."""
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+_lock = _SharedLock()
+
+# One lock per operator id, created on first use.
+_operator_locks: dict[bytes, threading.Lock] = {}
+_operator_locks_lock = threading.Lock()
+
+
+def _operator_lock(operator_id: bytes) -> threading.Lock:
+    """Returns the lock serializing the calls on an operator."""
+    with _operator_locks_lock:
+        lock = _operator_locks.get(operator_id)
+        if lock is None:
+            lock = _operator_locks[operator_id] = threading.Lock()
+        return lock
+
+
+def allocation_stats() -> dict[str, int]:
+    """
+    Returns the number of owned buffers returned by the cryptolib, released, and still alive.
+
+    Returns:
+        dict[str, int]: the counters "allocated", "released" and "live".
+    """
+    allocated, released = _stats.allocated, _stats.released
+    return {"allocated": allocated, "released": released, "live": allocated - released}
+
+
+def _release(address: int, owned: bool):
+    """Releases a buffer allocated by the library, if it is owned by the caller."""
+    if not owned:
+        return
+    if FREE_BUFFERS and _free is not None:
+        _free(address)  # pylint: disable=not-callable
+    _stats.record(released=1)
+
+
+class GoBuffer:
+    """
+    A buffer returned by the cryptolib.
+
+    If the buffer is owned by Python (see `OWNED_RESULTS`), it is released when `release`
+    is called, when exiting a `with` block, or when the object is garbage collected,
+    whichever comes first. The content of the buffer must be copied (with `.read_string()`
+    or `.read_bytes()`) before it is released. Buffers that are not owned are never released,
+    but can no longer be read once `release` is called.
+    """
+
+    def __init__(self, address: int, owned: bool = True):
+        self.address = address
+        self.owned = owned
+        if owned:
+            _stats.record(allocated=1)
+        self._finalizer = weakref.finalize(self, _release, address, owned)
+
+    def _check(self):
+        if not self._finalizer.alive:
+            raise ValueError("The buffer has already been released.")
+
+    def read_string(self) -> bytes:
+        """Returns a copy of the buffer, read as a NUL-terminated string."""
+        self._check()
+        return ctypes.string_at(self.address)
+
+    def read_length(self) -> int:
+        """Returns the length of a length-prefixed buffer (stored in its first 8 bytes)."""
+        self._check()
+        return int.from_bytes(ctypes.string_at(self.address, 8), "little")
+
+    def read_bytes(self) -> bytes:
+        """Returns a copy of the content of a length-prefixed buffer."""
+        return ctypes.string_at(self.address + 8, self.read_length())
+
+    def content_pointer(self) -> tuple[ctypes.c_char_p, int]:
+        """
+        Returns a pointer to the content of a length-prefixed buffer, and its length.
+
+        The pointer can be passed as input to the library without copying the content.
+        It is only valid as long as the buffer is not released.
+        """
+        length = self.read_length()
+        return ctypes.cast(self.address + 8, ctypes.c_char_p), length
+
+    def release(self):
+        """Releases the buffer (this has no effect if it was already released)."""
+        self._finalizer()
+
+    def __enter__(self) -> "GoBuffer":
+        return self
+
+    def __exit__(self, *_):
+        self.release()
+
+
+def function(name: str):
+    """Returns a function exported by the cryptolib, with its prototype declared."""
+    func = _functions.get(name)
+    if func is None:
+        # Raises an ImportError if the library is not loaded.
+        func = getattr(so, name)
+    return func
+
+
+def go_error() -> Exception:
+    """Returns a python exception from the latest go error."""
+    # The error message is not released, as it might be owned by the library.
+    address = function("GetLastGoError")()
+    error_message = "unknown error"
+    if address is not None:
+        error_message = ctypes.string_at(address).decode("utf-8", errors="replace")
+    if "not found" in error_message:
+        return ValueError(error_message)
+    return Exception(error_message)
+
+
+def call(name: str, *args) -> GoBuffer:
+    """Calls a function of the cryptolib that returns a buffer, raising an error if it fails."""
+    func = function(name)
+    lock = _lock.exclusive if name in EXCLUSIVE_FUNCTIONS else _lock.shared
+    # The operator lock is always taken before the global lock, so that they cannot deadlock.
+    operator_lock = (
+        _operator_lock(args[0]) if name in OPERATOR_FUNCTIONS else nullcontext()
+    )
+    with operator_lock, lock():
+        address = func(*args)
+        # The last error is shared by all threads: read it right away, while holding the locks.
+        error = go_error() if address is None else None
+    if error is not None:
+        raise error
+    return GoBuffer(address, owned=name in OWNED_RESULTS)
+
+
+def call_string(name: str, *args) -> bytes:
+    """Calls a function of the cryptolib that returns a (NUL-terminated) string."""
+    with call(name, *args) as buffer:
+        return buffer.read_string()
+
+
+def call_bytes(name: str, *args) -> bytes:
+    """Calls a function of the cryptolib that returns length-prefixed bytes."""
+    with call(name, *args) as buffer:
+        return buffer.read_bytes()
@@ -0,0 +1,150 @@
+"""
+Ciphertexts kept in memory allocated by the cryptolib.
+
+The functions of `cryptolib.cryptolib` (e.g., `encrypted_addition`) take and return
+serialized ciphertexts as python bytes, which copies each intermediate ciphertext from
+the memory of the library to python. A `Ciphertext` instead keeps the buffer returned
+by the library, and passes it as is to the next operation. The ciphertext is only
+copied to python when it is serialized with `bytes(ciphertext)`:
+
+```python
+x = Ciphertext.encrypt(operator_id, 3)
+y = (x * x + x).poly([1, 0, 2])
+bytes(y)  # Only y is copied to python.
+y.decrypt()
+```
+
+"""
+
+from typing import Union
+
+from .bindings import GoBuffer, call, call_bytes
+from .cryptolib import decode_number, encode_coefficients
+
+
+class Ciphertext:
+    """
+    A ciphertext of a number, encrypted with a cryptosystem (operator) of the cryptolib.
+
+    Ciphertexts support addition and multiplication with other ciphertexts of the same
+    operator and with plaintext numbers, as well as the evaluation of plaintext polynomials.
+    """
+
+    def __init__(
+        self, hefloat_operator_id: bytes, buffer: GoBuffer = None, data: bytes = None
+    ):
+        """
+        Wraps a ciphertext, either in a buffer of the cryptolib or as serialized bytes.
+
+        Use `Ciphertext.encrypt` or `Ciphertext.from_bytes` instead of this constructor.
+
+        Args:
+            hefloat_operator_id (bytes): The crypto system id
+            buffer (GoBuffer, optional): a length-prefixed buffer holding the ciphertext.
+            data (bytes, optional): the serialized ciphertext.
+        """
+        if (buffer is None) == (data is None):
+            raise ValueError("Exactly one of buffer or data must be set.")
+        self.operator_id = hefloat_operator_id
+        self._buffer = buffer
+        self._data = data
+
+    @classmethod
+    def encrypt(cls, hefloat_operator_id: bytes, number: Union[int, float]):
+        """Encrypts a number (see cryptolib.encrypt_number)."""
+        byte_number = str(number).encode("UTF-8")
+        return cls(
+            hefloat_operator_id, call("EncryptNumber", hefloat_operator_id, byte_number)
+        )
+
+    @classmethod
+    def from_bytes(cls, hefloat_operator_id: bytes, data: bytes):
+        """Wraps a serialized ciphertext (e.g., returned by cryptolib.encrypt_number)."""
+        return cls(hefloat_operator_id, data=bytes(data))
+
+    def _argument(self) -> tuple:
+        """Returns the ciphertext as an argument to the library (without copying it), and its size."""
+        if self._buffer is not None:
+            return self._buffer.content_pointer()
+        if self._data is None:
+            raise ValueError("The ciphertext has been released.")
+        return self._data, len(self._data)
+
+    def _check_operand(self, other: "Ciphertext"):
+        if other.operator_id != self.operator_id:
+            raise ValueError("Ciphertexts must be encrypted with the same operator.")
+
+    def __add__(self, other: Union["Ciphertext", int, float]) -> "Ciphertext":
+        if isinstance(other, (int, float)):
+            return self.poly([other, 1])
+        if not isinstance(other, Ciphertext):
+            return NotImplemented
+        self._check_operand(other)
+        (a, size_a), (b, size_b) = self._argument(), other._argument()
+        return Ciphertext(
+            self.operator_id, call("Add", self.operator_id, a, b, size_a, size_b)
+        )
+
+    def __mul__(self, other: Union["Ciphertext", int, float]) -> "Ciphertext":
+        if isinstance(other, (int, float)):
+            return self.poly([0, other])
+        if not isinstance(other, Ciphertext):
+            return NotImplemented
+        self._check_operand(other)
+        (a, size_a), (b, size_b) = self._argument(), other._argument()
+        return Ciphertext(
+            self.operator_id, call("Multiply", self.operator_id, a, b, size_a, size_b)
+        )
+
+    __radd__ = __add__
+    __rmul__ = __mul__
+
+    def poly(self, coefficients: list[Union[int, float]]) -> "Ciphertext":
+        """
+        Evaluates a plaintext polynomial on this ciphertext.
+
+        Args:
+            coefficients (list[int | float]): the coefficients of the polynomial, by increasing degree.
+        """
+        polynomial = encode_coefficients(coefficients)
+        number, size = self._argument()
+        return Ciphertext(
+            self.operator_id,
+            call(
+                "PolynomialEvaluation",
+                self.operator_id,
+                polynomial,
+                len(polynomial),
+                number,
+                size,
+            ),
+        )
+
+    def __bytes__(self) -> bytes:
+        """Serializes the ciphertext (e.g., to upload it). The serialization is cached."""
+        if self._data is None:
+            self._argument()
+            self._data = self._buffer.read_bytes()
+        return self._data
+
+    def __len__(self) -> int:
+        if self._data is not None:
+            return len(self._data)
+        return self._argument()[1]
+
+    def decrypt(self) -> float:
+        """Decrypts the ciphertext (see cryptolib.decrypt_number)."""
+        number, size = self._argument()
+        return decode_number(
+            call_bytes("DecryptNumber", self.operator_id, number, size)
+        )
+
+    def release(self):
+        """
+        Releases the memory held by the library.
+
+        The ciphertext can no longer be used afterwards, unless it was serialized before.
+        """
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
@@ -15,63 +15,20 @@ from tuneinsight.cryptolib import *
 ```
 """
 
-import ctypes
-from pathlib import Path
-from os.path import exists
-import platform
 import warnings
+import numpy as np
 import pandas as pd
 
-
-class _ErrorObject:
-    """
-    An empty object that raises error whenever one of its attributes is accessed.
-
-    This is used as the "shared library object" when the cryptolib is not found,
-    so that users get friendlier error messages when trying to use it (in case
-    they missed the initial warning).
-
-    """
-
-    def __getattr__(self, _):
-        raise ImportError("Could not load the cryptolib: contact your administrator.")
-
-
-# Find the shared library for the compiled Go Cryptolib.
-cwd = Path(__file__).absolute().parent
-arch = platform.machine()
-if arch == "aarch64":
-    arch = "arm64"  # Handle special case for Linux in docker.
-os = platform.system().lower()
-ext = "dll" if os == "windows" else "so"
-cryptolib_path = cwd / "build" / f"cryptolib-{os}_{arch}.{ext}"
-
-# If not found, the shared library will be an object that raises errors whenever it is used.
-so = _ErrorObject()
-LOADED = False
-
-if not exists(cryptolib_path):
-    warnings.warn(
-        "Could not find the cryptolib library. Your platform might not be supported."
-    )
-else:
-    try:
-        so = ctypes.cdll.LoadLibrary(str(cryptolib_path))
-        LOADED = True
-    except OSError as err:
-        warnings.warn(
-            f"Failed to load cryptolib ({err}). Some functionality might be affected."
-        )
-
-
-def go_error() -> Exception:
-    """Raises a python exception from the latest go error."""
-    get_go_error = so.GetLastGoError
-    get_go_error.restype = ctypes.c_char_p
-    error_message = get_go_error()
-    if "not found" in str(error_message):
-        return ValueError(error_message)
-    return Exception(error_message)
+# The library object and allocation counters are re-exported from the bindings.
+from .bindings import (  # pylint: disable=unused-import
+    LOADED,
+    so,
+    allocation_stats,
+    call,
+    call_bytes,
+    call_string,
+    go_error,
+)
 
 
 def new_hefloat_operator_from_b64_hefloat_parameters(
@@ -85,12 +42,9 @@ def new_hefloat_operator_from_b64_hefloat_parameters(
     Returns:
         hefloat_operator_id (bytes): The HEFloat Operator id
     """
-    b64_hefloat_operator = so.NewCkksOperatorFromB64Parameters
-    b64_hefloat_operator.restype = ctypes.c_char_p
-    hefloat_operator_id = b64_hefloat_operator(hefloat_parameters_b64.encode())
-    if hefloat_operator_id is None:
-        raise go_error()
-    return hefloat_operator_id
+    return call_string(
+        "NewCkksOperatorFromB64Parameters", hefloat_parameters_b64.encode()
+    )
 
 
 def new_hefloat_operator_from_b64_scheme_context(scheme_context_b64: str) -> bytes:
@@ -102,12 +56,9 @@ def new_hefloat_operator_from_b64_scheme_context(scheme_context_b64: str) -> byt
     Returns:
         hefloat_operator_id (bytes): The HEFloat Operator id
     """
-    b64_hefloat_operator = so.NewCkksOperatorFromB64SchemeContext
-    b64_hefloat_operator.restype = ctypes.c_char_p
-    hefloat_operator_id = b64_hefloat_operator(scheme_context_b64.encode())
-    if hefloat_operator_id is None:
-        raise go_error()
-    return hefloat_operator_id
+    return call_string(
+        "NewCkksOperatorFromB64SchemeContext", scheme_context_b64.encode()
+    )
 
 
 def get_relin_key_bytes(hefloat_operator_id: bytes) -> bytes:
@@ -119,10 +70,7 @@ def get_relin_key_bytes(hefloat_operator_id: bytes) -> bytes:
     Returns:
         bytes: the relinearization key bytes
     """
-    get_relin_key = so.GetRelinearizationKeyBytes
-    get_relin_key.restype = ctypes.c_void_p
-    res = get_relin_key(hefloat_operator_id)
-    return _handle_bytes_result(res)
+    return call_bytes("GetRelinearizationKeyBytes", hefloat_operator_id)
 
 
 def key_generation(hefloat_operator_id: bytes) -> bytes:
@@ -134,12 +82,7 @@ def key_generation(hefloat_operator_id: bytes) -> bytes:
     Returns:
         key_response (bytes): The response message of the key generation
     """
-    key_gen = so.GenKeyPair
-    key_gen.restype = ctypes.c_char_p
-    key_response = key_gen(hefloat_operator_id)
-    if key_response is None:
-        raise go_error()
-    return key_response
+    return call_string("GenKeyPair", hefloat_operator_id)
 
 
 def get_secret_key_b64(hefloat_operator_id: bytes) -> bytes:
@@ -150,12 +93,7 @@ def get_secret_key_b64(hefloat_operator_id: bytes) -> bytes:
     Returns:
         get_sk_response (bytes): The bytes of the secret key
     """
-    get_sk = so.GetSecretKeyB64
-    get_sk.restype = ctypes.c_char_p
-    get_sk_response = get_sk(hefloat_operator_id)
-    if get_sk_response is None:
-        raise go_error()
-    return get_sk_response
+    return call_string("GetSecretKeyB64", hefloat_operator_id)
 
 
 def get_public_key_b64(hefloat_operator_id: bytes) -> bytes:
@@ -166,12 +104,7 @@ def get_public_key_b64(hefloat_operator_id: bytes) -> bytes:
     Returns:
         get_pk_response (bytes): The bytes of the public key
     """
-    get_pk = so.GetPublicKeyB64
-    get_pk.restype = ctypes.c_char_p
-    get_pk_response = get_pk(hefloat_operator_id)
-    if get_pk_response is None:
-        raise go_error()
-    return get_pk_response
+    return call_string("GetPublicKeyB64", hefloat_operator_id)
 
 
 def relinearization_key_generation(hefloat_operator_id: bytes) -> bytes:
@@ -183,12 +116,7 @@ def relinearization_key_generation(hefloat_operator_id: bytes) -> bytes:
     Returns:
         key_response (bytes): The response message of the key generation
     """
-    relin_key_gen = so.GenRelinearizationKey
-    relin_key_gen.restype = ctypes.c_char_p
-    key_response = relin_key_gen(hefloat_operator_id)
-    if key_response is None:
-        raise go_error()
-    return key_response
+    return call_string("GenRelinearizationKey", hefloat_operator_id)
 
 
 def instantiate_scheme(hefloat_operator_id: bytes) -> bytes:
@@ -200,12 +128,7 @@ def instantiate_scheme(hefloat_operator_id: bytes) -> bytes:
     Returns:
         scheme_response (bytes): The response message of the scheme instantiation
     """
-    instantiate_crypto_scheme = so.InstantiateScheme
-    instantiate_crypto_scheme.restype = ctypes.c_char_p
-    scheme_response = instantiate_crypto_scheme(hefloat_operator_id)
-    if scheme_response is None:
-        raise go_error()
-    return scheme_response
+    return call_string("InstantiateScheme", hefloat_operator_id)
 
 
 def encrypt_dataframe(hefloat_operator_id: bytes, dataframe: pd.DataFrame) -> bytes:
@@ -227,6 +150,73 @@ def encrypt_dataframe(hefloat_operator_id: bytes, dataframe: pd.DataFrame) -> by
     return ciphertext
 
 
+def encrypt_array(hefloat_operator_id: bytes, array: np.ndarray) -> bytes:
+    """Encrypts a numeric array (of dimension 1 or 2).
+
+    This is equivalent to encrypting `pd.DataFrame(array)` with encrypt_dataframe, but
+    avoids creating a dataframe. One-dimensional arrays are encrypted as a single column.
+
+    Args:
+        hefloat_operator_id (bytes): The crypto system id
+        array (np.ndarray): The values to encrypt, as an array of shape (rows,) or (rows, columns).
+
+    Returns:
+        ciphertext (bytes): The generated ciphertext
+    """
+    return encrypt_matrix(hefloat_operator_id, _array_to_csv(array))
+
+
+def encrypt_array_chunks(
+    hefloat_operator_id: bytes, array: np.ndarray, chunk_rows: int
+) -> list[bytes]:
+    """Encrypts a large numeric array as several ciphertexts of at most chunk_rows rows.
+
+    Only one chunk is serialized at a time, which bounds the memory used for encryption.
+    Rows keep their index in the whole array, so that decrypting the chunks (with
+    `decrypt_dataframe(..., with_index=True)`) and concatenating them recovers the array.
+
+    Args:
+        hefloat_operator_id (bytes): The crypto system id
+        array (np.ndarray): The values to encrypt, as an array of shape (rows,) or (rows, columns).
+        chunk_rows (int): The maximum number of rows encrypted in each ciphertext.
+
+    Returns:
+        list[bytes]: the ciphertexts of each chunk, in order.
+    """
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be positive.")
+    array = _as_float_matrix(array)
+    return [
+        encrypt_matrix(
+            hefloat_operator_id,
+            _array_to_csv(array[start : start + chunk_rows], first_index=start),
+        )
+        for start in range(0, len(array), chunk_rows)
+    ]
+
+
+def _as_float_matrix(array: np.ndarray) -> np.ndarray:
+    """Converts an array to a 2-dimensional float64 array."""
+    array = np.asarray(array, dtype=np.float64)
+    if array.ndim == 1:
+        array = array.reshape(-1, 1)
+    if array.ndim != 2:
+        raise ValueError(f"Expected an array of dimension 1 or 2, got {array.ndim}.")
+    return array
+
+
+def _array_to_csv(array: np.ndarray, first_index: int = 0) -> bytes:
+    """Formats an array as a CSV table with a header and an index, like DataFrame.to_csv."""
+    array = _as_float_matrix(array)
+    # repr gives the shortest representation that parses back to the same float.
+    lines = ["," + ",".join(map(str, range(array.shape[1])))]
+    lines.extend(
+        f"{i},{','.join(map(repr, row))}"
+        for i, row in enumerate(array.tolist(), start=first_index)
+    )
+    return ("\n".join(lines) + "\n").encode("UTF-8")
+
+
 def encrypt_matrix(hefloat_operator_id: bytes, csv_string: bytes) -> bytes:
     """Encrypts a csv formatted table of numbers.
 
@@ -237,15 +227,7 @@ def encrypt_matrix(hefloat_operator_id: bytes, csv_string: bytes) -> bytes:
     Returns:
         ciphertext (bytes): The generated ciphertext
     """
-    encrypt_float_matrix = so.EncryptFloatMatrix
-    encrypt_float_matrix.restype = ctypes.c_void_p
-    res = encrypt_float_matrix(hefloat_operator_id, csv_string)
-    if res is None:
-        raise go_error()
-    res_length = int.from_bytes(ctypes.string_at(res, 8), "little")
-    ciphertext = ctypes.string_at(res, res_length + 8)
-    ciphertext = ciphertext[8:]
-    return ciphertext
+    return call_bytes("EncryptFloatMatrix", hefloat_operator_id, csv_string)
 
 
 def decrypt_dataframe(
@@ -271,20 +253,16 @@ def decrypt_dataframe(
         plaintext_dataframe (pandas.DataFrame): The decrypted dataframe
     """
     plaintext_csv_bytes = decrypt_csv(hefloat_operator_id, dataframe_ciphertext)
-    if plaintext_csv_bytes is None:
-        raise go_error()
-    plaintext_csv = plaintext_csv_bytes.decode("utf8")
-    plaintext_dataframe = pd.DataFrame(
-        [row.split(",") for row in plaintext_csv.split("\n")]
-    )
-    # Treat the first column as an index if (1) there are more columns than headers, or
-    # (2) headers are None and there is more than one column.
-    num_cols = len(plaintext_dataframe.columns)
     if with_index:
-        plaintext_dataframe = plaintext_dataframe.set_index(
-            plaintext_dataframe.columns[0]
+        # The first column is used as index (kept as strings), the others are converted to floats.
+        cells = _csv_to_cells(plaintext_csv_bytes)
+        plaintext_dataframe = pd.DataFrame(
+            cells[:, 1:].astype(np.float64),
+            index=pd.Index(cells[:, 0]),
+            columns=range(1, cells.shape[1]),
         )
-    plaintext_dataframe.index.name = None
+    else:
+        plaintext_dataframe = pd.DataFrame(_csv_to_matrix(plaintext_csv_bytes))
     if headers is not None:
         num_cols = len(plaintext_dataframe.columns)
         if len(headers) < num_cols:
@@ -293,11 +271,62 @@ def decrypt_dataframe(
         if len(headers) > num_cols:
             headers = headers[:num_cols]
         plaintext_dataframe.columns = headers
-    # Convert values back to numeric
-    plaintext_dataframe = plaintext_dataframe.map(float)
     return plaintext_dataframe
 
 
+def decrypt_matrix(hefloat_operator_id: bytes, matrix_ciphertext: bytes) -> np.ndarray:
+    """
+    Decrypts a cipher table into a 2-dimensional array of floats.
+
+    This is faster than decrypt_dataframe when column names and indices are not needed.
+
+    Args:
+        hefloat_operator_id (bytes): The crypto system id
+        matrix_ciphertext (bytes): The encrypted matrix
+
+    Returns:
+        np.ndarray: the decrypted values, as a float64 array of shape (rows, columns).
+    """
+    return _csv_to_matrix(decrypt_csv(hefloat_operator_id, matrix_ciphertext))
+
+
+def _csv_to_matrix(plaintext_csv_bytes: bytes) -> np.ndarray:
+    """Parses a CSV string of numbers (without header) into a 2-dimensional array of floats."""
+    if plaintext_csv_bytes is None:
+        raise go_error()
+    # Trailing line breaks do not start a new row.
+    plaintext_csv = plaintext_csv_bytes.decode("utf8").rstrip("\r\n")
+    num_rows = plaintext_csv.count("\n") + 1
+    num_cells = plaintext_csv.count(",") + num_rows
+    # Parse all values at once. Depending on the version, numpy either stops at the
+    # first malformed value (with a warning) or raises an error.
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = np.fromstring(
+                plaintext_csv.replace("\n", ","), dtype=np.float64, sep=","
+            )
+        if values.size == num_cells and num_cells % num_rows == 0:
+            return values.reshape(num_rows, -1)
+    except ValueError:
+        pass
+    # Otherwise, parse cell by cell to raise an informative error.
+    return _csv_to_cells(plaintext_csv_bytes).astype(np.float64)
+
+
+def _csv_to_cells(plaintext_csv_bytes: bytes) -> np.ndarray:
+    """Splits a CSV string (without header) into a 2-dimensional array of strings."""
+    if plaintext_csv_bytes is None:
+        raise go_error()
+    # Trailing line breaks do not start a new row.
+    plaintext_csv = plaintext_csv_bytes.decode("utf8").rstrip("\r\n")
+    num_rows = plaintext_csv.count("\n") + 1
+    cells = np.array(plaintext_csv.replace("\n", ",").split(","))
+    if cells.size % num_rows != 0:
+        raise ValueError("The decrypted table is not rectangular.")
+    return cells.reshape(num_rows, -1)
+
+
 def decrypt_csv(hefloat_operator_id: bytes, csv_ciphertext: bytes) -> bytes:
     """
     Decrypts a cipher table into a CSV formatted string.
@@ -311,15 +340,9 @@ def decrypt_csv(hefloat_operator_id: bytes, csv_ciphertext: bytes) -> bytes:
     Returns:
         csv_plaintext (bytes): The decrypted csv string
     """
-    decrypt_cipher_table = so.DecryptCipherTable
-    decrypt_cipher_table.restype = ctypes.c_char_p
-    ctxt_length = len(csv_ciphertext)
-    csv_plaintext = decrypt_cipher_table(
-        hefloat_operator_id, csv_ciphertext, ctxt_length
+    return call_string(
+        "DecryptCipherTable", hefloat_operator_id, csv_ciphertext, len(csv_ciphertext)
     )
-    if csv_plaintext is None:
-        raise go_error()
-    return csv_plaintext
 
 
 def decrypt_stats(hefloat_operator_id: bytes, stat_ciphertext: bytes) -> bytes:
@@ -333,15 +356,9 @@ def decrypt_stats(hefloat_operator_id: bytes, stat_ciphertext: bytes) -> bytes:
     Returns:
         bytes: a JSON string representing a list[models.StatisticalResult].
     """
-    decrypt_encrypted_stats = so.DecryptStatistics
-    decrypt_encrypted_stats.restype = ctypes.c_char_p
-    ctxt_length = len(stat_ciphertext)
-    stats_plaintext = decrypt_encrypted_stats(
-        hefloat_operator_id, stat_ciphertext, ctxt_length
+    return call_string(
+        "DecryptStatistics", hefloat_operator_id, stat_ciphertext, len(stat_ciphertext)
     )
-    if stats_plaintext is None:
-        raise go_error()
-    return stats_plaintext
 
 
 def test_polynomial_evaluation_hefloat_params() -> str:
@@ -350,12 +367,7 @@ def test_polynomial_evaluation_hefloat_params() -> str:
     Returns:
         cryptoparameters_b64 (str): Base64 encoded marshalled HEFloat cryptoparameters
     """
-    new_test_polynomial_hefloat_params = so.NewPolynomialCkksParams
-    new_test_polynomial_hefloat_params.restype = ctypes.c_char_p
-    cryptoparameters_b64 = new_test_polynomial_hefloat_params()
-    if cryptoparameters_b64 is None:
-        raise go_error()
-    return cryptoparameters_b64
+    return call_string("NewPolynomialCkksParams")
 
 
 def encrypted_addition(
@@ -368,17 +380,9 @@ def encrypted_addition(
         hefloat_operator_id (bytes): The crypto system id
         number1, number2 (bytes): cyphertexts of the operands
     """
-    add = so.Add
-    add.restype = ctypes.c_void_p
-    number1_size = len(number1)
-    number2_size = len(number2)
-    result = add(hefloat_operator_id, number1, number2, number1_size, number2_size)
-    if result is None:
-        raise go_error()
-    res_length = int.from_bytes(ctypes.string_at(result, 8), "little")
-    ciphertext = ctypes.string_at(result, res_length + 8)
-    ciphertext = ciphertext[8:]
-    return ciphertext
+    return call_bytes(
+        "Add", hefloat_operator_id, number1, number2, len(number1), len(number2)
+    )
 
 
 def encrypted_multiplication(
@@ -391,17 +395,9 @@ def encrypted_multiplication(
         hefloat_operator_id (bytes): The crypto system id
         number1, number2 (bytes): cyphertexts of the operands
     """
-    multiply = so.Multiply
-    multiply.restype = ctypes.c_void_p
-    number1_size = len(number1)
-    number2_size = len(number2)
-    result = multiply(hefloat_operator_id, number1, number2, number1_size, number2_size)
-    if result is None:
-        raise go_error()
-    res_length = int.from_bytes(ctypes.string_at(result, 8), "little")
-    ciphertext = ctypes.string_at(result, res_length + 8)
-    ciphertext = ciphertext[8:]
-    return ciphertext
+    return call_bytes(
+        "Multiply", hefloat_operator_id, number1, number2, len(number1), len(number2)
+    )
 
 
 def encrypted_polynomial_evaluation(
@@ -417,28 +413,20 @@ def encrypted_polynomial_evaluation(
         polynomial_coefficients (list[int, float]): the polynomial to evaluate.
         number1 (bytes): ciphertexts of the operand
     """
-    polynomial_evaluation = so.PolynomialEvaluation
-    polynomial_evaluation.restype = ctypes.c_void_p
-    number_size = len(number)
-
-    polynomial_coefficients = [str(i) for i in polynomial_coefficients]
-    polynomial_coefficients = ",".join(polynomial_coefficients)
-    polynomial_coefficients = polynomial_coefficients.encode("UTF-8")
-    polynomial_size = len(polynomial_coefficients)
-
-    result = polynomial_evaluation(
+    polynomial = encode_coefficients(polynomial_coefficients)
+    return call_bytes(
+        "PolynomialEvaluation",
         hefloat_operator_id,
-        polynomial_coefficients,
-        polynomial_size,
+        polynomial,
+        len(polynomial),
         number,
-        number_size,
+        len(number),
     )
-    if result is None:
-        raise go_error()
-    res_length = int.from_bytes(ctypes.string_at(result, 8), "little")
-    ciphertext = ctypes.string_at(result, res_length + 8)
-    ciphertext = ciphertext[8:]
-    return ciphertext
+
+
+def encode_coefficients(polynomial_coefficients: list[int | float]) -> bytes:
+    """Encodes the coefficients of a polynomial as expected by the cryptolib."""
+    return ",".join(str(c) for c in polynomial_coefficients).encode("UTF-8")
 
 
 def encrypt_number(hefloat_operator_id: bytes, number1: int) -> bytes:
@@ -449,41 +437,79 @@ def encrypt_number(hefloat_operator_id: bytes, number1: int) -> bytes:
         hefloat_operator_id (bytes): The crypto system id
         number1 (int): the number to encrypt
     """
-    encrypt = so.EncryptNumber
-    encrypt.restype = ctypes.c_void_p
     byte_number = str(number1).encode("UTF-8")
-    result = encrypt(hefloat_operator_id, byte_number)
-    if result is None:
-        raise go_error()
-    result_length = int.from_bytes(ctypes.string_at(result, 8), "little")
-    ciphertext = ctypes.string_at(result, result_length + 8)
-    ciphertext = ciphertext[8:]
-    return ciphertext
+    return call_bytes("EncryptNumber", hefloat_operator_id, byte_number)
+
+
+def decrypt_number(hefloat_operator_id: bytes, encrypted_number: bytes) -> float:
+    """
+    Decrypts an encrypted number.
+
+    Args:
+        hefloat_operator_id (bytes): The crypto system id
+        encrypted_number (bytes): the ciphertext of the number to decrypt
+
+    Returns:
+        float: the decrypted value (approximate, as CKKS is an approximate scheme).
+    """
+    plaintext = call_bytes(
+        "DecryptNumber", hefloat_operator_id, encrypted_number, len(encrypted_number)
+    )
+    return decode_number(plaintext)
+
+
+def decode_number(plaintext: bytes) -> float:
+    """
+    Decodes a decrypted number.
+
+    The cryptolib returns a length-prefixed buffer whose content is the number as text,
+    in the format read by EncryptNumber.
+    """
+    return float(plaintext.decode("utf-8"))
 
 
-def decrypt_number(hefloat_operator_id: bytes, encrypted_number: bytes) -> int:
+def encrypt_numbers(hefloat_operator_id: bytes, numbers: np.ndarray) -> bytes:
     """
-    Decrypts an encrypted integer.
+    Encrypts many numbers at once, packed in the slots of a single cipher table.
+
+    This uses a single call to the cryptolib, instead of one call per number with
+    encrypt_number. Note that the result is a cipher table: decrypt it with
+    decrypt_numbers (it cannot be used with encrypted_addition and similar operations,
+    which work on ciphertexts produced by encrypt_number).
 
     Args:
         hefloat_operator_id (bytes): The crypto system id
-        encrypted_number (int): the number to decrypt
+        numbers (np.ndarray): the numbers to encrypt (the array is flattened).
+
+    Returns:
+        bytes: the ciphertext of all the numbers.
     """
-    decrypt = so.DecryptNumber
-    decrypt.restype = ctypes.c_void_p
-    encrypted_number_length = len(encrypted_number)
-    result = decrypt(hefloat_operator_id, encrypted_number, encrypted_number_length)
-    if result is None:
-        raise go_error()
-    result_length = int.from_bytes(ctypes.string_at(result, 8), "little")
-    return result_length
+    return encrypt_array(hefloat_operator_id, np.ravel(numbers))
 
 
-def _handle_bytes_result(result) -> bytes:
-    """Converts a result to bytes."""
-    if result is None:
-        raise go_error()
-    result_length = int.from_bytes(ctypes.string_at(result, 8), "little")
-    result_bytes = ctypes.string_at(result, result_length + 8)
-    result_bytes = result_bytes[8:]
-    return result_bytes
+def decrypt_numbers(hefloat_operator_id: bytes, ciphertext: bytes) -> np.ndarray:
+    """
+    Decrypts numbers encrypted with encrypt_numbers, with a single call to the cryptolib.
+
+    Args:
+        hefloat_operator_id (bytes): The crypto system id
+        ciphertext (bytes): the ciphertext produced by encrypt_numbers.
+
+    Returns:
+        np.ndarray: the decrypted numbers, as a one-dimensional float64 array.
+
+    Raises:
+        ValueError: if the decrypted table is not a column of numbers, optionally preceded
+            by the index column written by encrypt_numbers.
+    """
+    values = decrypt_matrix(hefloat_operator_id, ciphertext)
+    if values.shape[1] == 1:
+        return values[:, 0]
+    # Tables encrypted by encrypt_numbers have an index column (0, 1, ...) before the values.
+    index = np.rint(values[:, 0]) if values.shape[1] == 2 else None
+    if index is None or not np.array_equal(index, np.arange(len(values))):
+        raise ValueError(
+            f"Expected a table of numbers encrypted with encrypt_numbers, got {values.shape[1]} "
+            "columns (or an unexpected index)."
+        )
+    return values[:, 1]
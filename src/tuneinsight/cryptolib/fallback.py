@@ -0,0 +1,192 @@
+"""
+Pure NumPy implementations of the differential privacy post-processing routines.
+
+These implementations are used by `cryptolib.postprocessing` when the cryptolib cannot
+be loaded (or when selected explicitly, see `postprocessing.IMPLEMENTATION`). They are
+vectorised over groups and Monte-Carlo samples, and follow the same conventions as the
+functions of the cryptolib:
+
+- survival results are matrices with one row per group, and columns `risk_{i}` and
+  `event_{i}` giving the number of individuals at risk and of events in each frame `i`;
+- statistics results are rows of aggregated values `[count, sum, sum_squares]` for
+  each statistic, with noise `A @ Lap(1)` described by the matrices `A` of the metadata.
+
+Confidence intervals are estimated by Monte-Carlo sampling, so their values differ
+slightly between runs (and from the values estimated by the cryptolib).
+
+"""
+
+import re
+
+import numpy as np
+
+
+# Number of Monte-Carlo samples used to estimate confidence intervals.
+NUM_SAMPLES = 10_000
+
+_FRAME_COLUMN = re.compile(r"^(risk|event)_(\d+)$")
+
+
+def _frame_columns(columns: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the indices of the at-risk and event columns, ordered by frame."""
+    frames = {"risk": {}, "event": {}}
+    for index, column in enumerate(columns):
+        match = _FRAME_COLUMN.match(str(column))
+        if match is None:
+            raise ValueError(f"Unexpected column {column} in survival results.")
+        frames[match.group(1)][int(match.group(2))] = index
+    if sorted(frames["risk"]) != sorted(frames["event"]):
+        raise ValueError(
+            "Survival results must have risk and event columns for each frame."
+        )
+    order = sorted(frames["risk"])
+    return (
+        np.array([frames["risk"][i] for i in order], dtype=int),
+        np.array([frames["event"][i] for i in order], dtype=int),
+    )
+
+
+def _make_consistent(at_risk: np.ndarray, events: np.ndarray) -> tuple:
+    """
+    Rounds noisy counts to nonnegative integers that give a nonincreasing survival curve.
+
+    Counts are arrays of shape (..., frames). The number of individuals at risk is made
+    nonincreasing over frames, and the number of events in a frame is at most the number
+    of individuals at risk in this frame.
+    """
+    at_risk = np.minimum.accumulate(np.maximum(np.round(at_risk), 0), axis=-1)
+    events = np.clip(np.round(events), 0, at_risk)
+    return at_risk, events
+
+
+def _survival_curve(at_risk: np.ndarray, events: np.ndarray) -> np.ndarray:
+    """Computes the Kaplan-Meier curve (along the last axis) from consistent counts."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.where(at_risk > 0, 1 - events / at_risk, 1)
+    return np.cumprod(ratios, axis=-1)
+
+
+def post_process_survival(counts: np.ndarray, columns: list[str]) -> np.ndarray:
+    """
+    Post-processes noisy results from a survival analysis (see postprocessing.post_process_survival_matrix).
+
+    Args:
+        counts (np.ndarray): the raw results, of shape (groups, len(columns)).
+        columns (list[str]): the names of the columns of the survival results.
+
+    Returns:
+        np.ndarray: the post-processed results, with the same shape as counts.
+    """
+    counts = np.atleast_2d(np.asarray(counts, dtype=np.float64))
+    risk_columns, event_columns = _frame_columns(columns)
+    at_risk, events = _make_consistent(
+        counts[:, risk_columns], counts[:, event_columns]
+    )
+    result = counts.copy()
+    result[:, risk_columns] = at_risk
+    result[:, event_columns] = events
+    return result
+
+
+def kaplan_meier_confidence_interval(
+    counts: np.ndarray,
+    columns: list[str],
+    epsilon: float,
+    num_samples: int = NUM_SAMPLES,
+    rng: np.random.Generator = None,
+) -> np.ndarray:
+    """
+    Estimates the 95%-confidence interval of the Kaplan-Meier curve of each group.
+
+    The counts are assumed to be computed with Laplace noise of scale 1/epsilon.
+
+    Args:
+        counts (np.ndarray): the raw results, of shape (groups, len(columns)).
+        columns (list[str]): the names of the columns of the survival results.
+        epsilon (float): the epsilon privacy parameter used to compute the results.
+        num_samples (int, optional): the number of Monte-Carlo samples.
+        rng (np.random.Generator, optional): the random generator to use.
+
+    Returns:
+        np.ndarray: the lower and upper bounds of the curve of each group (two rows per
+            group), starting with the survival probability 1 before the first frame.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    counts = np.atleast_2d(np.asarray(counts, dtype=np.float64))
+    risk_columns, event_columns = _frame_columns(columns)
+    # Simulate the values that could have produced the observed counts.
+    samples = counts - rng.laplace(0, 1 / epsilon, size=(num_samples,) + counts.shape)
+    at_risk, events = _make_consistent(
+        samples[..., risk_columns], samples[..., event_columns]
+    )
+    curves = _survival_curve(at_risk, events)
+    lower, upper = np.percentile(curves, [2.5, 97.5], axis=0)
+    bounds = np.empty((2 * len(counts), len(risk_columns) + 1))
+    bounds[:, 0] = 1
+    bounds[0::2, 1:] = lower
+    bounds[1::2, 1:] = upper
+    return bounds
+
+
+def _mean_and_variance(aggregates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Computes the mean and variance from [count, sum, sum_squares] (along the last axis)."""
+    count = np.maximum(aggregates[..., 0], 1)
+    mean = aggregates[..., 1] / count
+    variance = np.maximum(aggregates[..., 2] / count - mean**2, 0)
+    return mean, variance
+
+
+def post_process_statistics(raw_results: np.ndarray) -> list[dict[str, float]]:
+    """
+    Computes the mean and variance of each statistic from raw aggregated values.
+
+    Args:
+        raw_results (np.ndarray): the values [count, sum, sum_squares] of each statistic.
+
+    Returns:
+        list[dict[str, float]]: the "mean" and "variance" of each statistic.
+    """
+    aggregates = np.asarray(raw_results, dtype=np.float64).reshape(-1, 3)
+    mean, variance = _mean_and_variance(aggregates)
+    return [
+        {"mean": m, "variance": v} for m, v in zip(mean.tolist(), variance.tolist())
+    ]
+
+
+def statistics_confidence_interval(
+    raw_results: np.ndarray,
+    noise_matrices: list[np.ndarray],
+    num_samples: int = NUM_SAMPLES,
+    rng: np.random.Generator = None,
+) -> np.ndarray:
+    """
+    Estimates 95% confidence intervals on the mean and variance of each statistic.
+
+    Args:
+        raw_results (np.ndarray): the values [count, sum, sum_squares] of each statistic.
+        noise_matrices (list[np.ndarray]): the matrices A such that the noise added to
+            consecutive values of the results is A @ Lap(1), in order.
+        num_samples (int, optional): the number of Monte-Carlo samples.
+        rng (np.random.Generator, optional): the random generator to use.
+
+    Returns:
+        np.ndarray: the (min, max) bounds on the mean and variance of each statistic
+            (two rows per statistic).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    raw_results = np.asarray(raw_results, dtype=np.float64)
+    noise = np.zeros((num_samples, len(raw_results)))
+    row = 0
+    for matrix in noise_matrices:
+        matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+        laplace = rng.laplace(0, 1, size=(num_samples, matrix.shape[1]))
+        noise[:, row : row + matrix.shape[0]] = laplace @ matrix.T
+        row += matrix.shape[0]
+    if row != len(raw_results):
+        raise ValueError("The noise metadata does not match the raw results.")
+    samples = (raw_results - noise).reshape(num_samples, -1, 3)
+    mean, variance = _mean_and_variance(samples)
+    bounds = np.empty((2 * samples.shape[1], 2))
+    bounds[0::2] = np.percentile(mean, [2.5, 97.5], axis=0).T
+    bounds[1::2] = np.percentile(variance, [2.5, 97.5], axis=0).T
+    return bounds
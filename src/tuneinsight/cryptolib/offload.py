@@ -0,0 +1,262 @@
+"""
+Out-of-process execution of cryptolib operations.
+
+Homomorphic operations (e.g., polynomial evaluations and multiplications) are CPU
+heavy, and the cryptolib keeps its cryptosystems in a registry global to the process.
+A `CryptolibProcessPool` hosts the cryptolib in worker processes instead: each
+cryptosystem (operator) lives in one worker, and all the operations on this operator
+are routed to that worker. Operations on operators hosted by different workers run in
+parallel, and a crash of the cryptolib only affects the operators of one worker.
+
+```python
+with CryptolibProcessPool(num_workers=4) as pool:
+    operator_id = pool.new_operator(hefloat_parameters_b64=params)
+    pool.run(operator_id, "key_generation")
+    ciphertext = pool.run(operator_id, "encrypt_number", 3)
+    squared = pool.submit(operator_id, "encrypted_multiplication", ciphertext, ciphertext)
+```
+
+Large byte strings (such as ciphertexts) are exchanged with the workers through shared
+memory rather than through the pipes of the workers. The blocks holding the arguments
+of a call are released by the pool once the call is settled, even if it failed, was
+cancelled or its worker crashed.
+
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from multiprocessing import shared_memory
+import threading
+from typing import Any
+
+# Byte strings larger than this (in bytes) are exchanged through shared memory.
+SHARED_MEMORY_THRESHOLD = 1 << 16
+
+
+def _unlink(block: shared_memory.SharedMemory):
+    """Unlinks a shared memory block, unless it is already gone."""
+    try:
+        block.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class _SharedBytes:
+    """A reference to bytes stored in a shared memory block (which is unlinked when read)."""
+
+    def __init__(self, data: bytes):
+        block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        block.buf[: len(data)] = data
+        self.name = block.name
+        self.size = len(data)
+        block.close()
+
+    def read(self) -> bytes:
+        """Returns the bytes and releases the shared memory block."""
+        try:
+            block = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError as err:
+            raise RuntimeError(
+                f"The shared memory block {self.name} was released before being read."
+            ) from err
+        try:
+            return bytes(block.buf[: self.size])
+        finally:
+            block.close()
+            _unlink(block)
+
+    def release(self):
+        """Releases the shared memory block, unless it was already read or released."""
+        try:
+            block = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return
+        block.close()
+        _unlink(block)
+
+
+def _pack(value: Any) -> Any:
+    if isinstance(value, bytes) and len(value) >= SHARED_MEMORY_THRESHOLD:
+        return _SharedBytes(value)
+    return value
+
+
+def _unpack(value: Any) -> Any:
+    if isinstance(value, _SharedBytes):
+        return value.read()
+    return value
+
+
+def _release(value: Any):
+    if isinstance(value, _SharedBytes):
+        value.release()
+
+
+def _worker_call(function_name: str, args: tuple) -> Any:
+    """Runs a function of the cryptolib in a worker process."""
+    # The cryptolib is only loaded by the workers when they are first used.
+    from tuneinsight.cryptolib import (  # pylint: disable=import-outside-toplevel
+        cryptolib,
+    )
+
+    result = getattr(cryptolib, function_name)(*[_unpack(a) for a in args])
+    return _pack(result)
+
+
+class CryptolibProcessPool:
+    """
+    A pool of worker processes hosting the cryptolib, with operators routed to workers.
+
+    Operator ids returned by the pool are only valid for this pool: they identify both
+    the worker hosting the operator and the operator in that worker. New operators are
+    placed on the worker hosting the fewest operators.
+    """
+
+    def __init__(self, num_workers: int = None, mp_context: str = "spawn"):
+        """
+        Creates a pool of worker processes (started when first used).
+
+        Args:
+            num_workers (int, optional): number of worker processes. Defaults to the number of cores.
+            mp_context (str, optional): the multiprocessing start method. Defaults to "spawn",
+                as the Go runtime of the cryptolib does not support being forked.
+        """
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self._context = multiprocessing.get_context(mp_context)
+        self._workers: list[ProcessPoolExecutor | None] = [None] * self.num_workers
+        # Routing table: operator id (as returned by the pool) -> index of its worker.
+        self._routes: dict[bytes, int] = {}
+        self._lock = threading.Lock()
+
+    def _worker(self, index: int) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._workers[index] is None:
+                self._workers[index] = ProcessPoolExecutor(
+                    max_workers=1, mp_context=self._context
+                )
+            return self._workers[index]
+
+    def _submit(self, index: int, function_name: str, args: tuple) -> Future:
+        # The blocks are normally unlinked by the worker, but not if the call never
+        # reaches it (or fails before reading them): they are released once it is done.
+        packed = tuple(_pack(a) for a in args)
+        try:
+            future = self._worker(index).submit(_worker_call, function_name, packed)
+        except BaseException:
+            for value in packed:
+                _release(value)
+            raise
+        result = Future()
+        # Cancelling the result cancels the call if it did not start yet.
+        result.add_done_callback(lambda r: r.cancelled() and future.cancel())
+
+        def _done(f: Future):
+            # The arguments are released before the result is set, so that they are
+            # gone by the time the caller gets it.
+            for value in packed:
+                _release(value)
+            if f.cancelled():
+                result.cancel()
+                return
+            error = f.exception()
+            if isinstance(error, BrokenProcessPool):
+                self._drop_worker(index)
+                error = RuntimeError(
+                    f"Cryptolib worker {index} crashed: its operators are lost."
+                )
+            if result.cancelled():
+                if error is None:
+                    _release(f.result())
+                return
+            if error is not None:
+                result.set_exception(error)
+                return
+            try:
+                result.set_result(_unpack(f.result()))
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                result.set_exception(err)
+
+        future.add_done_callback(_done)
+        return result
+
+    def _drop_worker(self, index: int):
+        """Forgets a crashed worker and all the operators it hosted."""
+        with self._lock:
+            self._workers[index] = None
+            self._routes = {k: v for k, v in self._routes.items() if v != index}
+
+    def new_operator(
+        self, scheme_context_b64: str = None, hefloat_parameters_b64: str = None
+    ) -> bytes:
+        """
+        Creates a new operator (cryptosystem) in one of the workers.
+
+        Exactly one of scheme_context_b64 or hefloat_parameters_b64 must be provided.
+
+        Args:
+            scheme_context_b64 (str, optional): Base64 encoded marshalled scheme.Context.
+            hefloat_parameters_b64 (str, optional): Base64 encoded marshalled hefloat parameters.
+
+        Returns:
+            bytes: the id of the operator in this pool.
+        """
+        if (scheme_context_b64 is None) == (hefloat_parameters_b64 is None):
+            raise ValueError(
+                "Exactly one of scheme_context_b64 or hefloat_parameters_b64 must be set."
+            )
+        if scheme_context_b64 is not None:
+            function_name = "new_hefloat_operator_from_b64_scheme_context"
+            argument = scheme_context_b64
+        else:
+            function_name = "new_hefloat_operator_from_b64_hefloat_parameters"
+            argument = hefloat_parameters_b64
+        with self._lock:
+            load = [0] * self.num_workers
+            for index in self._routes.values():
+                load[index] += 1
+        index = load.index(min(load))
+        local_id = self._submit(index, function_name, (argument,)).result()
+        operator_id = f"{index}/".encode() + local_id
+        with self._lock:
+            self._routes[operator_id] = index
+        return operator_id
+
+    def submit(self, operator_id: bytes, function_name: str, *args) -> Future:
+        """
+        Runs a function of `cryptolib.cryptolib` on the worker hosting an operator.
+
+        Args:
+            operator_id (bytes): the id of the operator (as returned by new_operator).
+            function_name (str): the name of the function, e.g. "encrypted_multiplication".
+                The operator is passed as first argument of the function.
+            *args: the other arguments of the function.
+
+        Returns:
+            Future: the future result of the function.
+        """
+        with self._lock:
+            index = self._routes.get(operator_id)
+        if index is None:
+            raise KeyError(f"Unknown operator {operator_id!r} in this pool.")
+        local_id = operator_id.split(b"/", 1)[1]
+        return self._submit(index, function_name, (local_id,) + args)
+
+    def run(self, operator_id: bytes, function_name: str, *args) -> Any:
+        """Runs a function on the worker hosting an operator and returns its result (see submit)."""
+        return self.submit(operator_id, function_name, *args).result()
+
+    def shutdown(self, wait: bool = True):
+        """Stops all the workers (the operators they host are lost)."""
+        with self._lock:
+            workers, self._workers = self._workers, [None] * self.num_workers
+            self._routes = {}
+        for worker in workers:
+            if worker is not None:
+                worker.shutdown(wait=wait)
+
+    def __enter__(self) -> "CryptolibProcessPool":
+        return self
+
+    def __exit__(self, *_):
+        self.shutdown()
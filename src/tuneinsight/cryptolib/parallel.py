@@ -0,0 +1,105 @@
+"""
+Parallel execution of independent cryptolib calls.
+
+Calls to the cryptolib release the GIL, so that independent encryptions and
+decryptions on different cryptosystems scale with the number of cores when run from
+several threads (see `cryptolib.bindings` for the concurrency model). This module runs batches of
+such calls on a shared pool of worker threads.
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+from typing import Callable, Iterable
+
+import numpy as np
+
+from .cryptolib import decrypt_matrix, encrypt_array
+
+
+_executor: ThreadPoolExecutor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the pool of threads used to run cryptolib calls (one thread per core by default)."""
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1, thread_name_prefix="cryptolib"
+            )
+        return _executor
+
+
+def set_max_workers(max_workers: int):
+    """
+    Sets the number of threads used to run cryptolib calls.
+
+    Calls running on the previous pool are completed before it is shut down.
+
+    Args:
+        max_workers (int): the number of worker threads.
+    """
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        previous = _executor
+        _executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="cryptolib"
+        )
+    if previous is not None:
+        previous.shutdown(wait=True)
+
+
+def map_parallel(func: Callable, *iterables: Iterable) -> list:
+    """
+    Applies a function to the items of iterables on the cryptolib worker pool.
+
+    Args:
+        func (Callable): the function to apply (typically calling the cryptolib).
+        *iterables (Iterable): the arguments, as in the builtin map.
+
+    Returns:
+        list: the results, in the same order as the inputs. If a call fails, its error is raised.
+    """
+    return list(get_executor().map(func, *iterables))
+
+
+def decrypt_many(
+    hefloat_operator_id: bytes, ciphertexts: Iterable[bytes]
+) -> list[np.ndarray]:
+    """
+    Decrypts several cipher tables in parallel.
+
+    Calls on the same cryptosystem are serialized by the bindings (the library does not
+    document that operators are thread-safe): only the conversion of the decrypted
+    tables to arrays runs in parallel.
+
+    Args:
+        hefloat_operator_id (bytes): The crypto system id
+        ciphertexts (Iterable[bytes]): the encrypted tables.
+
+    Returns:
+        list[np.ndarray]: the decrypted tables (see decrypt_matrix), in order.
+    """
+    return map_parallel(lambda ct: decrypt_matrix(hefloat_operator_id, ct), ciphertexts)
+
+
+def encrypt_many(
+    hefloat_operator_id: bytes, arrays: Iterable[np.ndarray]
+) -> list[bytes]:
+    """
+    Encrypts several numeric arrays in parallel.
+
+    As for decrypt_many, only the conversion of the arrays runs in parallel, since calls
+    on the same cryptosystem are serialized.
+
+    Args:
+        hefloat_operator_id (bytes): The crypto system id
+        arrays (Iterable[np.ndarray]): the arrays to encrypt (see encrypt_array).
+
+    Returns:
+        list[bytes]: the ciphertexts, in order.
+    """
+    return map_parallel(lambda a: encrypt_array(hefloat_operator_id, a), arrays)
@@ -1,15 +1,68 @@
-"""Module accessing the utilities in the cryptolib dedicated to post-processing results."""
+"""
+Module accessing the utilities in the cryptolib dedicated to post-processing results.
+
+The functions ending in `_matrix` exchange float64 arrays (with one row per group) with
+the cryptolib, and are faster than their DataFrame counterparts when processing results
+for many groups. Functions operating on several groups at once process all groups with
+a single call when the cryptolib supports it, and otherwise run one call per group in
+parallel (see `cryptolib.parallel`).
+
+When the cryptolib is not available, pure NumPy implementations of these routines are
+used instead (see `cryptolib.fallback`). The implementation can also be selected with
+`set_implementation`.
+
+"""
 
-import ctypes
-from io import StringIO
 import json
 import math
+import numpy as np
 import pandas as pd
 
 from tuneinsight.api.sdk import models
 from tuneinsight.api.sdk.types import is_unset
 
-from .cryptolib import so, LOADED
+from . import fallback
+from .bindings import LOADED, call_string
+from .cryptolib import _csv_to_matrix
+from .parallel import map_parallel
+
+
+# The implementation of the post-processing routines: "native" (the cryptolib), "numpy"
+# (see cryptolib.fallback), or "auto" (the cryptolib if it is loaded, NumPy otherwise).
+IMPLEMENTATION = "auto"
+
+
+def set_implementation(implementation: str):
+    """
+    Selects the implementation of the post-processing routines.
+
+    Args:
+        implementation (str): "native" to use the cryptolib, "numpy" to use the pure NumPy
+            implementations, or "auto" to use the cryptolib only if it could be loaded.
+    """
+    global IMPLEMENTATION  # pylint: disable=global-statement
+    if implementation not in ("auto", "native", "numpy"):
+        raise ValueError(f"Unknown post-processing implementation {implementation}.")
+    IMPLEMENTATION = implementation
+
+
+def _use_native() -> bool:
+    if IMPLEMENTATION == "auto":
+        return LOADED
+    return IMPLEMENTATION == "native"
+
+
+def _format_row(values: np.ndarray) -> str:
+    """Formats a one-dimensional array of floats as a comma-separated line."""
+    # repr gives the shortest representation that parses back to the same float.
+    return ",".join(map(repr, np.asarray(values, dtype=np.float64).tolist()))
+
+
+def _matrix_to_csv(matrix: np.ndarray, header: list[str] = None) -> bytes:
+    """Formats a 2-dimensional array as a CSV table, with an optional header line."""
+    lines = [] if header is None else [",".join(map(str, header))]
+    lines.extend(_format_row(row) for row in np.atleast_2d(matrix))
+    return ("\n".join(lines) + "\n").encode("UTF-8")
 
 
 def post_process_survival(results: pd.DataFrame) -> pd.DataFrame:
@@ -20,17 +73,28 @@ def post_process_survival(results: pd.DataFrame) -> pd.DataFrame:
     to a nonincreasing Kaplan-Meier curve. Both input and output should be Pandas
     DataFrame extracted from the FloatMatrix result of a survival computation.
 
-    Fails gracefully: if the cryptolib could not load, this returns the input unchanged.
+    If the cryptolib could not load, this uses a NumPy implementation (see cryptolib.fallback).
 
     """
-    if not LOADED:
-        return results
-    csv_data = results.to_csv(index=False).encode("UTF-8")
-    post_process = so.PostProcessSurvivalDP
-    post_process.restype = ctypes.c_char_p
-    csv_result = post_process(csv_data)
-    csv_result = csv_result.decode("utf8")
-    return pd.read_csv(StringIO(csv_result), names=results.columns)
+    matrix = post_process_survival_matrix(results.to_numpy(), list(results.columns))
+    return pd.DataFrame(matrix, columns=results.columns)
+
+
+def post_process_survival_matrix(counts: np.ndarray, columns: list[str]) -> np.ndarray:
+    """
+    Post-processes noisy results from a survival analysis, for all groups at once.
+
+    Args:
+        counts (np.ndarray): the raw results, of shape (groups, len(columns)).
+        columns (list[str]): the names of the columns of the survival results.
+
+    Returns:
+        np.ndarray: the post-processed results, with the same shape as counts.
+    """
+    if not _use_native():
+        return fallback.post_process_survival(counts, columns)
+    csv_data = _matrix_to_csv(counts, header=columns)
+    return _csv_to_matrix(call_string("PostProcessSurvivalDP", csv_data))
 
 
 def kaplan_meier_confidence_interval(
@@ -44,12 +108,35 @@ def kaplan_meier_confidence_interval(
         epsilon (float): the epsilon privacy parameter used to compute the results.
 
     """
-    csv_data = results.to_csv(index=False).encode("UTF-8")
-    estimate = so.KaplanMeierConfidenceInterval
-    estimate.restype = ctypes.c_char_p
-    csv_result = estimate(csv_data, str(epsilon).encode("UTF-8"))
-    csv_result = csv_result.decode("utf8")
-    return pd.read_csv(StringIO(csv_result), header=None)
+    return pd.DataFrame(
+        kaplan_meier_confidence_interval_matrix(
+            results.to_numpy(), list(results.columns), epsilon
+        )
+    )
+
+
+def kaplan_meier_confidence_interval_matrix(
+    counts: np.ndarray, columns: list[str], epsilon: float
+) -> np.ndarray:
+    """
+    Estimates the 95%-confidence interval of the Kaplan-Meier curve, for all groups at once.
+
+    Args:
+        counts (np.ndarray): the raw results, of shape (groups, len(columns)).
+        columns (list[str]): the names of the columns of the survival results.
+        epsilon (float): the epsilon privacy parameter used to compute the results.
+
+    Returns:
+        np.ndarray: the lower and upper bounds of the curve of each group (two rows per group).
+    """
+    if not _use_native():
+        return fallback.kaplan_meier_confidence_interval(counts, columns, epsilon)
+    csv_data = _matrix_to_csv(counts, header=columns)
+    return _csv_to_matrix(
+        call_string(
+            "KaplanMeierConfidenceInterval", csv_data, str(epsilon).encode("UTF-8")
+        )
+    )
 
 
 def post_process_statistics(
@@ -65,12 +152,46 @@ def post_process_statistics(
     Returns:
         models.Statistics: A DataContent of the right type.
     """
-    csv_data = ",".join([str(x) for x in results[0]])
-    post_process = so.PostProcessStatistics
-    post_process.restype = ctypes.c_char_p
-    json_result = post_process(csv_data.encode("UTF-8"))
+    return post_process_statistics_matrix(comp, np.asarray(results)[:1])[0]
+
+
+def post_process_statistics_matrix(
+    comp: models.DatasetStatistics, results: np.ndarray
+) -> list[models.Statistics]:
+    """
+    Post-processes the raw results of a statistics computation for several groups.
+
+    The cryptolib processes one group per call: groups are processed in parallel.
+
+    Args:
+        comp (models.DatasetStatistics): the computation definition.
+        results (np.ndarray): the raw results, with one row of aggregated values per group.
+
+    Returns:
+        list[models.Statistics]: the statistics of each group, in order.
+    """
+    rows = np.atleast_2d(np.asarray(results, dtype=np.float64))
+    if not _use_native():
+        return [
+            _parse_statistics(comp, fallback.post_process_statistics(row), row.tolist())
+            for row in rows
+        ]
+    outputs = map_parallel(
+        lambda row: call_string("PostProcessStatistics", _format_row(row).encode()),
+        rows,
+    )
+    return [
+        _parse_statistics(comp, json.loads(output), row.tolist())
+        for output, row in zip(outputs, rows)
+    ]
+
+
+def _parse_statistics(
+    comp: models.DatasetStatistics, stats: list[dict], raw_results: list[float]
+) -> models.Statistics:
+    """Converts the output of PostProcessStatistics to a DataContent."""
     results = []
-    for i, stat in enumerate(json.loads(json_result)):
+    for i, stat in enumerate(stats):
         stat_def = comp.statistics[i]
         stat_result = models.StatisticResult.from_dict(stat_def.to_dict())
         use_default = is_unset(stat_def.quantities) or len(stat_def.quantities) < 1
@@ -81,7 +202,7 @@ def post_process_statistics(
             stat_result.stddev = math.sqrt(stat_result.variance)
         results.append(stat_result)
     return models.Statistics(
-        type=models.ContentType.STATISTICS, results=results, raw_dp_results=results[0]
+        type=models.ContentType.STATISTICS, results=results, raw_dp_results=raw_results
     )
 
 
@@ -97,24 +218,9 @@ def statistics_confidence_interval(
         raw_results (list[list[float]]): the raw results (a list of aggregated values).
         noise_parameters (models.ResultMetadata): the metadata on the noise added to each result.
     """
-    csv_data = ",".join([str(x) for x in raw_results[0]])
-    # Flatten the noise parameters to a single matrix.
-    if is_unset(noise_parameters.dp_noise):
-        raise ValueError("No DP noise metadata available.")
-    dp_metadata: list[list[float]] = []
-    # Concatenate the scaling matrices for the noise added to the different variables.
-    for metadata in noise_parameters.dp_noise:
-        if is_unset(metadata.sum_parameters):
-            continue
-        # Noise on [count, sum, sum_squares]
-        dp_metadata += metadata.sum_parameters
-    csv_metadata = ",".join([str(x) for x in dp_metadata])
-    estimate = so.StatisticsConfidenceInterval
-    estimate.restype = ctypes.c_char_p
-    csv_result = estimate(csv_data.encode("utf-8"), csv_metadata.encode("utf-8"))
-    # Parse the result:
-    csv_result = csv_result.decode("utf8")
-    matrix = pd.read_csv(StringIO(csv_result), header=None).values
+    matrix = statistics_confidence_interval_matrix(
+        np.asarray(raw_results)[:1], noise_parameters
+    )[0]
     columns = ["variable", "name", "quantity", "min", "max"]
     results = []
     for i, stat_def in enumerate(comp.statistics):
@@ -126,3 +232,87 @@ def statistics_confidence_interval(
         if use_default or models.StatisticalQuantity.VARIANCE in stat_def.quantities:
             results.append(header + ("variance",) + tuple(matrix[2 * i + 1, :]))
     return pd.DataFrame(results, columns=columns)
+
+
+def statistics_confidence_interval_matrix(
+    raw_results: np.ndarray, noise_parameters: models.ResultMetadata
+) -> list[np.ndarray]:
+    """
+    Estimates 95% confidence intervals on the mean and variance of each statistic, for several groups.
+
+    The cryptolib processes one group per call: groups are processed in parallel.
+
+    Args:
+        raw_results (np.ndarray): the raw results, with one row of aggregated values per group.
+        noise_parameters (models.ResultMetadata): the metadata on the noise added to each result.
+
+    Returns:
+        list[np.ndarray]: for each group, an array with the (min, max) bounds on the mean
+            and variance of each statistic (two rows per statistic).
+    """
+    if is_unset(noise_parameters.dp_noise):
+        raise ValueError("No DP noise metadata available.")
+    # The scaling matrices for the noise added to the different variables.
+    noise_matrices = [
+        metadata.sum_parameters
+        for metadata in noise_parameters.dp_noise
+        if not is_unset(metadata.sum_parameters)
+    ]
+    rows = np.atleast_2d(np.asarray(raw_results, dtype=np.float64))
+    if not _use_native():
+        return [
+            fallback.statistics_confidence_interval(row, noise_matrices) for row in rows
+        ]
+    # Flatten the noise parameters to a single matrix (noise on [count, sum, sum_squares]).
+    dp_metadata: list[list[float]] = [r for matrix in noise_matrices for r in matrix]
+    csv_metadata = ",".join([str(x) for x in dp_metadata]).encode("utf-8")
+    return map_parallel(
+        lambda row: _csv_to_matrix(
+            call_string(
+                "StatisticsConfidenceInterval", _format_row(row).encode(), csv_metadata
+            )
+        ),
+        rows,
+    )
+
+
+def compare_implementations(
+    counts: np.ndarray, columns: list[str], statistics: np.ndarray = None
+) -> dict[str, float]:
+    """
+    Compares the native and NumPy implementations of the deterministic post-processing routines.
+
+    This requires the cryptolib to be loaded. Confidence intervals are estimated by
+    Monte-Carlo sampling and are not compared.
+
+    Args:
+        counts (np.ndarray): raw survival results, of shape (groups, len(columns)).
+        columns (list[str]): the names of the columns of the survival results.
+        statistics (np.ndarray, optional): raw statistics results (rows [count, sum, sum_squares]).
+
+    Returns:
+        dict[str, float]: the largest absolute difference between the outputs of the two
+            implementations, for each routine.
+    """
+    if not LOADED:
+        raise ImportError("Could not load the cryptolib: contact your administrator.")
+    native = _csv_to_matrix(
+        call_string("PostProcessSurvivalDP", _matrix_to_csv(counts, header=columns))
+    )
+    differences = {
+        "survival": float(
+            np.max(np.abs(native - fallback.post_process_survival(counts, columns)))
+        )
+    }
+    if statistics is not None:
+        row = np.ravel(statistics)
+        native = json.loads(
+            call_string("PostProcessStatistics", _format_row(row).encode())
+        )
+        numpy = fallback.post_process_statistics(row)
+        differences["statistics"] = max(
+            abs(n[key] - p[key])
+            for n, p in zip(native, numpy)
+            for key in ("mean", "variance")
+        )
+    return differences
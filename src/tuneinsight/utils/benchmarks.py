@@ -1,12 +1,17 @@
 """Utilities for benchmarking memory usage of and time taken by computations."""
 
 from typing import Any
+import json
+import random
+from time import perf_counter
 from dateutil.parser import parse
 
 import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 
 from tuneinsight.api.sdk import models
+from tuneinsight.api.sdk.types import value_if_unset
 from tuneinsight.utils import time_tools
 from tuneinsight.utils.plots import style_title, style_suptitle
 
@@ -181,3 +186,342 @@ def compute_benchmarks(
     times["total"] = total_time
     nets["total"] = total_net
     return times, nets
+
+
+def benchmark_compound_chains(
+    node_counts: list[int] = (10, 100, 1000),
+    shared_operations: int = 20,
+    node_operations: int = 2,
+    repetitions: int = 10,
+) -> pd.DataFrame:
+    """
+    Benchmarks building preprocessing chains shared by many nodes with per-node variations.
+
+    For each number of nodes, this builds a PreprocessingBuilder (without a project) with
+    `shared_operations` operations applied to all nodes individually, followed by
+    `node_operations` operations specific to each node, and measures the time to build
+    the chains, to get the model of the preprocessing, to hash the preprocessing (as done
+    to skip no-op project updates), as well as the size of the serialized model.
+
+    Args:
+        node_counts (list[int], optional): the numbers of nodes to benchmark.
+        shared_operations (int, optional): the number of operations shared by all nodes.
+        node_operations (int, optional): the number of operations specific to each node.
+        repetitions (int, optional): the number of repetitions of the get_model measurement.
+
+    Returns:
+        pd.DataFrame: the timings (in milliseconds) and model size (in KB) for each number of nodes.
+    """
+    # pylint: disable=import-outside-toplevel
+    from tuneinsight.computations.preprocessing import PreprocessingBuilder
+
+    rows = []
+    for num_nodes in node_counts:
+        nodes = [f"node-{i}" for i in range(num_nodes)]
+        start = perf_counter()
+        builder = PreprocessingBuilder(lambda: None)
+        for i in range(shared_operations):
+            builder.new_column(name=f"shared_{i}", value=i, nodes=nodes)
+        for node in nodes:
+            for i in range(node_operations):
+                builder.new_column(name=f"{node}_{i}", value=i, nodes=[node])
+        build = perf_counter() - start
+        start = perf_counter()
+        for _ in range(repetitions):
+            model = builder.get_model()
+        get_model = (perf_counter() - start) / repetitions
+        start = perf_counter()
+        builder.structural_hash()
+        structural_hash = perf_counter() - start
+        start = perf_counter()
+        builder.new_column(name="last", value=0, nodes=nodes)
+        builder.structural_hash()
+        append = perf_counter() - start
+        rows.append(
+            {
+                "nodes": num_nodes,
+                "build (ms)": build * 1000,
+                "get_model (ms)": get_model * 1000,
+                "structural_hash (ms)": structural_hash * 1000,
+                "append and hash (ms)": append * 1000,
+                "model size (KB)": len(json.dumps(model.to_dict())) * BYTE / KILOBYTE,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def _optimizer_scenarios() -> dict[str, Any]:
+    """Returns functions building the preprocessing chains used in benchmark_optimizer."""
+
+    def redundant(b):
+        b.new_column(name="unused", value="0")
+        b.scale(["age"], 2)
+        b.scale(["age"], 0.5)
+        b.filter("age", ">", "30", numerical=True)
+        b.set_columns(["age", "weight"])
+
+    def late_filter(b):
+        b.scale(["weight"], 1000)
+        b.add_columns(["age", "weight"], "total", numerical=True)
+        b.filter("age", "<", "50", numerical=True)
+        b.set_columns(["total"])
+
+    def non_strict_one_hot(b):
+        # Regression: the columns created by a non-strict one-hot encoding are not known
+        # statically, so the input columns must not be pruned.
+        b.one_hot_encoding("color", prefix="")
+        b.set_columns(["red", "age"])
+
+    return {
+        "redundant operations": redundant,
+        "late filter": late_filter,
+        "non-strict one-hot encoding": non_strict_one_hot,
+    }
+
+
+def _profiled_ms(profile: pd.DataFrame) -> float:
+    # The profile is missing if a chain failed on the sample data.
+    return np.nan if profile is None else profile["duration"].sum() * 1000
+
+
+def benchmark_optimizer(num_rows: int = 100_000, seed: int = 0) -> pd.DataFrame:
+    """
+    Checks and benchmarks the optimization of preprocessing chains on synthetic data.
+
+    For each scenario, this optimizes a preprocessing chain (with `PreprocessingBuilder.optimize`)
+    and runs the original and optimized chains locally, checking that their outputs are equal
+    (the optimization is not applied otherwise, and the scenario is reported as not equal).
+
+    Args:
+        num_rows (int, optional): the number of records of the synthetic data.
+        seed (int, optional): the seed used to generate the data.
+
+    Returns:
+        pd.DataFrame: for each scenario, the number of operations before and after the
+            optimization, whether the outputs are equal, and the time (in milliseconds) to
+            run each chain.
+    """
+    # pylint: disable=import-outside-toplevel
+    from tuneinsight.computations.preprocessing import PreprocessingBuilder
+
+    rng = np.random.default_rng(seed)
+    sample = pd.DataFrame(
+        {
+            "age": rng.integers(18, 90, num_rows),
+            "weight": rng.normal(70, 10, num_rows),
+            "color": rng.choice(["red", "green", "blue"], num_rows),
+            "notes": rng.choice(["a", "b"], num_rows),
+        }
+    )
+    rows = []
+    for name, build in _optimizer_scenarios().items():
+        builder = PreprocessingBuilder(lambda: None)
+        build(builder)
+        report = builder.optimize(sample=sample, patch=False)
+        rows.append(
+            {
+                "scenario": name,
+                "operations before": len(report.original),
+                "operations after": len(report.optimized),
+                "equal": report.equivalent,
+                "before (ms)": _profiled_ms(report.profile_before),
+                "after (ms)": _profiled_ms(report.profile_after),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def benchmark_number_encryption(
+    counts: list[int] = (10, 100, 1000), repetitions: int = 3
+) -> pd.DataFrame:
+    """
+    Benchmarks the batched encryption of numbers against encrypting them one by one.
+
+    For each count, this encrypts and decrypts `count` random integers with a single call
+    to `encrypt_numbers` and `decrypt_numbers`, and with one call to `encrypt_number` and
+    `decrypt_number` per number, and reports the decryption errors of both methods (CKKS
+    is approximate). This requires the cryptolib to be available on this platform.
+
+    Args:
+        counts (list[int], optional): the numbers of values to encrypt.
+        repetitions (int, optional): the number of repetitions of each measurement.
+
+    Returns:
+        pd.DataFrame: the average timings (in milliseconds) of each method for each count,
+            and the maximum absolute error of each method.
+    """
+    # pylint: disable=import-outside-toplevel
+    from tuneinsight.cryptolib import cryptolib
+
+    params = cryptolib.test_polynomial_evaluation_hefloat_params()
+    operator = cryptolib.new_hefloat_operator_from_b64_hefloat_parameters(
+        params.decode("utf-8")
+    )
+    cryptolib.key_generation(operator)
+    rng = np.random.default_rng(0)
+    rows = []
+    for count in counts:
+        values = rng.integers(0, 1000, count)
+        timings = {"batched": 0, "per number": 0}
+        for _ in range(repetitions):
+            start = perf_counter()
+            batched = cryptolib.decrypt_numbers(
+                operator, cryptolib.encrypt_numbers(operator, values)
+            )
+            timings["batched"] += perf_counter() - start
+            start = perf_counter()
+            scalars = [
+                cryptolib.decrypt_number(
+                    operator, cryptolib.encrypt_number(operator, int(v))
+                )
+                for v in values
+            ]
+            timings["per number"] += perf_counter() - start
+        rows.append(
+            {
+                "count": count,
+                "batched (ms)": timings["batched"] / repetitions * 1000,
+                "per number (ms)": timings["per number"] / repetitions * 1000,
+                "batched max error": np.abs(batched - values).max(),
+                "per number max error": np.abs(np.array(scalars) - values).max(),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def _custom_example(df, k=1):
+    # A comment that must be kept.
+    columns = {
+        "k": k,
+    }
+    return df.assign(**columns)
+
+
+def _random_chain(rng: random.Random, num_operations: int) -> list:
+    """Returns a random preprocessing chain, with unusual column names and arguments."""
+    # pylint: disable=import-outside-toplevel
+    from tuneinsight.computations.preprocessing import PreprocessingBuilder
+
+    names = ["a", "age", "col with space", "quo'te", 'dq"x', "é", "10", ""]
+    b = PreprocessingBuilder()
+    builders = [
+        lambda c, o: b.one_hot_encoding(
+            c, rng.choice([None, "p", ""]), ["x", "y"], rng.choice([None, True, False])
+        ),
+        lambda c, o: b.select([c, o], rng.choice([True, False]), rng.choice(["", "0"])),
+        lambda c, o: b.drop([c]),
+        lambda c, o: b.filter(
+            c,
+            rng.choice(["==", ">", ">=", "<", "<=", "!="]),
+            rng.choice([10, 1.5, "x", "1e3", "nan", -2, True]),
+            rng.choice([True, False]),
+            rng.choice([None, o]),
+        ),
+        lambda c, o: b.transpose(),
+        lambda c, o: b.set_index(
+            [c], rng.choice([True, False]), rng.choice([True, False])
+        ),
+        lambda c, o: b.astype(
+            {c: rng.choice(["int", "str"])}, rng.choice([True, False])
+        ),
+        lambda c, o: b.reset_index(rng.choice([True, False]), rng.choice([None, [c]])),
+        lambda c, o: b.rename(
+            {c: o}, rng.choice(list(models.RenameAxis)), rng.choice([True, False])
+        ),
+        lambda c, o: b.dropna(rng.choice([None, [c]])),
+        lambda c, o: b.apply_mapping(c, o, {"a": 1, "b": "x"}, rng.choice(["", 0])),
+        lambda c, o: b.cut(c, o, [0, 1.5, 10], rng.choice([None, ["l", "h"]])),
+        lambda c, o: b.add_columns(
+            [c, o, "q", "r"][: rng.randint(1, 4)],
+            o,
+            rng.choice(["", "-"]),
+            rng.choice([True, False]),
+        ),
+        lambda c, o: b.scale(
+            rng.choice([[c], [c, o]]), rng.choice([2, 0.5]), rng.choice([None, [o]])
+        ),
+        lambda c, o: b.multiply_columns([c, o], o),
+        lambda c, o: b.new_column(
+            c, rng.choice([None, 1, "x"]), loc=rng.choice([None, 1.0])
+        ),
+        lambda c, o: b.drop_duplicates(
+            rng.choice([None, [c]]), rng.choice(["first", "last", "none"])
+        ),
+        lambda c, o: b.fillna(
+            rng.choice(["value", "ffill", "bfill", "interpolate"]),
+            rng.choice([None, [c], [c, o]]),
+            0,
+        ),
+        lambda c, o: b.custom(
+            _custom_example,
+            name=rng.choice(["", "n"]),
+            additional_inputs=rng.choice([{"k": 2}, {"not id": 1}]),
+            output_columns=rng.choice([None, ["z"]]),
+        ),
+        lambda c, o: b.quantiles(c, 0, 10),
+        lambda c, o: b.deviation_squares(c, o, 1.5, 3),
+        lambda c, o: b.isin(c, ["a", "b"]),
+    ]
+    for _ in range(num_operations):
+        rng.choice(builders)(rng.choice(names), rng.choice(names))
+    return list(b.chain)
+
+
+def check_chain_code_round_trip(
+    num_chains: int = 1000, max_operations: int = 8, seed: int = 0
+) -> pd.DataFrame:
+    """
+    Checks and benchmarks the conversion of random preprocessing chains to code and back.
+
+    For each random chain, this generates its code with `remotedf.chain_to_code` (raw, and
+    formatted with black for one chain in ten), parses it back with `remotedf.code_to_chain`,
+    and checks that the same chain is recovered.
+
+    Args:
+        num_chains (int, optional): the number of random chains to check.
+        max_operations (int, optional): the maximum number of operations in each chain.
+        seed (int, optional): the seed used to generate the chains.
+
+    Raises:
+        ValueError: if a chain is not recovered from its code.
+
+    Returns:
+        pd.DataFrame: the number of chains and operations checked, and the total time (in
+            milliseconds) to generate the code (uncached and cached), to format it, and to parse it.
+    """
+    # pylint: disable=import-outside-toplevel,protected-access
+    from tuneinsight.utils import remotedf
+
+    rng = random.Random(seed)
+    timings = {"generate": 0, "generate (cached)": 0, "format": 0, "parse": 0}
+    num_operations = 0
+    for i in range(num_chains):
+        chain = _random_chain(rng, rng.randint(0, max_operations))
+        num_operations += len(chain)
+        start = perf_counter()
+        code = remotedf.chain_to_code(chain)
+        timings["generate"] += perf_counter() - start
+        start = perf_counter()
+        remotedf.chain_to_code(chain)
+        timings["generate (cached)"] += perf_counter() - start
+        codes = [code]
+        if i % 10 == 0:
+            start = perf_counter()
+            codes.append(remotedf.format_code(code))
+            timings["format"] += perf_counter() - start
+        expected = [remotedf._normalized(op) for op in chain]
+        for code in codes:
+            start = perf_counter()
+            parsed = value_if_unset(remotedf.code_to_chain(code).chain, [])
+            timings["parse"] += perf_counter() - start
+            if [remotedf._normalized(op) for op in parsed] != expected:
+                raise ValueError(f"Chain {i} is not recovered from its code:\n{code}")
+    return pd.DataFrame(
+        [
+            {
+                "chains": num_chains,
+                "operations": num_operations,
+                **{f"{k} (ms)": v * 1000 for k, v in timings.items()},
+            }
+        ]
+    )
@@ -0,0 +1,240 @@
+"""
+Utilities to choose bins and bounds of numerical variables from local data.
+
+Preprocessing operations such as `cut` and `quantiles`, as well as the groups of an
+aggregation (`GroupingParameters.cuts`), require bin edges or bounds on the values of
+a variable. This module estimates these from a local sample (e.g., an extract of the
+data, or a CSV file too large to load in memory) with approximate quantile sketches,
+which are computed in a single pass over chunks of the data and merged:
+
+```python
+sketches = sketch_columns("sample.csv", columns=["age"])
+edges = sketches["age"].bin_edges(5, decimals=0)
+computation.preprocessing.cut("age", "age_group", edges, bin_labels(edges))
+aggregation.groups = [sketches["age"].grouping_parameters("age", 5)]
+```
+
+"""
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from tuneinsight.api.sdk import models
+
+
+class QuantileSketch:
+    """
+    A mergeable approximate quantile sketch (in the style of the KLL sketch).
+
+    Values are kept in levels of sorted buffers: a value in level `h` stands for `2**h`
+    values of the data. When a level exceeds its capacity, it is compacted by keeping
+    every other value (with a random offset) and moving these values to the next level.
+    Levels have a capacity that decreases geometrically with their depth, so the size
+    of the sketch grows only logarithmically with the number of values, and the rank
+    error of the quantiles is of the order of 1/k.
+    """
+
+    def __init__(self, k: int = 200, seed: int = None):
+        """
+        Creates an empty sketch.
+
+        Args:
+            k (int, optional): the capacity of the top level, controlling the accuracy of the sketch.
+            seed (int, optional): a seed for the random compactions.
+        """
+        self.k = k
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        """Compacts the levels that exceed their capacity, from the bottom up."""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd value out stays in this level.
+                even = len(items) - len(items) % 2
+                promoted = items[self._rng.integers(2) : even : 2]
+                self.levels[level] = items[even:]
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], promoted]
+                )
+                # Adding a level reduces the capacity of the lower levels.
+                level = 0 if level + 2 == len(self.levels) else level + 1
+            else:
+                level += 1
+
+    def update(self, values: Iterable[float]) -> "QuantileSketch":
+        """Adds values to the sketch (missing values are ignored)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Adds the values summarized by another sketch to this sketch."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, q: float | Iterable[float]) -> np.ndarray:
+        """
+        Estimates quantiles of the values added to the sketch.
+
+        Args:
+            q (float | Iterable[float]): the quantiles to estimate, in [0, 1].
+
+        Returns:
+            np.ndarray: the estimated quantiles (the exact minimum and maximum for q=0 and q=1).
+        """
+        if self.count == 0:
+            raise ValueError("Cannot compute quantiles of an empty sketch.")
+        q = np.asarray(q, dtype=np.float64)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [np.full(len(items), 2.0**level) for level, items in enumerate(self.levels)]
+        )
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        ranks = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        result = items[order][np.clip(ranks, 0, len(items) - 1)]
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result
+
+    def bounds(self) -> tuple[float, float]:
+        """Returns the minimum and maximum values (e.g., as min_v and max_v of `quantiles`)."""
+        return self.min, self.max
+
+    def bin_edges(
+        self, num_bins: int, method: str = "quantile", decimals: int = None
+    ) -> list[float]:
+        """
+        Returns the edges of bins covering all the values of the sketch.
+
+        Args:
+            num_bins (int): the number of bins.
+            method (str, optional): "quantile" for bins with (approximately) equal numbers
+                of values, or "uniform" for bins of equal width.
+            decimals (int, optional): if set, edges are rounded to this number of decimals
+                (the first edge is rounded down and the last one up). Duplicate edges are removed,
+                so fewer bins than requested can be returned.
+
+        Returns:
+            list[float]: the edges of the bins (num_bins + 1 values), e.g. the cuts of `cut`.
+        """
+        if method == "quantile":
+            edges = self.quantiles(np.linspace(0, 1, num_bins + 1))
+        elif method == "uniform":
+            edges = np.linspace(self.min, self.max, num_bins + 1)
+        else:
+            raise ValueError(f"Unknown binning method {method}.")
+        edges = np.array(edges, dtype=np.float64)
+        # Bins are closed on the left ([a, b)): the last edge must be above the maximum.
+        if decimals is not None:
+            scale = 10.0**decimals
+            edges = np.round(edges, decimals)
+            edges[0] = np.floor(self.min * scale) / scale
+            edges[-1] = (np.floor(self.max * scale) + 1) / scale
+        else:
+            edges[-1] = np.nextafter(self.max, np.inf)
+        return np.unique(edges).tolist()
+
+    def cuts(
+        self, num_bins: int, method: str = "quantile", decimals: int = None
+    ) -> list[float]:
+        """
+        Returns the inner edges of bins, as used by `GroupingParameters.cuts`.
+
+        Groups defined by cuts [a, b] are (,a), [a,b) and [b,): this returns the edges of
+        `bin_edges` except the first and last, which are implicit.
+        """
+        return self.bin_edges(num_bins, method, decimals)[1:-1]
+
+    def grouping_parameters(
+        self,
+        column: str,
+        num_bins: int,
+        method: str = "quantile",
+        decimals: int = None,
+    ) -> models.GroupingParameters:
+        """Returns parameters to group an aggregation by bins of a numerical column."""
+        return models.GroupingParameters(
+            column=column,
+            cuts=self.cuts(num_bins, method, decimals),
+            numeric=True,
+        )
+
+
+def bin_labels(edges: list[float]) -> list[str]:
+    """
+    Returns labels for the bins defined by a list of edges, e.g. "[10, 20)".
+
+    Bins are closed on the left, as in the cut operation (see `PreprocessingBuilder.cut`).
+    """
+    return [f"[{low:g}, {high:g})" for low, high in zip(edges[:-1], edges[1:])]
+
+
+def sketch_columns(
+    source: pd.DataFrame | str,
+    columns: list[str] = None,
+    k: int = 200,
+    chunksize: int = 100_000,
+    **read_csv_kwargs,
+) -> dict[str, QuantileSketch]:
+    """
+    Computes quantile sketches of numerical columns in one pass over the data.
+
+    Args:
+        source (pd.DataFrame | str): a DataFrame, or a CSV file (path or buffer) that is
+            read in chunks, so that files larger than memory can be processed.
+        columns (list[str], optional): the columns to sketch. Defaults to all numerical
+            columns (of the DataFrame or of the first chunk of the file).
+        k (int, optional): the accuracy parameter of the sketches (see `QuantileSketch`).
+        chunksize (int, optional): the number of rows read at once from the CSV file.
+        **read_csv_kwargs: additional arguments to `pd.read_csv`.
+
+    Returns:
+        dict[str, QuantileSketch]: the sketch of each column.
+    """
+    if isinstance(source, pd.DataFrame):
+        chunks = [source]
+    else:
+        if columns is not None:
+            read_csv_kwargs.setdefault("usecols", columns)
+        chunks = pd.read_csv(source, chunksize=chunksize, **read_csv_kwargs)
+    sketches = None
+    for chunk in chunks:
+        if sketches is None:
+            if columns is None:
+                columns = list(chunk.select_dtypes(include="number").columns)
+            sketches = {column: QuantileSketch(k) for column in columns}
+        for column in columns:
+            values = pd.to_numeric(chunk[column], errors="coerce")
+            sketches[column].update(values.to_numpy(dtype=np.float64))
+    if sketches is None:
+        sketches = {column: QuantileSketch(k) for column in columns or []}
+    return sketches
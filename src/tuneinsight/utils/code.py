@@ -1,11 +1,21 @@
-"""Utilities to read and package Python code to be sent."""
+"""Utilities to read, package and validate Python code to be sent."""
 
-from typing import Callable
+from typing import Any, Callable
+import ast
 import inspect
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
 import textwrap
 
+import numpy as np
 import pandas as pd
 
+from tuneinsight.api.sdk import models
+from tuneinsight.api.sdk.types import is_set, is_unset, value_if_unset
+
 
 def get_code(function: Callable[[pd.DataFrame], pd.DataFrame]) -> str:
     """
@@ -36,3 +46,442 @@ def get_code(function: Callable[[pd.DataFrame], pd.DataFrame]) -> str:
         # Ensure we are not cutting any non-decorator code.
         assert line.startswith("@"), "Non-decorator line before function declaration"
     return "\n".join(lines[cutoff:])
+
+
+# Static analysis of custom functions.
+
+
+# Builtins that are unavailable (or dangerous) when custom functions are run remotely.
+_FORBIDDEN_BUILTINS = {
+    "__import__",
+    "breakpoint",
+    "compile",
+    "eval",
+    "exec",
+    "globals",
+    "input",
+    "open",
+}
+
+# Methods that iterate over the records of a DataFrame in Python.
+_ROW_ITERATORS = {"iterrows", "itertuples"}
+
+# Methods that apply a Python function to each element or row.
+_ELEMENTWISE_METHODS = {"apply", "applymap", "map", "transform"}
+
+# Indexers that access single elements of a DataFrame.
+_ELEMENT_INDEXERS = {"at", "iat", "loc", "iloc"}
+
+
+class CodeIssue:
+    """An issue found in the code of a custom function."""
+
+    def __init__(self, level: str, line: int, message: str):
+        """
+        Args:
+            level (str): "error" if the function cannot run remotely, "warning" for code
+                likely to be slow on large datasets, "info" for other remarks.
+            line (int): the line of the issue in the code of the function (starting at 1).
+            message (str): a description of the issue.
+        """
+        self.level = level
+        self.line = line
+        self.message = message
+
+    def __repr__(self) -> str:
+        return f"CodeIssue({self.level!r}, {self.line}, {self.message!r})"
+
+    def __str__(self) -> str:
+        return f"line {self.line}: [{self.level}] {self.message}"
+
+
+def _is_row_wise_axis(call: ast.Call) -> bool:
+    """Returns whether a call has an argument axis=1 (or axis="columns")."""
+    for keyword in call.keywords:
+        if keyword.arg == "axis" and isinstance(keyword.value, ast.Constant):
+            return keyword.value.value in (1, "columns")
+    return False
+
+
+def _iterates_over_rows(loop: ast.For) -> bool:
+    """Returns whether a for loop iterates over range(len(...)) or an index."""
+    iterator = loop.iter
+    if isinstance(iterator, ast.Attribute):
+        return iterator.attr == "index"
+    if isinstance(iterator, ast.Call) and isinstance(iterator.func, ast.Name):
+        if iterator.func.id == "range" and len(iterator.args) == 1:
+            argument = iterator.args[0]
+            return (
+                isinstance(argument, ast.Call)
+                and isinstance(argument.func, ast.Name)
+                and argument.func.id == "len"
+            )
+    return False
+
+
+def _check_node(node: ast.AST, in_loop: bool) -> list[CodeIssue]:
+    """Returns the issues raised by a single node of the syntax tree."""
+    line = getattr(node, "lineno", 0)
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return [
+            CodeIssue(
+                "error",
+                line,
+                "import statements are forbidden: only the np and pd modules are available.",
+            )
+        ]
+    if isinstance(node, ast.Name) and node.id in _FORBIDDEN_BUILTINS:
+        return [CodeIssue("error", line, f"{node.id} is not available remotely.")]
+    if isinstance(node, ast.Attribute) and node.attr.startswith("__"):
+        return [CodeIssue("error", line, f"access to {node.attr} is forbidden.")]
+    if isinstance(node, ast.For) and _iterates_over_rows(node):
+        return [
+            CodeIssue(
+                "warning",
+                line,
+                "loop over the rows of the data: use vectorised column operations instead.",
+            )
+        ]
+    if in_loop and isinstance(node, ast.Subscript):
+        value = node.value
+        if isinstance(value, ast.Attribute) and value.attr in _ELEMENT_INDEXERS:
+            return [
+                CodeIssue(
+                    "warning",
+                    line,
+                    f"element-wise .{value.attr} access in a loop: use vectorised operations instead.",
+                )
+            ]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        method = node.func.attr
+        if method in _ROW_ITERATORS:
+            return [
+                CodeIssue(
+                    "warning",
+                    line,
+                    f"row-wise iteration with .{method}(): use vectorised column operations instead.",
+                )
+            ]
+        if method in _ELEMENTWISE_METHODS and node.args:
+            if _is_row_wise_axis(node):
+                return [
+                    CodeIssue(
+                        "warning",
+                        line,
+                        f"row-wise .{method}(..., axis=1): use vectorised column operations instead.",
+                    )
+                ]
+            if isinstance(node.args[0], ast.Lambda):
+                return [
+                    CodeIssue(
+                        "info",
+                        line,
+                        f".{method}() with a Python function is not vectorised.",
+                    )
+                ]
+    return []
+
+
+def analyze_code(
+    function: Callable[[pd.DataFrame], pd.DataFrame] | str
+) -> list[CodeIssue]:
+    """
+    Statically analyses the code of a custom preprocessing function.
+
+    This flags code that cannot run remotely (imports, unavailable builtins, access to
+    private attributes) as errors, and row-wise operations (`apply` with `axis=1`,
+    `iterrows`, loops over rows) that are slow on large datasets as warnings.
+
+    Args:
+        function: a function(pd.DataFrame) -> pd.DataFrame, or its code.
+
+    Returns:
+        list[CodeIssue]: the issues found in the code, ordered by line.
+    """
+    code = function if isinstance(function, str) else get_code(function)
+    tree = ast.parse(code)
+    issues = []
+
+    def visit(node: ast.AST, in_loop: bool):
+        issues.extend(_check_node(node, in_loop))
+        in_loop = in_loop or isinstance(node, (ast.For, ast.While))
+        for child in ast.iter_child_nodes(node):
+            visit(child, in_loop)
+
+    visit(tree, False)
+    return sorted(issues, key=lambda issue: issue.line)
+
+
+# Synthetic data and sandboxed execution.
+
+
+def _column_bounds(checks: models.ColumnSchemaChecks) -> tuple[float, float]:
+    """Returns the range of values allowed by the checks of a column (or [0, 100])."""
+    low, high = 0.0, 100.0
+    if is_unset(checks) or checks is None:
+        return low, high
+    if is_set(checks.in_range):
+        low = value_if_unset(checks.in_range.min_value, low)
+        high = value_if_unset(checks.in_range.max_value, high)
+    for bound in (checks.ge, checks.gt):
+        if is_set(bound) and bound is not None:
+            low = float(bound)
+    for bound in (checks.le, checks.lt):
+        if is_set(bound) and bound is not None:
+            high = float(bound)
+    return low, max(low, high)
+
+
+def _synthetic_column(
+    name: str, column: models.ColumnSchema, num_rows: int, rng: np.random.Generator
+) -> pd.Series:
+    """Generates random values that satisfy the schema of a column."""
+    checks = column.checks
+    has_checks = is_set(checks) and checks is not None
+    low, high = _column_bounds(checks)
+    if has_checks and is_set(checks.eq) and checks.eq is not None:
+        values = [checks.eq] * num_rows
+    elif has_checks and is_set(checks.isin) and checks.isin:
+        values = rng.choice(checks.isin, size=num_rows)
+    elif column.dtype == "int":
+        values = rng.integers(
+            int(np.ceil(low)), int(high), size=num_rows, endpoint=True
+        )
+    elif column.dtype == "float":
+        values = rng.uniform(low, high, size=num_rows)
+    elif column.dtype == "datetime":
+        start = pd.Timestamp("2000-01-01").value
+        end = pd.Timestamp("2025-01-01").value
+        values = pd.to_datetime(rng.integers(start, end, size=num_rows))
+    else:
+        prefix = value_if_unset(checks.str_startswith, "") if has_checks else ""
+        values = [
+            f"{prefix or ''}{name}_{i}" for i in rng.integers(0, 10, size=num_rows)
+        ]
+    series = pd.Series(values, name=name)
+    if value_if_unset(column.nullable, False):
+        series = series.mask(rng.random(num_rows) < 0.05)
+    return series
+
+
+def synthetic_sample(schema, num_rows: int = 1000, seed: int = None) -> pd.DataFrame:
+    """
+    Generates a random dataset that satisfies a dataset schema.
+
+    The values are drawn uniformly from the ranges and sets allowed by the checks of
+    each column. This data is only meant to test preprocessing code locally.
+
+    Args:
+        schema (DatasetSchema | models.DatasetSchema): the schema of the data, e.g. as
+            inferred from a datasource with `DatasetSchema.infer_from_datasource`.
+        num_rows (int, optional): the number of records to generate.
+        seed (int, optional): a seed for the random generator.
+
+    Returns:
+        pd.DataFrame: the synthetic data.
+    """
+    model = getattr(schema, "model", schema)
+    rng = np.random.default_rng(seed)
+    columns = model.columns.additional_properties
+    return pd.DataFrame(
+        {
+            name: _synthetic_column(name, column, num_rows, rng)
+            for name, column in columns.items()
+        },
+        index=pd.RangeIndex(num_rows),
+    )
+
+
+# The script run in a separate process to execute the custom function. The function
+# is run with only np and pd available, without import statements, and with limited memory.
+_SANDBOX_SCRIPT = """
+import builtins, pickle, sys, time
+import numpy as np
+import pandas as pd
+try:
+    import resource
+    limit = int(sys.argv[3])
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+except (ImportError, ValueError, OSError):
+    pass
+with open(sys.argv[1], "rb") as f:
+    code, name, data, kwargs, repeat = pickle.load(f)
+forbidden = set(sys.argv[4].split(","))
+scope = {
+    "__builtins__": {k: v for k, v in vars(builtins).items() if k not in forbidden},
+    "np": np,
+    "pd": pd,
+}
+result = {"durations": [], "error": None, "columns": None, "rows": None}
+try:
+    exec(code, scope)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = scope[name](data.copy(), **kwargs)
+        result["durations"].append(time.perf_counter() - start)
+    if not isinstance(output, pd.DataFrame):
+        raise TypeError(f"the function returned {type(output).__name__}, not a DataFrame")
+    result["columns"] = [str(c) for c in output.columns]
+    result["rows"] = len(output)
+except BaseException as err:
+    result["error"] = f"{type(err).__name__}: {err}"
+with open(sys.argv[2], "wb") as f:
+    pickle.dump(result, f)
+"""
+
+
+class CustomFunctionReport:
+    """The result of the validation of a custom preprocessing function."""
+
+    def __init__(
+        self,
+        issues: list[CodeIssue],
+        num_rows: int,
+        durations: list[float] = None,
+        output_columns: list[str] = None,
+        expected_columns: list[str] = None,
+        output_rows: int = None,
+        error: str = None,
+    ):
+        self.issues = issues
+        self.num_rows = num_rows
+        self.durations = durations or []
+        self.output_columns = output_columns
+        self.expected_columns = expected_columns
+        self.output_rows = output_rows
+        self.error = error
+
+    @property
+    def runtime_per_1k_rows(self) -> float:
+        """The (fastest) runtime of the function in seconds, per 1000 input records."""
+        if not self.durations or self.num_rows == 0:
+            return None
+        return min(self.durations) * 1000 / self.num_rows
+
+    @property
+    def missing_columns(self) -> list[str]:
+        """Expected columns that are not in the output of the function."""
+        if self.expected_columns is None or self.output_columns is None:
+            return []
+        return [c for c in self.expected_columns if c not in self.output_columns]
+
+    @property
+    def unexpected_columns(self) -> list[str]:
+        """Columns in the output of the function that are not expected."""
+        if self.expected_columns is None or self.output_columns is None:
+            return []
+        return [c for c in self.output_columns if c not in self.expected_columns]
+
+    @property
+    def ok(self) -> bool:
+        """Whether the function ran, has no error-level issues and returned the expected columns."""
+        return (
+            self.error is None
+            and not any(issue.level == "error" for issue in self.issues)
+            and not self.missing_columns
+            and not self.unexpected_columns
+        )
+
+    def summary(self) -> str:
+        """Returns a human-readable summary of the validation."""
+        lines = [str(issue) for issue in self.issues]
+        if self.error is not None:
+            lines.append(f"The function failed on the sample data: {self.error}")
+        elif self.durations:
+            lines.append(
+                f"{self.num_rows} rows -> {self.output_rows} rows, "
+                f"{self.runtime_per_1k_rows:.4f}s per 1000 rows."
+            )
+        if self.missing_columns:
+            lines.append(f"Missing output columns: {self.missing_columns}.")
+        if self.unexpected_columns:
+            lines.append(f"Unexpected output columns: {self.unexpected_columns}.")
+        lines.append("Validation passed." if self.ok else "Validation FAILED.")
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.summary()
+
+
+def validate_custom_function(
+    function: Callable[[pd.DataFrame], pd.DataFrame],
+    sample: pd.DataFrame = None,
+    schema=None,
+    num_rows: int = 1000,
+    output_columns: list[str] = None,
+    additional_inputs: dict[str, Any] = None,
+    timeout: float = 60,
+    repeat: int = 3,
+    memory_limit: int = 4 * 1024**3,
+) -> CustomFunctionReport:
+    """
+    Validates a custom preprocessing function before it is sent to other nodes.
+
+    The code is analysed statically (see `analyze_code`), then the function is run in a
+    separate Python process on sample data, in an environment similar to the remote one:
+    only the `np` and `pd` modules are available and import statements are forbidden.
+    The sample is either provided or generated randomly from a dataset schema (see
+    `synthetic_sample`).
+
+    Args:
+        function: the custom function(pd.DataFrame) -> pd.DataFrame.
+        sample (pd.DataFrame, optional): the sample data to run the function on.
+        schema (DatasetSchema, optional): a schema to generate a sample from, if no sample
+            is provided (e.g., inferred with `DatasetSchema.infer_from_datasource`).
+        num_rows (int, optional): the number of records to generate from the schema.
+        output_columns (list[str], optional): the expected columns of the output.
+        additional_inputs (dict[str, Any], optional): keyword arguments to pass to the function.
+        timeout (float, optional): the maximum time (in seconds) the function can run for.
+        repeat (int, optional): how many times the function is run (the fastest run is reported).
+        memory_limit (int, optional): the maximum memory of the process, in bytes (on POSIX).
+
+    Returns:
+        CustomFunctionReport: the issues, runtime and output columns of the function.
+    """
+    code = get_code(function)
+    issues = analyze_code(code)
+    if sample is None:
+        if schema is None:
+            raise ValueError("Either a sample or a schema must be provided.")
+        sample = synthetic_sample(schema, num_rows)
+    name = next(
+        node.name for node in ast.parse(code).body if isinstance(node, ast.FunctionDef)
+    )
+    report = CustomFunctionReport(
+        issues, num_rows=len(sample), expected_columns=output_columns
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, "input.pkl")
+        output_path = os.path.join(directory, "output.pkl")
+        with open(input_path, "wb") as f:
+            pickle.dump((code, name, sample, additional_inputs or {}, repeat), f)
+        try:
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-I",
+                    "-c",
+                    _SANDBOX_SCRIPT,
+                    input_path,
+                    output_path,
+                    str(memory_limit),
+                    ",".join(sorted(_FORBIDDEN_BUILTINS)),
+                ],
+                cwd=directory,
+                capture_output=True,
+                timeout=timeout,
+                check=False,
+            )
+        except subprocess.TimeoutExpired:
+            report.error = f"the function did not complete within {timeout}s."
+            return report
+        if not os.path.exists(output_path):
+            report.error = "the process running the function crashed."
+            return report
+        with open(output_path, "rb") as f:
+            result = pickle.load(f)
+    report.durations = result["durations"]
+    report.output_columns = result["columns"]
+    report.output_rows = result["rows"]
+    report.error = result["error"]
+    return report
@@ -12,20 +12,41 @@ This module defines the following classes and functions:
  - cut, an analogue to pd.cut that works on a RemoteDataFrame as well.
  - select, a utility to select a subset of columns on a DataFrame or RemoteDataFrame.
  - custom, a decorator to write functions that operate over pandas.DataFrames locally or remotely.
+ - chain_to_code and code_to_chain, to convert a preprocessing chain to code using this
+    module and back (e.g., to display and edit the preprocessing of previous computations).
+
+get_dummies, cut, select and custom (only) also accept polars DataFrames and LazyFrames,
+as well as Arrow tables, in which case the operations are added to a polars query plan
+(and executed lazily with multiple threads). This is useful to quickly validate a
+preprocessing script on large local samples. The output is then a polars LazyFrame, on
+which `.collect()` must be called to obtain the results, and is otherwise the same as with
+pandas, except for the labels returned by cut (see `cut`). Other operations of this module
+(e.g., RemoteDataFrame methods) do not support polars. This requires the optional `polars`
+and `pyarrow` packages.
 
 """
 
+from enum import Enum
 from typing import Any, Callable
 
+import ast
+import functools
+import io
+import json
 import re
-import black
+import tokenize
 import numpy as np
 import pandas as pd
 
 from tuneinsight.api.sdk import models
+from tuneinsight.api.sdk.types import UNSET, is_set, none_if_unset, value_if_unset
+from tuneinsight.computations.local_preprocessing import as_operation_model
 from tuneinsight.computations.preprocessing import PreprocessingBuilder
 
 
+# pylint: disable=too-many-lines
+
+
 # Internal classes that serve as holders for pending operations.
 
 
@@ -138,6 +159,15 @@ class _SumOfColumns(_PendingOperation):
         self.numerical = numerical
         self.sep = sep
 
+    def __add__(self, other_column):  # (df[a] + df[b]) + df[c]
+        assert isinstance(other_column, _SelectedColumn)
+        assert (
+            other_column.remotedf == self.columns[0].remotedf
+        ), "Must have the same dataset."
+        result = _SumOfColumns(self.columns[0], other_column, self.sep, self.numerical)
+        result.columns = self.columns + [other_column]
+        return result
+
     def commit(self, output_name: str):
         df = self.columns[0].remotedf
         df.builder.add_columns(
@@ -197,6 +227,15 @@ class _MultiplyColumnsOperations(_PendingOperation):
             raise ValueError("all operations must apply to the same RemoteDataFrame")
         self.columns = [column.name, other.name]
 
+    def __mul__(self, other):  # (df[a] * df[b]) * df[c]
+        if not isinstance(other, _SelectedColumn) or other.remotedf != self.df:
+            raise ValueError(
+                "columns can only be multiplied by columns of the same data"
+            )
+        result = _MultiplyColumnsOperations(other, other)
+        result.columns = self.columns + [other.name]
+        return result
+
     def commit(self, output_name: str):
         self.df.builder.multiply_columns(self.columns, output_name)
 
@@ -318,10 +357,10 @@ class RemoteDataFrame:
         self.builder.drop(columns)
         return self
 
-    def dropna(self, inplace: bool = True):
-        """This operation drops all rows that contain NaN values, using the standard pandas function."""
+    def dropna(self, subset: list[str] = None, inplace: bool = True):
+        """This operation drops all rows that contain NaN values (in the subset of columns, if specified)."""
         assert inplace is True, "dropna must be done inplace."
-        self.builder.dropna()
+        self.builder.dropna(subset=subset)
         return self
 
     def rename(self, mapper: dict, axis="columns", errors="raise", inplace=True):
@@ -402,6 +441,8 @@ class RemoteDataFrame:
     ):
         "Drops duplicate records in the data (see `pandas.DataFrame.drop_duplicates`)."
         assert inplace, "drop_duplicates must be in place"
+        # As in pandas, keep=False drops all duplicates.
+        keep = "none" if keep is False else keep
         self.builder.drop_duplicates(columns=subset, keep=keep)
         return self
 
@@ -410,15 +451,72 @@ class RemoteDataFrame:
 # variables with either Pandas Dataframes or RemoteDataFrames.
 
 
+# Local data can also be processed with polars, which is imported only when needed.
+def _polars():
+    try:
+        import polars as pl  # pylint: disable=import-outside-toplevel,import-error
+    except ImportError as err:
+        raise ImportError(
+            "polars is required to process polars or Arrow data: pip install polars pyarrow"
+        ) from err
+    return pl
+
+
+def _is_polars(df) -> bool:
+    """Returns whether df is a polars or Arrow object (without importing these packages)."""
+    return type(df).__module__.split(".")[0] in ("polars", "pyarrow")
+
+
+def _lazy(df):
+    """Converts a polars DataFrame or an Arrow table to a polars LazyFrame."""
+    pl = _polars()
+    if isinstance(df, pl.LazyFrame):
+        return df
+    if isinstance(df, pl.DataFrame):
+        return df.lazy()
+    return pl.from_arrow(df).lazy()
+
+
+def _cut_expression(pl, column, bins: list[float], labels: list[str] = None):
+    """
+    Returns a polars expression binning a column into left-closed intervals, like cut.
+
+    polars has no interval type: bins are labelled by the string representation of the
+    intervals returned by cut on pandas data (e.g., "[0.0, 1.5)"), in an ordered polars
+    Enum (the equivalent of the ordered categorical returned by pd.cut).
+    """
+    intervals = pd.IntervalIndex.from_breaks(bins, closed="left")
+    if len(intervals) == 0:
+        raise ValueError("At least two bin edges are required.")
+    if labels is None:
+        labels = [str(interval) for interval in intervals]
+    if len(labels) != len(intervals):
+        raise ValueError("Bin labels must be one fewer than the number of bin edges.")
+    labels = [str(label) for label in labels]
+    # Values outside of the bins are null, as in pandas.
+    expr = pl
+    for interval, label in zip(intervals, labels):
+        expr = expr.when((column >= interval.left) & (column < interval.right)).then(
+            pl.lit(label)
+        )
+    return expr.otherwise(pl.lit(None, dtype=pl.Utf8)).cast(pl.Enum(labels))
+
+
 def get_dummies(
     df: pd.DataFrame | RemoteDataFrame,
     target_column: str,
     prefix: str,
     specified_types: list[str],
+    strict: bool = None,
 ) -> pd.DataFrame | RemoteDataFrame:
-    """Create dummies (one-hot encoding) for a given column and collection of values."""
+    """
+    Create dummies (one-hot encoding) for a given column and collection of values.
+
+    Columns are only created for the specified values. On a RemoteDataFrame, `strict`
+    also ignores values outside of these (see `PreprocessingBuilder.one_hot_encoding`).
+    """
     if isinstance(df, RemoteDataFrame):
-        df.builder.one_hot_encoding(target_column, prefix, specified_types)
+        df.builder.one_hot_encoding(target_column, prefix, specified_types, strict)
         return df
     if isinstance(df, pd.DataFrame):
         # Instead of using pd.get_dummies, manually create the columns for each specified value.
@@ -428,6 +526,16 @@ def get_dummies(
         for value in specified_types:
             df[f"{prefix}{prefix_sep}{value}"] = df[target_column] == value
         return df
+    if _is_polars(df):
+        pl = _polars()
+        prefix_sep = "_" if prefix != "" else ""
+        return _lazy(df).with_columns(
+            # Missing values are not equal to any value, as in pandas.
+            pl.col(target_column)
+            .eq_missing(value)
+            .alias(f"{prefix}{prefix_sep}{value}")
+            for value in specified_types
+        )
     # If neither a Remote or Pandas DataFrame.
     raise ValueError(f"Invalid type for get_dummies: {type(df)}.")
 
@@ -441,6 +549,15 @@ def cut(
     """
     Discretizes a continuous column into bins. Similar to pd.cut.
 
+    Bins are closed on the left (e.g., [0, 10) and [10, 20)), as for the cut operation run
+    on the instances, so that local and remote data are binned in the same way.
+
+    On polars data, this returns a polars expression (or a Series if df is a polars Series),
+    e.g., `df = df.with_columns(cut(df, bins, labels, column="age").alias("age_group"))`.
+    Since polars has no interval type, the values are an ordered Enum of the labels, or of
+    the string representation of the intervals (e.g., "[0.0, 1.5)") where pd.cut returns a
+    categorical of intervals.
+
     Args:
         df: the [Remote]DataFrame to cut. This should be either a column of the data, or the column argument should be specified.
         bins: edges of the bins for the discretization. There will be len(bins)-1 bins.
@@ -449,10 +566,18 @@ def cut(
 
     """
     assert np.iterable(bins), "Only iterable `bins` are supported."
+    if _is_polars(df):
+        pl = _polars()
+        if isinstance(df, pl.Series):
+            expr = _cut_expression(pl, pl.col(df.name), list(bins), labels)
+            return df.to_frame().select(expr.alias(df.name)).to_series()
+        if column is None:
+            raise ValueError("Cannot cut a whole dataset: specify a column.")
+        return _cut_expression(pl, pl.col(column), list(bins), labels).alias(column)
     if column is not None:
         df = df[column]
     if isinstance(df, pd.Series):
-        return pd.cut(df, bins, labels=labels)
+        return pd.cut(df, bins, labels=labels, right=False)
     if isinstance(df, _SelectedColumn):
         return _CutOperation(df, bins, labels)
     if isinstance(df, RemoteDataFrame):
@@ -474,8 +599,17 @@ def select(
                     df[col] = dummy_value
         return df[columns]
     if isinstance(df, RemoteDataFrame):
-        df.builder.select(columns)
+        df.builder.select(columns, create_if_missing, dummy_value)
         return df
+    if _is_polars(df):
+        pl = _polars()
+        df = _lazy(df)
+        if create_if_missing:
+            existing = set(df.collect_schema().names())
+            df = df.with_columns(
+                pl.lit(dummy_value).alias(col) for col in columns if col not in existing
+            )
+        return df.select(columns)
     raise ValueError(f"Invalid type for select: {type(df)}")
 
 
@@ -492,6 +626,9 @@ def custom(
     If the input is a RemoteDataFrame, the function call to func is added to the
     preprocessing chain as a custom operation.
 
+    If the input is polars or Arrow data, the pending query is executed and the function
+    is applied to the result converted to pandas, since custom functions are opaque to polars.
+
     Args:
         name (str, optional): the name of the function, for documentation purposes.
         description (str, optional): the description of the function, for documentation purposes.
@@ -516,6 +653,10 @@ def custom(
                     compatible_with_dp=compatible_with_dp,
                 )
                 return df
+            if _is_polars(df):
+                pl = _polars()
+                output = func(_lazy(df).collect().to_pandas(), **kwargs)
+                return pl.from_pandas(output).lazy()
             raise ValueError(f"Invalid type for custom function: {type(df)}.")
 
         return wrappedfunc
@@ -523,133 +664,702 @@ def custom(
     return decorator
 
 
-def _render_arguments(operation, arguments: list[str], include_df=False):
-    """Small helper to render a function of the type df = f(df, optional, arguments)."""
-    op = operation.to_dict()
-    rendered_args = []
-    if include_df:
-        rendered_args.append("df")
-    for argument in arguments:
-        # Convert to camel case to access the model variables.
-        arg_words = argument.split("_")
-        cc_arg = "".join([arg_words[0]] + [word.capitalize() for word in arg_words[1:]])
-        if op.get(cc_arg) is not None:
-            rendered_args.append(f"{argument}={repr(op[cc_arg])}")
-    return ", ".join(rendered_args)
-
-
-# pylint: disable=too-many-branches,too-many-statements
-def chain_to_code(chain: models.PreprocessingChain) -> str:
-    """Returns the Python code equivalent to a given preprocessing chain using the RemoteDataFrame abstraction."""
-    blocks = []
-    imports_needed = set(["RemoteDataFrame"])
-    function_definitions = []
-    op = chain.chain
+# Conversion between preprocessing chains and Python code.
+#
+# chain_to_code renders each operation of a chain as a statement on a RemoteDataFrame `df`,
+# and code_to_chain parses these statements back into operations. Every rendered statement
+# is checked to parse back to its operation: operations that cannot be expressed exactly
+# are rendered as a comment holding their JSON definition, which is also parsed back.
+
+
+# The Python operator of each comparator of a filter operation, and its inverse.
+_COMPARATOR_SYMBOLS = {
+    models.ComparisonType.EQUAL: "==",
+    models.ComparisonType.GREATER: ">",
+    models.ComparisonType.GREATEREQ: ">=",
+    models.ComparisonType.LESS: "<",
+    models.ComparisonType.LESSEQ: "<=",
+    models.ComparisonType.NEQUAL: "!=",
+}
+_AST_COMPARATORS = {
+    ast.Eq: models.ComparisonType.EQUAL,
+    ast.Gt: models.ComparisonType.GREATER,
+    ast.GtE: models.ComparisonType.GREATEREQ,
+    ast.Lt: models.ComparisonType.LESS,
+    ast.LtE: models.ComparisonType.LESSEQ,
+    ast.NotEq: models.ComparisonType.NEQUAL,
+}
+# Comparators that RemoteDataFrame filters apply to numerical values.
+_NUMERICAL_COMPARATORS = {
+    models.ComparisonType.GREATER,
+    models.ComparisonType.GREATEREQ,
+    models.ComparisonType.LESS,
+    models.ComparisonType.LESSEQ,
+}
+# Fill-in methods of DataFrame methods (e.g., df.ffill()) equivalent to a fillna operation.
+_FILLNA_METHODS = {
+    "fillna": models.FillNAMethod.VALUE,
+    "ffill": models.FillNAMethod.FFILL,
+    "bfill": models.FillNAMethod.BFILL,
+    "interpolate": models.FillNAMethod.INTERPOLATE,
+}
+_UNAVAILABLE_OPERATION = "# Operation not available with RemoteDataFrame: "
+_CODE_PREAMBLE = "df = RemoteDataFrame(...)  # TODO: fill in the gaps."
+
+
+def _literal(value) -> str:
+    """Renders a parameter of an operation as a Python literal."""
+    if isinstance(value, Enum):
+        value = value.value
+    if hasattr(value, "to_dict"):
+        value = value.to_dict()
+    return repr(value)
+
+
+def _keywords(**arguments) -> str:
+    """Renders keyword arguments, skipping the arguments that are unset or None."""
+    return ", ".join(
+        f"{name}={_literal(value)}"
+        for name, value in arguments.items()
+        if value is not None and is_set(value)
+    )
+
+
+def _arguments(*arguments: str) -> str:
+    return ", ".join(a for a in arguments if a)
+
+
+def _errors(errors) -> str | None:
+    """Converts the errors parameter of the API to the pandas parameter."""
+    if errors is None or not is_set(errors):
+        return None
+    return "raise" if errors else "ignore"
+
+
+def _filter_value(op: models.Filter) -> str:
+    """Renders the value of a filter, as a number if the comparison is numerical."""
+    if op.numerical is True:
+        for cast in (int, float):
+            try:
+                number = cast(op.value)
+            except ValueError:
+                continue
+            if str(number) == op.value:
+                return repr(number)
+    return repr(op.value)
+
+
+def _column(name: str) -> str:
+    return f"df[{name!r}]"
+
+
+def _function_name(function: str) -> str:
+    return re.findall(r"def ([\w]+)\(", function)[0]
+
+
+# pylint: disable=too-many-branches,too-many-return-statements
+def _render_operation(op: models.PreprocessingOperation) -> tuple[set[str], str, str]:
+    """
+    Renders an operation as a statement on a RemoteDataFrame `df`.
+
+    Returns:
+        tuple[set[str], str, str]: the names to import from this module, the definition
+            of a function used by the statement (or ""), and the statement (or None if
+            the operation is not available with RemoteDataFrame).
+    """
+    op = as_operation_model(op)
     match op.type:
         case models.PreprocessingOperationType.ONEHOTENCODING:
-            imports_needed.add("get_dummies")
-            block = f"df = get_dummies({_render_arguments(op, ['input_column', 'prefix', 'specified_types'], include_df=True)})"
-            block = block.replace(
-                "input_column", "target_column"
-            )  # Post-process (mismatch between API and pandas names).
-            blocks.append(block)
+            # The prefix and types are required arguments of get_dummies.
+            arguments = _arguments(
+                _keywords(target_column=op.input_column),
+                f"prefix={none_if_unset(op.prefix)!r}",
+                f"specified_types={none_if_unset(op.specified_types)!r}",
+                _keywords(strict=op.strict),
+            )
+            return {"get_dummies"}, "", f"df = get_dummies(df, {arguments})"
         case models.PreprocessingOperationType.SELECT:
-            imports_needed.add("select")
-            blocks.append(
-                f"df = select({_render_arguments(op, ['columns', 'create_if_missing', 'dummy_value'], include_df=True)})"
+            arguments = _keywords(
+                columns=op.columns,
+                create_if_missing=op.create_if_missing,
+                dummy_value=op.dummy_value,
             )
+            return {"select"}, "", f"df = select(df, {arguments})"
         case models.PreprocessingOperationType.DROP:
-            blocks.append(f"df = df.drop(columns={op.columns})")
+            return set(), "", f"df = df.drop({_keywords(columns=op.columns)})"
         case models.PreprocessingOperationType.FILTER:
-            comp = {
-                models.ComparisonType.EQUAL: "==",
-                models.ComparisonType.GREATER: ">",
-                models.ComparisonType.GREATEREQ: ">=",
-                models.ComparisonType.LESS: "<",
-                models.ComparisonType.LESSEQ: "==",
-                models.ComparisonType.NEQUAL: "!=",
-            }.get(op.comparator)
-            if comp is not None:
-                blocks.append(f'df = df[df["{op.column}"] {comp} {repr(op.value)}]')
-            else:
-                blocks.append(
-                    f"# Filter operation not available for RemoteDataFrame and comparator {op.comparator}"
-                )
+            symbol = _COMPARATOR_SYMBOLS.get(op.comparator)
+            if symbol is None:
+                return set(), "", None
+            condition = f"{_column(op.column)} {symbol} {_filter_value(op)}"
+            if isinstance(op.output_column, str):
+                return set(), "", f"{_column(op.output_column)} = {condition}"
+            return set(), "", f"df = df[{condition}]"
         case models.PreprocessingOperationType.TRANSPOSE:
-            blocks.append("df = df.transpose()")
+            return set(), "", "df = df.transpose()"
         case models.PreprocessingOperationType.SETINDEX:
-            blocks.append(
-                f"df = df.set_index({_render_arguments(op, ['keys', 'drop', 'append'])})"
+            arguments = _arguments(
+                _literal(op.columns), _keywords(drop=op.drop, append=op.append)
             )
+            return set(), "", f"df = df.set_index({arguments})"
         case models.PreprocessingOperationType.ASTYPE:
-            blocks.append(
-                f"df = df.astype({repr(op.type_map.to_dict())}, {_render_arguments(op, ['errors'])})"
+            arguments = _arguments(
+                _literal(op.type_map), _keywords(errors=_errors(op.errors))
             )
+            return set(), "", f"df = df.astype({arguments})"
         case models.PreprocessingOperationType.RESETINDEX:
-            blocks.append(
-                f"df = df.reset_index({_render_arguments(op, ['drop', 'level'])})"
-            )
+            arguments = _keywords(drop=op.drop, level=op.level)
+            return set(), "", f"df = df.reset_index({arguments})"
         case models.PreprocessingOperationType.RENAME:
-            blocks.append(
-                f"df = df.rename({_render_arguments(op, ['mapper', 'axis', 'errors'])}, inplace=True)"
+            arguments = _arguments(
+                _literal(op.mapper),
+                _keywords(axis=op.axis, errors=_errors(op.errors)),
             )
+            return set(), "", f"df = df.rename({arguments})"
         case models.PreprocessingOperationType.DROPNA:
-            blocks.append("df = df.dropna(inplace=True)")
+            return set(), "", f"df = df.dropna({_keywords(subset=op.subset)})"
         case models.PreprocessingOperationType.APPLYMAPPING:
-            blocks.append(
-                f'df["{op.output_column}"] = df["{op.input_column}"].replace(to_replace={op.mapping.to_dict()}, default={repr(op.default)})'
+            arguments = _keywords(to_replace=op.mapping, default=op.default)
+            return (
+                set(),
+                "",
+                f"{_column(op.output_column)} = {_column(op.input_column)}.replace({arguments})",
             )
         case models.PreprocessingOperationType.CUT:
-            imports_needed.add("cut")
-            blocks.append(
-                f"df['{op.output_column}'] = cut(df['{op.input_column}'], {_render_arguments(op, ['cuts', 'labels'])})".replace(
-                    "cuts=", "bins="
-                )
+            arguments = _keywords(bins=op.cuts, labels=op.labels)
+            return (
+                {"cut"},
+                "",
+                f"{_column(op.output_column)} = cut({_column(op.input_column)}, {arguments})",
             )
         case models.PreprocessingOperationType.ADDCOLUMNS:
-            blocks.append(
-                f"df['{op.output_column}'] = "
-                + " + ".join(f"df['{col}']" for col in op.input_columns)
-            )
+            terms = " + ".join(_column(c) for c in op.input_columns)
+            return set(), "", f"{_column(op.output_column)} = {terms}"
         case models.PreprocessingOperationType.SCALE:
-            for ic, oc in zip(op.input_columns, op.output_columns):
-                blocks.append(f"df[{repr(oc)}] = {op.scale} * df[{repr(ic)}]")
+            if len(op.input_columns) != 1 or not isinstance(op.output_columns, list):
+                return set(), "", None
+            product = f"{op.scale!r} * {_column(op.input_columns[0])}"
+            return set(), "", f"{_column(op.output_columns[0])} = {product}"
         case models.PreprocessingOperationType.MULTIPLYCOLUMNS:
-            blocks.append(
-                f"df['{op.output_column}'] = "
-                + " * ".join(f"df['{col}']" for col in op.input_columns)
-            )
+            product = " * ".join(_column(c) for c in op.input_columns)
+            return set(), "", f"{_column(op.output_column)} = {product}"
         case models.PreprocessingOperationType.NEWCOLUMN:
-            blocks.append(f"df['{op.name}'] = {repr(op.value)}")
+            return set(), "", f"{_column(op.name)} = {op.value!r}"
+        case models.PreprocessingOperationType.DROPDUPLICATES:
+            keep = op.keep.value if isinstance(op.keep, Enum) else op.keep
+            arguments = _keywords(
+                subset=op.columns,
+                keep=False if keep == models.DropDuplicatesKeep.NONE else keep,
+                inplace=True,
+            )
+            return set(), "", f"df.drop_duplicates({arguments})"
+        case models.PreprocessingOperationType.FILLNA:
+            method = {v: k for k, v in _FILLNA_METHODS.items()}.get(op.method)
+            if method is None:
+                return set(), "", None
+            value = op.value if method == "fillna" else None
+            if isinstance(op.columns, list) and len(op.columns) == 1:
+                target = _column(op.columns[0])
+                return (
+                    set(),
+                    "",
+                    f"{target} = {target}.{method}({_keywords(value=value)})",
+                )
+            return set(), "", f"df.{method}({_keywords(value=value, inplace=True)})"
         case models.PreprocessingOperationType.CUSTOM:
-            imports_needed.add("custom")
-            # First, add the function definition.
-            function_definitions.append(
-                f"@custom({_render_arguments(op, ['name', 'description'])})\n{op.function}".strip()
+            decorator = _keywords(
+                name=op.name,
+                description=op.description,
+                compatible_with_dp=op.compatible_with_differential_privacy,
+                output_columns=op.output_columns,
             )
-            # Then, add the function call to code blocks.
-            function_name = re.findall("def ([\\w]+)\\(", op.function)[0]
-            blocks.append(f"df = {function_name}(df)")
-        case _:
-            blocks.append(
-                f"# Operation of type {op.type} not available with RemoteDataFrame."
+            # The function is excluded from formatting, as it is run verbatim remotely.
+            definition = (
+                f"# fmt: off\n@custom({decorator})\n{op.function.strip()}\n# fmt: on"
             )
-    # Add the initial blocks.
-    preamble = (
-        [
-            f"from tuneinsight.utils.remotedf import {', '.join(sorted(list(imports_needed)))}",
-            "",
-        ]
-        + function_definitions
-        + [
-            "",
-            "df = RemoteDataFrame(...)  # TODO: fill in the gaps.",
-        ]
+            inputs = {}
+            if is_set(op.additional_inputs) and op.additional_inputs is not None:
+                inputs = op.additional_inputs.to_dict()
+            if all(name.isidentifier() for name in inputs):
+                arguments = _arguments("df", _keywords(**inputs))
+            else:
+                arguments = f"df, **{inputs!r}"
+            call = f"df = {_function_name(op.function)}({arguments})"
+            return {"custom"}, definition, call
+    return set(), "", None
+
+
+def _unavailable(op: models.PreprocessingOperation) -> str:
+    """Renders an operation that is not available with RemoteDataFrame as a comment."""
+    return _UNAVAILABLE_OPERATION + json.dumps(op.to_dict(), default=str)
+
+
+def _normalized(op: models.PreprocessingOperation) -> dict:
+    """The definition of an operation, without unset parameters (for comparisons)."""
+    definition = {
+        k: v for k, v in as_operation_model(op).to_dict().items() if v is not None
+    }
+    if isinstance(definition.get("function"), str):
+        definition["function"] = definition["function"].rstrip()
+    return definition
+
+
+@functools.lru_cache(maxsize=256)
+def _chain_code(serialized_chain: str) -> str:
+    """Renders a chain given by its JSON representation (cached, see chain_to_code)."""
+    imports = {"RemoteDataFrame"}
+    definitions = {}
+    blocks = []
+    for op_dict in json.loads(serialized_chain):
+        op = models.PreprocessingOperation.from_dict(op_dict)
+        try:
+            names, definition, statement = _render_operation(op)
+        except (AttributeError, IndexError, TypeError):
+            # Malformed operations are rendered as comments as well.
+            names, definition, statement = set(), "", None
+        if statement is not None:
+            function = _function_name(op["function"]) if definition else None
+            if definitions.get(function, definition) != definition:
+                # Another function with the same name is already defined.
+                statement = None
+            else:
+                try:
+                    parsed = code_to_chain(f"{definition}\n{statement}").chain
+                except (ValueError, SyntaxError, TypeError):
+                    parsed = []
+                if [_normalized(p) for p in parsed] != [_normalized(op)]:
+                    statement = None
+        if statement is None:
+            blocks.append(_unavailable(op))
+            continue
+        imports |= names
+        if definition:
+            definitions[function] = definition
+        blocks.append(statement)
+    preamble = [
+        f"from tuneinsight.utils.remotedf import {', '.join(sorted(imports))}",
+        "",
+    ]
+    for definition in definitions.values():
+        preamble.extend(["", definition, ""])
+    preamble.extend(["", _CODE_PREAMBLE])
+    return "\n".join(preamble + blocks) + "\n"
+
+
+@functools.lru_cache(maxsize=256)
+def format_code(code: str) -> str:
+    """Formats Python code with `black` (cached, as formatting is comparatively slow)."""
+    import black  # pylint: disable=import-outside-toplevel
+
+    # Note: this is an unofficial use of the library.
+    try:
+        return black.format_file_contents(code, fast=False, mode=black.FileMode())
+    except black.NothingChanged:
+        return code
+
+
+def chain_to_code(
+    chain: models.PreprocessingChain | list[models.PreprocessingOperation],
+    formatted: bool = False,
+) -> str:
+    """
+    Returns the Python code equivalent to a given preprocessing chain using the RemoteDataFrame abstraction.
+
+    The code is cached by chain, so that displaying the same chains repeatedly is cheap.
+    Operations that are not available with RemoteDataFrame are rendered as comments holding
+    their definition. The chain can be recovered from the code with `code_to_chain` (see
+    `utils.benchmarks.check_chain_code_round_trip` for a randomized check of this round trip).
+
+    Args:
+        chain: the preprocessing chain, or a list of preprocessing operations.
+        formatted (bool, optional): whether to format the code with `black`. This is much
+            slower than generating the code, and should only be used when the code is shown.
+            Note that the code is no longer formatted by default (False): use `formatted=True`
+            or `format_code` to obtain the formatted code returned by earlier versions.
+    """
+    if isinstance(chain, models.PreprocessingChain):
+        chain = value_if_unset(chain.chain, [])
+    serialized_chain = json.dumps(
+        [op.to_dict() for op in chain], sort_keys=True, default=str
+    )
+    code = _chain_code(serialized_chain)
+    if formatted:
+        code = format_code(code)
+    return code
+
+
+# Parsing of the code generated by chain_to_code.
+
+
+def _call_arguments(
+    call: ast.Call, names: list[str], line: int, required: int = 0, offset: int = 0
+) -> dict[str, Any]:
+    """
+    Returns the (literal) arguments of a call, as a dictionary indexed by name.
+
+    Args:
+        call (ast.Call): the call.
+        names (list[str]): the names of the arguments, in order.
+        line (int): the line of the call, for error messages.
+        required (int, optional): the number of required arguments (the first names).
+        offset (int, optional): the number of positional arguments to skip (e.g., df).
+    """
+    positional = call.args[offset:]
+    if len(positional) > len(names):
+        raise ValueError(f"Line {line}: too many positional arguments.")
+    arguments = dict(zip(names, positional))
+    for keyword in call.keywords:
+        if keyword.arg is None or keyword.arg not in names:
+            raise ValueError(f"Line {line}: unexpected argument {keyword.arg}.")
+        arguments[keyword.arg] = keyword.value
+    for name in names[:required]:
+        if name not in arguments:
+            raise ValueError(f"Line {line}: missing argument {name}.")
+    try:
+        return {k: ast.literal_eval(v) for k, v in arguments.items()}
+    except ValueError as err:
+        raise ValueError(f"Line {line}: arguments must be literal values.") from err
+
+
+def _column_name(node: ast.AST) -> str | None:
+    """Returns the name of the column selected by a node df[name], or None."""
+    if (
+        isinstance(node, ast.Subscript)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == "df"
+        and isinstance(node.slice, ast.Constant)
+        and isinstance(node.slice.value, str)
+    ):
+        return node.slice.value
+    return None
+
+
+def _is_df(node: ast.AST) -> bool:
+    return isinstance(node, ast.Name) and node.id == "df"
+
+
+def _terms(node: ast.AST, operator: type) -> list[ast.AST]:
+    """Flattens a sequence of binary operations (e.g., a + b + c) into its terms."""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, operator):
+        return _terms(node.left, operator) + _terms(node.right, operator)
+    return [node]
+
+
+def _parse_filter(node: ast.AST, line: int, output_column: str = None):
+    """Parses a condition df[column] <comparator> value as a filter operation."""
+    if not (isinstance(node, ast.Compare) and len(node.ops) == 1):
+        raise ValueError(f"Line {line}: invalid filter condition.")
+    column, comparator = _column_name(node.left), _AST_COMPARATORS.get(
+        type(node.ops[0])
+    )
+    if column is None or comparator is None:
+        raise ValueError(f"Line {line}: invalid filter condition.")
+    value = ast.literal_eval(node.comparators[0])
+    op = models.Filter(
+        type=models.PreprocessingOperationType.FILTER,
+        column=column,
+        comparator=comparator,
+        value=str(value),
+        numerical=comparator in _NUMERICAL_COMPARATORS,
     )
-    full_code = "\n".join(preamble + blocks)
-    # Various post-processing for common "mistakes".
-    full_code = full_code.replace("errors=True", "errors='raise'")
-    full_code = full_code.replace("errors=False", "errors='ignore'")
-    # Apply `black` to nicely format the code. Note: this is an unofficial use of the library.
-    full_code = black.format_file_contents(full_code, fast=False, mode=black.FileMode())
-    return full_code
+    if output_column is not None:
+        op.output_column = output_column
+    return op
+
+
+def _parse_dataframe_method(call: ast.Call, line: int):
+    """Parses a call of a method of the DataFrame df (e.g., df.drop(...))."""
+    method = call.func.attr
+    Type = models.PreprocessingOperationType
+    match method:
+        case "drop":
+            args = _call_arguments(call, ["columns", "inplace"], line, required=1)
+            return models.Drop(type=Type.DROP, columns=args["columns"])
+        case "transpose":
+            _call_arguments(call, [], line)
+            return models.Transpose(type=Type.TRANSPOSE)
+        case "set_index":
+            args = _call_arguments(
+                call, ["keys", "drop", "append", "inplace"], line, required=1
+            )
+            keys = args["keys"]
+            return models.SetIndex(
+                type=Type.SETINDEX,
+                columns=[keys] if isinstance(keys, str) else keys,
+                drop=args.get("drop", UNSET),
+                append=args.get("append", UNSET),
+            )
+        case "astype":
+            args = _call_arguments(call, ["dtype", "errors"], line, required=1)
+            errors = args.get("errors")
+            return models.AsType(
+                type=Type.ASTYPE,
+                type_map=models.AsTypeTypeMap.from_dict(args["dtype"]),
+                errors=UNSET if errors is None else errors == "raise",
+            )
+        case "reset_index":
+            args = _call_arguments(call, ["drop", "level", "inplace"], line)
+            return models.ResetIndex(
+                type=Type.RESETINDEX,
+                drop=args.get("drop", UNSET),
+                level=args.get("level", UNSET),
+            )
+        case "rename":
+            args = _call_arguments(
+                call, ["mapper", "axis", "errors", "inplace"], line, required=1
+            )
+            errors = args.get("errors")
+            return models.Rename(
+                type=Type.RENAME,
+                mapper=models.RenameMapper.from_dict(args["mapper"]),
+                axis=models.RenameAxis(args["axis"]) if "axis" in args else UNSET,
+                errors=UNSET if errors is None else errors == "raise",
+            )
+        case "dropna":
+            args = _call_arguments(call, ["subset", "inplace"], line)
+            return models.Dropna(type=Type.DROPNA, subset=args.get("subset", UNSET))
+        case "drop_duplicates":
+            args = _call_arguments(call, ["subset", "keep", "inplace"], line)
+            keep = args.get("keep", UNSET)
+            return models.DropDuplicates(
+                type=Type.DROPDUPLICATES,
+                columns=args.get("subset", UNSET),
+                keep=(
+                    models.DropDuplicatesKeep("none" if keep is False else keep)
+                    if is_set(keep)
+                    else UNSET
+                ),
+            )
+        case "fillna" | "ffill" | "bfill" | "interpolate":
+            args = _call_arguments(call, ["value", "inplace"], line)
+            return _fillna(method, args, UNSET)
+    raise ValueError(f"Line {line}: unsupported method {method}.")
+
+
+def _fillna(method: str, args: dict, columns):
+    value = args.get("value")
+    return models.FillNA(
+        type=models.PreprocessingOperationType.FILLNA,
+        columns=columns,
+        method=_FILLNA_METHODS[method],
+        value=UNSET if value is None else str(value),
+    )
+
+
+def _parse_column_assignment(output: str, node: ast.AST, line: int):
+    """Parses an assignment df[output] = <node>."""
+    Type = models.PreprocessingOperationType
+    if isinstance(node, ast.Constant):
+        return models.NewColumn(type=Type.NEWCOLUMN, name=output, value=str(node.value))
+    if isinstance(node, ast.Compare):
+        return _parse_filter(node, line, output_column=output)
+    if isinstance(node, ast.Subscript) and _is_df(node.value):
+        return _parse_filter(node.slice, line, output_column=output)
+    if isinstance(node, ast.Call):
+        func = node.func
+        if isinstance(func, ast.Name) and func.id == "cut" and node.args:
+            column = _column_name(node.args[0])
+            args = _call_arguments(node, ["bins", "labels"], line, 1, offset=1)
+            if column is not None:
+                return models.Cut(
+                    type=Type.CUT,
+                    input_column=column,
+                    output_column=output,
+                    cuts=list(args["bins"]),
+                    labels=args.get("labels", UNSET),
+                )
+        if isinstance(func, ast.Attribute) and _column_name(func.value) is not None:
+            column = _column_name(func.value)
+            if func.attr == "replace":
+                args = _call_arguments(node, ["to_replace", "default"], line, 1)
+                return models.ApplyMapping(
+                    type=Type.APPLYMAPPING,
+                    input_column=column,
+                    output_column=output,
+                    mapping=models.StringMapping.from_dict(args["to_replace"]),
+                    default=args.get("default", UNSET),
+                )
+            if func.attr in _FILLNA_METHODS and column == output:
+                args = _call_arguments(node, ["value"], line)
+                return _fillna(func.attr, args, [column])
+    if isinstance(node, ast.BinOp):
+        if isinstance(node.op, ast.Add):
+            columns = [_column_name(t) for t in _terms(node, ast.Add)]
+            if None not in columns:
+                return models.AddColumns(
+                    type=Type.ADDCOLUMNS,
+                    input_columns=columns,
+                    output_column=output,
+                    sep="",
+                    numerical=True,
+                )
+        if isinstance(node.op, ast.Mult):
+            terms = _terms(node, ast.Mult)
+            columns = [_column_name(t) for t in terms]
+            if None not in columns:
+                return models.MultiplyColumns(
+                    type=Type.MULTIPLYCOLUMNS,
+                    input_columns=columns,
+                    output_column=output,
+                )
+            if len(terms) == 2 and columns.count(None) == 1:
+                column = columns[0] or columns[1]
+                scale = ast.literal_eval(terms[columns.index(None)])
+                return models.Scale(
+                    type=Type.SCALE,
+                    input_columns=[column],
+                    scale=scale,
+                    output_columns=[output],
+                )
+    raise ValueError(f"Line {line}: unsupported assignment to column {output}.")
+
+
+# pylint: disable=too-many-return-statements
+def _parse_statement(node: ast.stmt, functions: dict[str, models.Custom]):
+    """Parses a top-level statement as a preprocessing operation (or None if it is not one)."""
+    line = node.lineno
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.Pass)):
+        return None
+    if isinstance(node, ast.Expr):
+        if isinstance(node.value, ast.Constant):
+            return None
+        call = node.value
+        if (
+            isinstance(call, ast.Call)
+            and isinstance(call.func, ast.Attribute)
+            and _is_df(call.func.value)
+        ):
+            return _parse_dataframe_method(call, line)
+        raise ValueError(f"Line {line}: unsupported expression.")
+    if not (isinstance(node, ast.Assign) and len(node.targets) == 1):
+        raise ValueError(f"Line {line}: unsupported statement.")
+    target, value = node.targets[0], node.value
+    output = _column_name(target)
+    if output is not None:
+        return _parse_column_assignment(output, value, line)
+    if not _is_df(target):
+        raise ValueError(f"Line {line}: only df can be assigned to.")
+    if isinstance(value, ast.Subscript) and _is_df(value.value):
+        return _parse_filter(value.slice, line)
+    if not isinstance(value, ast.Call):
+        raise ValueError(f"Line {line}: unsupported assignment.")
+    func = value.func
+    if isinstance(func, ast.Attribute) and _is_df(func.value):
+        return _parse_dataframe_method(value, line)
+    if not (isinstance(func, ast.Name) and value.args and _is_df(value.args[0])):
+        if isinstance(func, ast.Name) and func.id == "RemoteDataFrame":
+            return None
+        raise ValueError(f"Line {line}: unsupported function call.")
+    if func.id == "get_dummies":
+        args = _call_arguments(
+            value,
+            ["target_column", "prefix", "specified_types", "strict"],
+            line,
+            required=1,
+            offset=1,
+        )
+        return models.OneHotEncoding(
+            type=models.PreprocessingOperationType.ONEHOTENCODING,
+            input_column=args["target_column"],
+            prefix=args.get("prefix", UNSET),
+            specified_types=args.get("specified_types", UNSET),
+            strict=args.get("strict", UNSET),
+        )
+    if func.id == "select":
+        args = _call_arguments(
+            value,
+            ["columns", "create_if_missing", "dummy_value"],
+            line,
+            required=1,
+            offset=1,
+        )
+        return models.Select(
+            type=models.PreprocessingOperationType.SELECT,
+            columns=args["columns"],
+            create_if_missing=args.get("create_if_missing", UNSET),
+            dummy_value=args.get("dummy_value", UNSET),
+        )
+    if func.id in functions:
+        op = models.Custom.from_dict(functions[func.id].to_dict())
+        if len(value.args) > 1:
+            raise ValueError(f"Line {line}: additional inputs must be keywords.")
+        inputs = {}
+        for keyword in value.keywords:
+            if keyword.arg is None:
+                inputs.update(ast.literal_eval(keyword.value))
+            else:
+                inputs[keyword.arg] = ast.literal_eval(keyword.value)
+        if inputs:
+            op.additional_inputs = models.CustomAdditionalInputs.from_dict(inputs)
+        return op
+    raise ValueError(f"Line {line}: unknown function {func.id}.")
+
+
+def _parse_function(node: ast.FunctionDef, lines: list[str]) -> models.Custom | None:
+    """Parses the definition of a function decorated with @custom (or returns None)."""
+    for decorator in node.decorator_list:
+        if (
+            isinstance(decorator, ast.Call)
+            and isinstance(decorator.func, ast.Name)
+            and decorator.func.id == "custom"
+        ):
+            args = _call_arguments(
+                decorator,
+                ["name", "description", "compatible_with_dp", "output_columns"],
+                node.lineno,
+            )
+            return models.Custom(
+                type=models.PreprocessingOperationType.CUSTOM,
+                name=args.get("name", UNSET),
+                description=args.get("description", UNSET),
+                compatible_with_differential_privacy=args.get(
+                    "compatible_with_dp", UNSET
+                ),
+                output_columns=args.get("output_columns", UNSET),
+                function="\n".join(lines[node.lineno - 1 : node.end_lineno]) + "\n",
+            )
+    return None
+
+
+def code_to_chain(code: str) -> models.PreprocessingChain:
+    """
+    Parses Python code using the RemoteDataFrame abstraction into a preprocessing chain.
+
+    This is the inverse of `chain_to_code`: for any chain, `code_to_chain(chain_to_code(chain))`
+    returns the same operations (up to parameters that are unset or None), and the code can
+    be edited in between. Statements must be of the forms generated by `chain_to_code` and
+    operate on a RemoteDataFrame named `df`, with literal values as arguments.
+
+    Args:
+        code (str): the Python code.
+
+    Raises:
+        ValueError: if a statement of the code is not a supported operation.
+    """
+    tree = ast.parse(code)
+    lines = code.split("\n")
+    functions = {}
+    function_lines = set()
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef):
+            function_lines.update(range(node.lineno, node.end_lineno + 1))
+            op = _parse_function(node, lines)
+            if op is not None:
+                functions[node.name] = op
+    operations = []
+    for node in tree.body:
+        op = _parse_statement(node, functions)
+        if op is not None:
+            operations.append((node.lineno, op))
+    # Operations that are not available with RemoteDataFrame are defined in comments.
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        if (
+            token.type == tokenize.COMMENT
+            and token.string.startswith(_UNAVAILABLE_OPERATION)
+            and token.start[0] not in function_lines
+        ):
+            definition = json.loads(token.string[len(_UNAVAILABLE_OPERATION) :])
+            op = models.PreprocessingOperation.from_dict(definition)
+            operations.append((token.start[0], as_operation_model(op)))
+    operations.sort(key=lambda item: item[0])
+    return models.PreprocessingChain(chain=[op for _, op in operations])
@@ -0,0 +1,54 @@
+"""Tests of the cut semantics (bins closed on the left) at the bin edges."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tuneinsight.computations.preprocessing import PreprocessingBuilder
+from tuneinsight.utils import remotedf
+from tuneinsight.utils.binning import QuantileSketch, bin_labels
+
+EDGES = [0, 10, 20]
+VALUES = [0, 5, 10, 19.5, 20, -1]
+# Bins are [0, 10) and [10, 20): values outside of the bins are missing.
+EXPECTED = ["[0, 10)", "[0, 10)", "[10, 20)", "[10, 20)", None, None]
+
+
+def _as_list(values) -> list:
+    return [None if pd.isna(v) else str(v) for v in values]
+
+
+def test_bin_labels():
+    assert bin_labels(EDGES) == ["[0, 10)", "[10, 20)"]
+
+
+def test_local_cut_at_edges():
+    b = PreprocessingBuilder()
+    b.cut("age", "group", list(EDGES))
+    output = b.run_locally(pd.DataFrame({"age": VALUES}))
+    assert _as_list(output["group"]) == EXPECTED
+
+
+def test_remotedf_cut_at_edges():
+    output = remotedf.cut(pd.Series(VALUES), EDGES, labels=bin_labels(EDGES))
+    assert _as_list(output) == EXPECTED
+
+
+def test_polars_cut_at_edges():
+    pl = pytest.importorskip("polars")
+    series = pl.Series("age", VALUES, dtype=pl.Float64)
+    output = remotedf.cut(series, EDGES, labels=bin_labels(EDGES))
+    assert _as_list(output.to_list()) == EXPECTED
+    # Without labels, bins are labelled like the intervals returned for pandas data.
+    expected = remotedf.cut(pd.Series(VALUES), EDGES).cat.categories
+    output = remotedf.cut(series, EDGES)
+    assert list(output.dtype.categories) == [str(c) for c in expected]
+    assert output.to_list()[:4] == [str(expected[i]) for i in (0, 0, 1, 1)]
+
+
+@pytest.mark.parametrize("decimals", [None, 0])
+def test_bin_edges_cover_all_values(decimals):
+    values = np.arange(100, dtype=np.float64)
+    edges = QuantileSketch().update(values).bin_edges(4, decimals=decimals)
+    groups = pd.cut(values, edges, right=False)
+    assert not pd.isna(groups).any()
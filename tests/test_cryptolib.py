@@ -0,0 +1,49 @@
+"""Round-trip tests of the cryptolib (skipped when the library is not available)."""
+
+import numpy as np
+import pytest
+
+from tuneinsight.cryptolib import Ciphertext, cryptolib
+
+requires_cryptolib = pytest.mark.skipif(
+    not cryptolib.LOADED, reason="the cryptolib is not available on this platform"
+)
+
+
+@pytest.fixture(name="operator", scope="module")
+def fixture_operator() -> bytes:
+    params = cryptolib.test_polynomial_evaluation_hefloat_params()
+    operator = cryptolib.new_hefloat_operator_from_b64_hefloat_parameters(
+        params.decode("utf-8")
+    )
+    cryptolib.key_generation(operator)
+    return operator
+
+
+def test_decode_number():
+    assert cryptolib.decode_number(b"42") == 42
+    assert cryptolib.decode_number(b"-1.5") == -1.5
+
+
+@requires_cryptolib
+@pytest.mark.parametrize("number", [0, 1, 42, -7, 123456])
+def test_number_round_trip(operator, number):
+    ciphertext = cryptolib.encrypt_number(operator, number)
+    assert cryptolib.decrypt_number(operator, ciphertext) == pytest.approx(
+        number, abs=1e-3
+    )
+
+
+@requires_cryptolib
+def test_ciphertext_round_trip(operator):
+    ciphertext = Ciphertext.encrypt(operator, 42)
+    assert ciphertext.decrypt() == pytest.approx(42, abs=1e-3)
+
+
+@requires_cryptolib
+def test_numbers_round_trip(operator):
+    numbers = np.arange(20, dtype=np.float64)
+    ciphertext = cryptolib.encrypt_numbers(operator, numbers)
+    np.testing.assert_allclose(
+        cryptolib.decrypt_numbers(operator, ciphertext), numbers, atol=1e-3
+    )
@@ -0,0 +1,101 @@
+"""Soak tests of the concurrency model of the cryptolib bindings, with a stub library."""
+
+from concurrent.futures import ThreadPoolExecutor
+import ctypes
+import random
+import threading
+import time
+
+import pytest
+
+from tuneinsight.cryptolib import bindings
+
+
+class _StubLibrary:
+    """
+    Simulates the cryptolib: a single global error, set by failing calls, and operators
+    that record whether they are ever used by several threads at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}
+        self._keep = []
+        self._error = None
+        self.overlaps = 0
+
+    def _buffer(self, content: bytes) -> int:
+        buffer = ctypes.create_string_buffer(
+            len(content).to_bytes(8, "little") + content
+        )
+        with self._lock:
+            self._keep.append(buffer)
+        return ctypes.addressof(buffer)
+
+    def get_last_go_error(self):
+        return self._error
+
+    def decrypt(self, operator: bytes, payload: bytes, _size: int):
+        with self._lock:
+            self._active[operator] = self._active.get(operator, 0) + 1
+            self.overlaps += self._active[operator] > 1
+        time.sleep(random.random() / 1000)
+        with self._lock:
+            self._active[operator] -= 1
+        if payload.startswith(b"fail"):
+            error = ctypes.create_string_buffer(payload)
+            with self._lock:
+                self._keep.append(error)
+            self._error = ctypes.addressof(error)
+            return None
+        return self._buffer(payload)
+
+
+@pytest.fixture(name="stub")
+def fixture_stub(monkeypatch) -> _StubLibrary:
+    stub = _StubLibrary()
+    monkeypatch.setattr(bindings, "_free", None)
+    monkeypatch.setitem(bindings._functions, "GetLastGoError", stub.get_last_go_error)
+    monkeypatch.setitem(bindings._functions, "DecryptNumber", stub.decrypt)
+    return stub
+
+
+def _decrypt(operator: bytes, payload: bytes):
+    try:
+        return bindings.call_bytes("DecryptNumber", operator, payload, len(payload))
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        return err
+
+
+def test_calls_on_an_operator_are_serialized(stub):
+    calls = [(b"op-%d" % (i % 3), b"value-%d" % i) for i in range(3000)]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda c: _decrypt(*c), calls))
+    assert stub.overlaps == 0
+    assert results == [payload for _, payload in calls]
+
+
+def test_errors_are_attributed_to_their_call(stub):
+    # Failing calls all use the same operator, while other operators succeed concurrently.
+    calls = [
+        (b"op-0", b"fail-%d" % i) if i % 4 == 0 else (b"op-%d" % (i % 4), b"ok-%d" % i)
+        for i in range(3000)
+    ]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda c: _decrypt(*c), calls))
+    for (_, payload), result in zip(calls, results):
+        if payload.startswith(b"fail"):
+            assert isinstance(result, Exception)
+            assert str(result) == payload.decode()
+        else:
+            assert result == payload
+
+
+def test_concurrent_failures_raise_an_error_of_a_failing_call(stub):
+    # Failures on different operators may swap their errors, but every failure raises.
+    calls = [(b"op-%d" % (i % 8), b"fail-%d" % i) for i in range(2000)]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda c: _decrypt(*c), calls))
+    assert all(isinstance(r, Exception) for r in results)
+    assert all(str(r).startswith("fail-") for r in results)
+    assert stub.overlaps == 0
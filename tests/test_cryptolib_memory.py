@@ -0,0 +1,85 @@
+"""Allocation soak test of the cryptolib bindings, with a stub shared library."""
+
+# pylint: disable=protected-access
+
+import ctypes
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from tuneinsight.cryptolib import bindings
+
+# A stub of the cryptolib: EncryptNumber returns a new malloc'd buffer (owned by the
+# caller), while GetPublicKeyB64 returns a string kept by the library (never released).
+_STUB_SOURCE = r"""
+#include <stdlib.h>
+#include <string.h>
+
+#define SIZE 1024
+
+static char public_key[] = "public key";
+
+char* GetLastGoError(void) { return "stub error"; }
+
+char* GetPublicKeyB64(char* id) { return public_key; }
+
+void* EncryptNumber(char* id, char* number) {
+    unsigned long long size = SIZE;
+    char* buffer = malloc(8 + SIZE);
+    memcpy(buffer, &size, 8);
+    memset(buffer + 8, number[0], SIZE);
+    return buffer;
+}
+"""
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux") or shutil.which("cc") is None,
+    reason="requires Linux and a C compiler",
+)
+
+
+def _resident_memory() -> int:
+    """Returns the resident memory of this process, in bytes."""
+    with open("/proc/self/statm", encoding="utf-8") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.fixture(name="stub")
+def fixture_stub(tmp_path, monkeypatch):
+    source = tmp_path / "stub.c"
+    source.write_text(_STUB_SOURCE, encoding="utf-8")
+    library = tmp_path / "stub.so"
+    subprocess.run(
+        ["cc", "-shared", "-fPIC", "-o", str(library), str(source)], check=True
+    )
+    stub = ctypes.CDLL(str(library))
+    monkeypatch.setattr(bindings, "_functions", bindings._declare_prototypes(stub))
+    monkeypatch.setattr(bindings, "_free", bindings._load_free())
+    return stub
+
+
+def test_owned_buffers_are_released(stub):  # pylint: disable=unused-argument
+    before = bindings.allocation_stats()
+    for _ in range(10_000):
+        bindings.call_bytes("EncryptNumber", b"op", b"7")
+    memory = _resident_memory()
+    for _ in range(100_000):
+        assert bindings.call_bytes("EncryptNumber", b"op", b"7") == b"7" * 1024
+    # Without releasing buffers, 100k calls would leak about 100 MB.
+    assert _resident_memory() - memory < 10 * 1024 * 1024
+    after = bindings.allocation_stats()
+    assert after["allocated"] - before["allocated"] == 110_000
+    assert after["live"] == before["live"]
+
+
+def test_buffers_kept_by_the_library_are_not_released(
+    stub,
+):  # pylint: disable=unused-argument
+    before = bindings.allocation_stats()
+    # Releasing the static string would crash the process.
+    for _ in range(1000):
+        assert bindings.call_string("GetPublicKeyB64", b"op") == b"public key"
+    assert bindings.allocation_stats() == before
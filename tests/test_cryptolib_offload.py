@@ -0,0 +1,66 @@
+"""Tests of the release of the shared memory blocks of the cryptolib process pool."""
+
+# pylint: disable=protected-access
+
+import os
+
+import pytest
+
+from tuneinsight.cryptolib import offload
+
+pytestmark = pytest.mark.skipif(
+    not os.path.isdir("/dev/shm"), reason="requires /dev/shm"
+)
+
+# Large enough to be exchanged through shared memory.
+_LARGE = b"x" * (2 * offload.SHARED_MEMORY_THRESHOLD)
+
+
+def _blocks() -> set:
+    """Returns the names of the shared memory blocks (not semaphores) of the system."""
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")}
+
+
+@pytest.fixture(name="pool")
+def fixture_pool():
+    with offload.CryptolibProcessPool(num_workers=1) as pool:
+        yield pool
+
+
+def test_blocks_released_when_the_call_fails(pool):
+    before = _blocks()
+    # The call fails in the worker before its arguments are read.
+    future = pool._submit(0, "no_such_function", (_LARGE,))
+    with pytest.raises(AttributeError):
+        future.result(timeout=60)
+    assert _blocks() - before == set()
+
+
+def test_blocks_released_when_the_call_is_read(pool):
+    before = _blocks()
+    # The argument is read (and unlinked) by the worker, then the call fails.
+    future = pool._submit(0, "decode_number", (_LARGE,))
+    with pytest.raises(ValueError):
+        future.result(timeout=60)
+    assert _blocks() - before == set()
+
+
+def test_blocks_released_when_the_call_is_cancelled(pool):
+    before = _blocks()
+    futures = [pool._submit(0, "no_such_function", (_LARGE,)) for _ in range(8)]
+    # The worker is still starting: the last calls are pending and can be cancelled.
+    assert futures[-1].cancel()
+    for future in futures:
+        if not future.cancelled():
+            with pytest.raises(AttributeError):
+                future.result(timeout=60)
+    pool.shutdown()
+    assert _blocks() - before == set()
+
+
+def test_released_block_is_ignored():
+    shared = offload._SharedBytes(_LARGE)
+    assert shared.read() == _LARGE
+    shared.release()
+    with pytest.raises(RuntimeError, match="released before being read"):
+        shared.read()
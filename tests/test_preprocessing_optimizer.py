@@ -0,0 +1,102 @@
+"""Golden equivalence tests of the preprocessing chain optimizer."""
+
+import pandas as pd
+import pytest
+
+from tuneinsight.api.sdk import models
+from tuneinsight.computations.local_preprocessing import run_chain
+from tuneinsight.computations.preprocessing import PreprocessingBuilder
+from tuneinsight.computations.preprocessing_optimizer import optimize_chain
+
+Type = models.PreprocessingOperationType
+
+
+@pytest.fixture(name="data")
+def fixture_data() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "a": [1, 2, 3, 4],
+            "x": [10, 20, 30, 40],
+            "age": [15, 30, 45, 60],
+            "color": ["red", "blue", "red", "green"],
+        }
+    )
+
+
+def _drop(*columns):
+    return models.Drop(type=Type.DROP, columns=list(columns))
+
+
+def _select(*columns, create=False):
+    return models.Select(
+        type=Type.SELECT,
+        columns=list(columns),
+        create_if_missing=create,
+        dummy_value="0",
+    )
+
+
+def _chains():
+    b = PreprocessingBuilder()
+    b.new_column(name="unused", value="0")
+    b.scale(["age"], 2)
+    b.scale(["age"], 0.5)
+    b.filter("age", ">", "20", numerical=True)
+    yield "redundant operations", list(b.chain), ["age", "x"]
+    b = PreprocessingBuilder()
+    b.one_hot_encoding("color", prefix="")
+    b.set_columns(["red", "age"])
+    yield "non-strict one-hot encoding", list(b.chain), None
+    yield "drop then select creating it", [
+        _drop("x"),
+        _select("a", "x", create=True),
+    ], None
+    yield "drop then created column", [_drop("x"), _select("a", "x", create=True)], [
+        "a",
+        "x",
+    ]
+    rename = models.Rename(
+        type=Type.RENAME,
+        mapper=models.RenameMapper.from_dict({"a": "x"}),
+        axis=models.RenameAxis.COLUMNS,
+        errors=False,
+    )
+    yield "drop then rename", [_drop("x"), rename, _select("x")], None
+    yield "drop of unused column", [_drop("x"), _select("a", "age")], None
+
+
+@pytest.mark.parametrize(
+    "chain,output_columns",
+    [(chain, columns) for _, chain, columns in _chains()],
+    ids=[name for name, _, _ in _chains()],
+)
+def test_optimized_chain_is_equivalent(data, chain, output_columns):
+    optimized, _ = optimize_chain(chain, output_columns)
+    selection = [_select(*output_columns)] if output_columns else []
+    expected = run_chain(chain + selection, data)
+    actual = run_chain(optimized + selection, data)
+    pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+
+
+def test_drop_of_recreated_column_is_kept():
+    chain = [_drop("x"), _select("a", "x", create=True)]
+    optimized, changes = optimize_chain(chain)
+    assert [op.type for op in optimized][0] == Type.DROP
+    assert not any("drop" in change for change in changes)
+
+
+def test_drop_of_unused_column_is_removed():
+    optimized, _ = optimize_chain([_drop("x"), _select("a", "age")])
+    assert all(op.type != Type.DROP for op in optimized)
+
+
+def test_builder_checks_node_chains(data):
+    b = PreprocessingBuilder()
+    b.scale(["age"], 1, nodes=["n1"])
+    b.drop(["x"], nodes=["n1"])
+    b.set_columns(["a", "x"], create_if_missing=True, dummy_value="0")
+    expected = b.run_locally(data, node="n1")
+    b.optimize(sample=data, patch=False)
+    pd.testing.assert_frame_equal(
+        expected, b.run_locally(data, node="n1"), check_dtype=False
+    )